@@ -4,17 +4,109 @@
 Ce programme permet d'illustrer le phénomène de battements.
 Deux signaux sinusoïdaux de fréquences proches sont sommés.
 La fréquence des signaux peut être modifiée grâce à des sliders.
+
+Le bouton d'export enregistre DUREE_EXPORT secondes de la somme des deux signaux dans un fichier
+WAV, à la fréquence d'échantillonnage choisie. Le signal est produit par blocs par des oscillateurs
+à phase continue (module physique.audio), qui lisent les sliders avant chaque bloc, et écrit à
+travers une projection en mémoire du fichier.
+
+Les panneaux de droite représentent en continu le spectre et le spectrogramme glissant de la somme
+des deux signaux (module physique.spectre), produite en temps réel à FREQUENCE_DIRECT par blocs de
+TAILLE_BLOC_DIRECT échantillons. La taille de la fenêtre fixe la résolution en fréquence
+(FREQUENCE_DIRECT / taille) : 2¹⁶ échantillons séparent deux fréquences distantes de 2 Hz environ.
+Une colonne est ajoutée tous les PAS_SPECTROGRAMME échantillons. La bande affichée est centrée sur
+les deux fréquences, avec une largeur suffisante pour les séparer.
+
+Le bouton d'analyse estime, à partir des seuls échantillons, l'enveloppe et la fréquence des
+battements d'un fichier WAV (module physique.enveloppe) : le fichier passé en argument de la ligne
+de commande, ou à défaut le dernier export. Le fichier est lu en une seule passe, par blocs.
+
+Les courbes sont réduites au nombre de colonnes de pixels de leur graphe (module
+physique.decimation) : le temps de tracé ne dépend pas de N_SAMPLES. Les signaux représentés sont
+conservés par position des sliders (module physique.memoire), les positions voisines de la
+dernière étant calculées à l'avance ; les statistiques du cache sont affichées en bas de la figure.
 """
 
+import os
+import sys
 import cmath, math
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib as mpl
-from matplotlib.widgets import Slider
+from matplotlib.widgets import Slider, Button, RadioButtons
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from physique.audio import ecriture_wav, lecture_wav, blocs_wav
+from physique.battements import signaux, signal_battements
+from physique.enveloppe import analyse_battements
+from physique.decimation import associer, mise_a_jour
+from physique.affichage import preparer, curseurs, coalescer, redessiner, animer
+from physique.memoire import memoiser, positions, resume
+from physique.spectre import spectrogramme, ajout_bloc, image, dernier_spectre, PLANCHER
 
-N_SAMPLES = 1000
 
+N_SAMPLES = 1000
+DUREE_EXPORT = 60.                          # durée de l'enregistrement (s)
+FICHIER_EXPORT = "battements.wav"
+echantillonnages = {'44,1 kHz': 44100, '96 kHz': 96000, '192 kHz': 192000}
+FREQUENCE_DIRECT = 44100                    # fréquence d'échantillonnage du spectrogramme (Hz)
+TAILLE_BLOC_DIRECT = 2048                   # nombre d'échantillons produits par image
+PAS_SPECTROGRAMME = 2048                    # nombre d'échantillons entre deux colonnes
+N_COLONNES = 200                            # nombre de colonnes du spectrogramme
+BANDE = (200., 700.)                        # fréquences calculées (Hz)
+DEMI_LARGEUR = 10.                          # demi-largeur minimale de la bande affichée (Hz)
+fenetres = {'N = 2¹²': 2**12, 'N = 2¹⁴': 2**14, 'N = 2¹⁶': 2**16}
+
+
+def frequences():
+    """Renvoie les fréquences des deux signaux lues sur les sliders"""
+    return s_frequence1.val, s_frequence2.val
+
+def exporter(event):
+    """Enregistre DUREE_EXPORT secondes de la somme des deux signaux dans FICHIER_EXPORT"""
+    frequence_echantillonnage = echantillonnages[radio_echantillonnage.value_selected]
+    n_echantillons = int(DUREE_EXPORT * frequence_echantillonnage)
+    ecriture_wav(FICHIER_EXPORT, signal_battements(frequences, frequence_echantillonnage), n_echantillons,
+                 frequence_echantillonnage, amplitude=2.)
+
+
+def initialise_spectrogramme(label=None):
+    """Crée le spectrogramme pour la taille de fenêtre choisie"""
+    global etat_spectrogramme
+    etat_spectrogramme = spectrogramme(fenetres[radio_fenetre.value_selected], PAS_SPECTROGRAMME,
+                                       FREQUENCE_DIRECT, BANDE, N_COLONNES)
+    graphe_spectre.set_data(etat_spectrogramme['frequences'], dernier_spectre(etat_spectrogramme))
+    graphe_spectrogramme.set_data(image(etat_spectrogramme))
+    graphe_spectrogramme.set_extent([-N_COLONNES * PAS_SPECTROGRAMME / FREQUENCE_DIRECT, 0,
+                                     etat_spectrogramme['frequences'][0], etat_spectrogramme['frequences'][-1]])
+
+def analyser(event):
+    """Estime l'enveloppe et la fréquence des battements d'un fichier WAV et les représente"""
+    chemin = sys.argv[1] if len(sys.argv) > 1 else FICHIER_EXPORT
+    frequence_echantillonnage, donnees = lecture_wav(chemin)
+    resultat = analyse_battements(blocs_wav(donnees), frequence_echantillonnage)
+    figure, (ax_enveloppe, ax_battements) = plt.subplots(2, sharex=True)
+    courbe_enveloppe, = ax_enveloppe.plot(resultat['temps_enveloppe'], resultat['enveloppe'], color='b')
+    associer(courbe_enveloppe, resultat['temps_enveloppe'], resultat['enveloppe'])
+    ax_enveloppe.set_ylabel('Enveloppe')
+    ax_battements.plot(resultat['temps_frequence'], resultat['frequence'], 'r.-')
+    ax_battements.set_ylabel('Battements (Hz)')
+    ax_battements.set_xlabel('Temps (s)')
+    figure.suptitle(os.path.basename(chemin))
+    figure.show()
+
+def cadrage(frequence1, frequence2):
+    """Centre la bande de fréquences affichée sur les deux signaux"""
+    centre = (frequence1 + frequence2) / 2
+    demi_largeur = max(DEMI_LARGEUR, 2 * abs(frequence1 - frequence2))
+    ax_spectre.set_xlim(centre - demi_largeur, centre + demi_largeur)
+    ax_spectrogramme.set_ylim(centre - demi_largeur, centre + demi_largeur)
+
+def anime(i):
+    """Produit un bloc du signal et met à jour le spectre et le spectrogramme"""
+    if ajout_bloc(etat_spectrogramme, next(flux_direct)):
+        graphe_spectre.set_ydata(dernier_spectre(etat_spectrogramme))
+        graphe_spectrogramme.set_data(image(etat_spectrogramme))
 
 def update_graphe(val):
     """Fonction de mise à jour du graphe"""
@@ -22,35 +114,36 @@ def update_graphe(val):
     frequence1 = s_frequence1.val
     frequence2 = s_frequence2.val
     
-    # Calcul des signaux
-    sig1 = np.sin(2 * np.pi * frequence1 * temps)
-    sig2 = np.sin(2 * np.pi * frequence2 * temps)
-    signal = sig1 + sig2
-    enveloppe = 2 * np.cos(np.pi * (frequence1 - frequence2) * temps)
+    # Calcul des signaux, ou lecture dans le cache
+    sig1, sig2, signal, enveloppe = signaux_memoire(frequence1, frequence2)
     
     # Mise à jour des graphes
-    graphe1.set_ydata(sig1)
-    graphe2.set_ydata(sig2)
-    graphe_somme.set_ydata(signal)
-    graphe_enveloppe1.set_ydata(enveloppe)
-    graphe_enveloppe2.set_ydata(-enveloppe)
-    fig.canvas.draw_idle()
+    mise_a_jour(graphe1, y=sig1)
+    mise_a_jour(graphe2, y=sig2)
+    mise_a_jour(graphe_somme, y=signal)
+    mise_a_jour(graphe_enveloppe1, y=enveloppe)
+    mise_a_jour(graphe_enveloppe2, y=-enveloppe)
+    cadrage(frequence1, frequence2)
+    texte_cache.set_text(resume())
+    redessiner(fig)
 
 
 # Initialisation des fréquences
 frequence1 = 440.
 frequence2 = 440.
 
-# Création de la figure
-fig, ax = plt.subplots(3, sharex=True)
-plt.subplots_adjust(bottom=0.25)
+# Création de la figure : signaux à gauche, spectre et spectrogramme à droite
+fig = plt.figure(figsize=(11, 6))
+grille = fig.add_gridspec(3, 2)
+ax = [fig.add_subplot(grille[0, 0])]
+ax += [fig.add_subplot(grille[i, 0], sharex=ax[0]) for i in (1, 2)]
+ax_spectre = fig.add_subplot(grille[0, 1])
+ax_spectrogramme = fig.add_subplot(grille[1:, 1])
+plt.subplots_adjust(bottom=0.33, hspace=0.3)
 
 # Création des signaux
 temps = np.linspace(0, 50e-3, N_SAMPLES)
-sig1 = np.sin(2 * np.pi * frequence1 * temps)
-sig2 = np.sin(2 * np.pi * frequence2 * temps)
-signal = sig1 + sig2
-enveloppe = 2 * np.cos(np.pi * (frequence1 - frequence2) * temps)
+sig1, sig2, signal, enveloppe = signaux(temps, frequence1, frequence2)
 
 # Tracé des graphes
 graphe1, = ax[0].plot(temps, sig1, lw=2, color='red')
@@ -68,6 +161,22 @@ ax[0].set_ylabel('Amplitude')
 ax[1].set_ylabel('Amplitude')
 ax[2].set_ylabel('Amplitude')
 ax[2].set_xlabel('Temps (s)')
+ax[0].tick_params(labelbottom=False)
+ax[1].tick_params(labelbottom=False)
+
+# Réduction des courbes au nombre de pixels des graphes
+for courbe in (graphe1, graphe2, graphe_somme, graphe_enveloppe1, graphe_enveloppe2):
+    associer(courbe, *courbe.get_data())
+
+# Spectre et spectrogramme
+graphe_spectre, = ax_spectre.plot(BANDE, [PLANCHER, PLANCHER], color='red')
+ax_spectre.set_ylim(PLANCHER, 5)
+ax_spectre.set_xlabel('Fréquence (Hz)')
+ax_spectre.set_ylabel('Niveau (dB)')
+graphe_spectrogramme = ax_spectrogramme.imshow(np.full((2, 2), PLANCHER), origin='lower', aspect='auto',
+                                               vmin=PLANCHER, vmax=0, cmap='magma')
+ax_spectrogramme.set_xlabel('Temps (s)')
+ax_spectrogramme.set_ylabel('Fréquence (Hz)')
 
 # Création du slider pour modifier la fréquence du signal 1
 ax_frequence1 = plt.axes([0.1, 0.1, 0.8, 0.03])
@@ -77,9 +186,45 @@ s_frequence1 = Slider(ax_frequence1, 'f_1', 240, 640, valinit=frequence1)
 ax_frequence2 = plt.axes([0.1, 0.07, 0.8, 0.03])
 s_frequence2 = Slider(ax_frequence2, 'f_2', 240, 640, valinit=frequence2)
 
-# Mise à jour des graphes lors de l'utilisation des sliders
-s_frequence1.on_changed(update_graphe)
-s_frequence2.on_changed(update_graphe)
+# Création des boutons radio pour choisir la fréquence d'échantillonnage de l'export
+ax_echantillonnage = plt.axes([0.6, 0.14, 0.15, 0.1])
+radio_echantillonnage = RadioButtons(ax_echantillonnage, list(echantillonnages))
+
+# Création du bouton d'export
+ax_export = plt.axes([0.78, 0.19, 0.12, 0.05])
+bouton_export = Button(ax_export, 'Exporter')
+bouton_export.on_clicked(exporter)
+
+# Création du bouton d'analyse
+ax_analyse = plt.axes([0.78, 0.13, 0.12, 0.05])
+bouton_analyse = Button(ax_analyse, 'Analyser')
+bouton_analyse.on_clicked(analyser)
+
+# Création des boutons radio pour choisir la taille de la fenêtre du spectrogramme
+ax_fenetre = plt.axes([0.45, 0.14, 0.1, 0.1])
+radio_fenetre = RadioButtons(ax_fenetre, list(fenetres), active=2)
+radio_fenetre.on_clicked(initialise_spectrogramme)
+
+# Signaux conservés par position des sliders, et statistiques du cache
+signaux_memoire = memoiser('battements', lambda f1, f2: signaux(temps, f1, f2),
+                           [positions(s_frequence1), positions(s_frequence2)])
+texte_cache = fig.text(0.01, 0.005, resume(), fontsize=8, color='gray')
+
+# Mise à jour rapide : seuls les courbes, le spectre, le spectrogramme et les sliders sont redessinés
+preparer(fig, [graphe1, graphe2, graphe_somme, graphe_enveloppe1, graphe_enveloppe2, ax_spectre, ax_spectrogramme,
+               texte_cache])
+curseurs(fig, [s_frequence1, s_frequence2])
+
+# Spectrogramme en continu
+initialise_spectrogramme()
+cadrage(frequence1, frequence2)
+flux_direct = signal_battements(frequences, FREQUENCE_DIRECT, TAILLE_BLOC_DIRECT)
+animation = animer(fig, anime, int(1000 * TAILLE_BLOC_DIRECT / FREQUENCE_DIRECT))
+
+# Mise à jour des graphes lors de l'utilisation des sliders, pour la dernière position
+update = coalescer(fig, update_graphe)
+s_frequence1.on_changed(update)
+s_frequence2.on_changed(update)
 
 # Affichage du graphique
 plt.show()
\ No newline at end of file
@@ -6,67 +6,161 @@ Il est possible de modifier plusieurs paramètres de manière interactive :
     - la constante de vitesse k ;
     - l'ordre de la réaction.
 
-On considère uniquement une loi de vitesse dont l'ordre global est aussi l'ordre partiel du réactif :
+La loi de vitesse de la consommation du réactif A est d'ordre réel quelconque :
     dC/dt = - k C^ordre
+Le réactif peut aussi appartenir à un petit réseau de réactions (A → B → C, A ⇌ B, réactions
+concurrentes A → B et A → C), la seconde réaction ayant la constante de vitesse k₂ et l'ordre 1.
+Les concentrations sont calculées par le module physique.cinetique : solution exacte lorsqu'elle
+existe, intégration numérique (méthode de Rosenbrock, adaptée aux systèmes raides) sinon.
+
+Le bouton « Ajuster » lit un fichier CSV de mesures (premier argument du programme, ou
+FICHIER_MESURES) : la première colonne contient les dates, chacune des suivantes une série de
+concentrations. La concentration initiale, la constante de vitesse et l'ordre de chaque série sont
+ajustés (module physique.ajustement) ; les premières séries et leurs résidus sont représentés,
+et les résultats de toutes les séries sont écrits dans un fichier CSV.
+
+Le bouton « Stochastique » simule N_TRAJECTOIRES trajectoires du mécanisme choisi à partir de
+N_MOLECULES molécules de A (algorithme de Gillespie, module physique.stochastique). Il représente
+la moyenne et la dispersion des concentrations, comparées à la solution déterministe, et la
+distribution des temps de demi-réaction, comparée à calcul_temps_demi_reaction.
+
+La courbe est réduite au nombre de colonnes de pixels du graphe (module physique.decimation) :
+le temps de tracé ne dépend pas du nombre d'instants calculés.
 """
 
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider, Button, RadioButtons, CheckButtons
 
-def calcul_concentration(concentration_initiale, temps, cste_vitesse, ordre):
-    """Calcul de la concentration au cours du temps"""
-    if ordre == 0:
-        return concentration_initiale - cste_vitesse * temps
-    elif ordre == 1:
-        return concentration_initiale * np.exp(-cste_vitesse * temps)
-    elif ordre == 2:
-        return concentration_initiale / (1 + cste_vitesse * concentration_initiale * temps)
-    return None
-
-def calcul_temps_demi_reaction(concentration_initiale, cste_vitesse, ordre):
-    """Calcul du temps de demi-réaction"""
-    if ordre == 0:
-        return concentration_initiale / (2 * cste_vitesse)
-    elif ordre == 1:
-        return np.log(2) / cste_vitesse
-    elif ordre == 2:
-        return 1. / (cste_vitesse * concentration_initiale)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from physique.decimation import associer, mise_a_jour
+from physique.affichage import preparer, curseurs, coalescer, redessiner
+from physique import cinetique
+from physique.cinetique import calcul_concentration, calcul_temps_demi_reaction, calcul_especes
+from physique.ajustement import lecture_csv, ecriture_csv, ajustement
+from physique.stochastique import trajectoires
+
+FICHIER_MESURES = "mesures.csv"
+N_AFFICHEES = 5                 # nombre de séries ajustées représentées
+N_MOLECULES = 100               # nombre initial de molécules de A des simulations stochastiques
+N_TRAJECTOIRES = 5000           # nombre de trajectoires simulées
+QUANTILES = (0.1, 0.9)          # bornes de la bande de dispersion
+
 
 def activated_radio_button(x, list):
     """Fonction pour récupérer la valeur d'un bouton radio"""
-    for i in range(len(x.circles)):
-        if x.circles[i].get_facecolor()[0] < 0.5:
-            return list[i]
+    return list[[str(element) for element in list].index(str(x.value_selected))]
+
+def ajuster(event):
+    """Ajuste la loi de vitesse aux séries d'un fichier de mesures et représente les premières"""
+    chemin = sys.argv[1] if len(sys.argv) > 1 else FICHIER_MESURES
+    temps_mesures, mesures, noms = lecture_csv(chemin)
+    resultat = ajustement(temps_mesures, mesures)
+    ecriture_csv(os.path.splitext(chemin)[0] + '_ajustement.csv', noms, resultat)
+    figure, (ax_mesures, ax_residus) = plt.subplots(2, sharex=True, gridspec_kw={'height_ratios': [3, 1]})
+    temps_courbe = np.linspace(0, np.nanmax(temps_mesures), 500)
+    for i in range(min(N_AFFICHEES, len(noms))):
+        concentration_initiale = resultat['concentration_initiale'][i]
+        cste_vitesse = resultat['cste_vitesse'][i]
+        ordre = resultat['ordre'][i]
+        points, = ax_mesures.plot(temps_mesures, mesures[i], '+')
+        ax_mesures.plot(temps_courbe, calcul_concentration(concentration_initiale, temps_courbe, cste_vitesse, ordre),
+                        color=points.get_color(),
+                        label="{} : k = {:.3g}, ordre = {:.2f}, t1/2 = {:.3g} s".format(
+                            noms[i], cste_vitesse, ordre,
+                            calcul_temps_demi_reaction(concentration_initiale, cste_vitesse, ordre)))
+        ax_residus.plot(temps_mesures, resultat['residus'][i], '.', color=points.get_color())
+    ax_mesures.set_ylabel("Concentration (mol/L)")
+    ax_mesures.legend(fontsize='small')
+    ax_residus.axhline(0, color='k', lw=0.5)
+    ax_residus.set_ylabel("Résidus")
+    ax_residus.set_xlabel("Temps (s)")
+    figure.suptitle("{} : {} séries, écart-type médian {:.2g} mol/L".format(
+        os.path.basename(chemin), len(noms), np.median(resultat['ecart_type'])))
+    figure.show()
+
+def stochastique(event):
+    """Simule un ensemble de trajectoires stochastiques pour les paramètres courants et représente
+    leur moyenne, leur dispersion et la distribution des temps de demi-réaction
+    """
+    concentration_initiale = slider_concentration_initiale.val
+    cste_vitesse = slider_cste_vitesse.val
+    cste_vitesse_2 = slider_cste_vitesse_2.val
+    ordre = activated_radio_button(radio_ordre, ordres)
+    mecanisme = radio_mecanisme.value_selected
+    
+    # Simulation des trajectoires et solution déterministe
+    systeme = cinetique.reseau(cinetique.mecanisme(mecanisme, ordre))
+    constantes = [cste_vitesse, cste_vitesse_2][:systeme['n_reactions']]
+    nombres_initiaux = np.zeros(len(systeme['especes']), dtype=int)
+    nombres_initiaux[0] = N_MOLECULES
+    omega = N_MOLECULES / concentration_initiale
+    nombres, demi_reaction = trajectoires(systeme, nombres_initiaux, constantes, temps, omega, N_TRAJECTOIRES)
+    concentrations = nombres / omega
+    especes, temps_demi_reaction = calcul_especes(mecanisme, concentration_initiale, temps,
+                                                  cste_vitesse, cste_vitesse_2, ordre)
+
+    # Moyenne, bande de dispersion et une trajectoire de chaque espèce ; distribution des temps de demi-réaction
+    figure, (ax_moyenne, ax_demi) = plt.subplots(2, gridspec_kw={'height_ratios': [3, 2]})
+    for i, (nom, courbe) in enumerate(zip(systeme['especes'], graphes)):
+        couleur = courbe.get_color()
+        bas, haut = np.quantile(concentrations[:, :, i], QUANTILES, axis=0)
+        ax_moyenne.fill_between(temps, bas, haut, color=couleur, alpha=0.2)
+        ax_moyenne.plot(temps, np.mean(concentrations[:, :, i], axis=0), color=couleur, label=nom)
+        ax_moyenne.plot(temps, concentrations[0, :, i], color=couleur, lw=0.5)
+        if i < len(especes):
+            ax_moyenne.plot(temps, especes[i], color='k', ls='--', lw=1)
+    ax_moyenne.set_xlabel("Temps (s)")
+    ax_moyenne.set_ylabel("Concentration (mol/L)")
+    ax_moyenne.legend(fontsize='small')
+    ax_demi.hist(demi_reaction[np.isfinite(demi_reaction)], bins=50, color='r', alpha=0.6)
+    ax_demi.axvline(temps_demi_reaction, color='g', ls='--', label='déterministe')
+    ax_demi.axvline(np.nanmean(demi_reaction), color='k', label='moyenne')
+    ax_demi.set_xlabel("Temps de demi-réaction (s)")
+    ax_demi.legend(fontsize='small')
+    figure.suptitle("{} trajectoires, {} molécules de A".format(N_TRAJECTOIRES, N_MOLECULES))
+    figure.tight_layout()
+    figure.show()
 
 def update_graphe(val):
     """Fonction de mise à jour du graphe"""
     # Mise à jour des paramètres
     concentration_initiale = slider_concentration_initiale.val
     cste_vitesse = slider_cste_vitesse.val
+    cste_vitesse_2 = slider_cste_vitesse_2.val
     ordre = activated_radio_button(radio_ordre, ordres)
+    mecanisme = radio_mecanisme.value_selected
     
-    # Calcul de la concentration au cours du temps et du temps de demi-réaction
-    concentration = calcul_concentration(concentration_initiale, temps, cste_vitesse, ordre)
-    temps_demi_reaction = calcul_temps_demi_reaction(concentration_initiale, cste_vitesse, ordre)
+    # Calcul des concentrations au cours du temps et du temps de demi-réaction
+    especes, temps_demi_reaction = calcul_especes(mecanisme, concentration_initiale, temps,
+                                                  cste_vitesse, cste_vitesse_2, ordre)
     
     # Mise à jour du graphe
-    graphe.set_ydata(concentration)
+    for i, courbe in enumerate(graphes):
+        courbe.set_visible(i < len(especes))
+        if i < len(especes):
+            mise_a_jour(courbe, y=especes[i])
+    complet = len(ax.get_legend().get_texts()) != len(especes)     # changement de mécanisme
+    if complet:
+        ax.legend(handles=graphes[:len(especes)], loc='upper right')
     x_temps_demi_reaction.set_xdata([temps_demi_reaction, temps_demi_reaction])
     x_temps_demi_reaction.set_ydata([0., 0.5*concentration_initiale])
     y_temps_demi_reaction.set_xdata([0., temps_demi_reaction])
     y_temps_demi_reaction.set_ydata([0.5*concentration_initiale, 0.5*concentration_initiale])
-    fig.canvas.draw_idle()
+    redessiner(fig, complet)
   
 # Création de la figure
-fig = plt.figure()
-plt.subplots_adjust(bottom=0.23)
+fig = plt.figure(figsize=(9, 6))
+plt.subplots_adjust(bottom=0.25, right=0.7)
 
 # Initialisation des paramètres
 concentration_initiale = 1      # initialisation de la concentration initiale
 cste_vitesse = 0.05             # initialisation de la constante de vitesse
-ordres = [0, 1, 2]              # ordres pris en compte pour le calcul de la concentration
-ordre = ordres[1]               # initialisation de l'ordre
+cste_vitesse_2 = 0.03           # initialisation de la constante de vitesse de la seconde réaction
+ordres = [0, 0.5, 1, 1.5, 2, 3] # ordres proposés pour la consommation du réactif
+ordre = ordres[2]               # initialisation de l'ordre
 
 # Calcul de la concentration au cours du temps et du temps de demi-réaction
 temps = np.linspace(0, 100, num=100)
@@ -78,7 +172,14 @@ plt.axis([0., 100, 0, 1.1*concentration_initiale])
 plt.xlabel("Temps (s)")
 plt.ylabel("Concentration du réactif (mol/L)")
 plt.title("Concentration d'un réactif en fonction du temps")
-graphe, = plt.plot(temps, concentration, 'r-', lw=2)
+ax = plt.gca()
+graphe, = plt.plot(temps, concentration, 'r-', lw=2, label='A')
+graphe_b, = plt.plot(temps, np.zeros_like(temps), 'b-', lw=2, label='B', visible=False)
+graphe_c, = plt.plot(temps, np.zeros_like(temps), 'm-', lw=2, label='C', visible=False)
+graphes = [graphe, graphe_b, graphe_c]
+for courbe in graphes:
+    associer(courbe, *courbe.get_data())
+ax.legend(handles=graphes[:1], loc='upper right')
 
 # Tracé des droites permettant de lire le temps de demi-réaction
 x_temps_demi_reaction, = plt.plot([temps_demi_reaction, temps_demi_reaction], [0., 0.5*concentration_initiale], c='g', ls='--')
@@ -89,16 +190,41 @@ ax_concentration_initiale = plt.axes([0.1, 0.1, 0.65, 0.03])
 slider_concentration_initiale = Slider(ax_concentration_initiale, r'C_0', 0.2, 1., valinit=1.)
 
 # Créaction du slider pour modifier la constante de vitesse
-ax_cste_vitesse = plt.axes([0.1, 0.04, 0.65, 0.03])
+ax_cste_vitesse = plt.axes([0.1, 0.06, 0.65, 0.03])
 slider_cste_vitesse = Slider(ax_cste_vitesse, r'k', 0.01, 0.1, valinit=0.05)
 
+# Création du slider pour modifier la constante de vitesse de la seconde réaction
+ax_cste_vitesse_2 = plt.axes([0.1, 0.02, 0.65, 0.03])
+slider_cste_vitesse_2 = Slider(ax_cste_vitesse_2, r'k₂', 0.01, 0.1, valinit=0.03)
+
 # Création des boutons radio pour choisir l'ordre de la réaction
-ax_ordre = plt.axes([0.65, 0.65, 0.22, 0.15], title='Ordre de la réaction')
-radio_ordre = RadioButtons(ax_ordre, ordres, active=1)
+ax_ordre = plt.axes([0.75, 0.5, 0.2, 0.32], title='Ordre de la réaction')
+radio_ordre = RadioButtons(ax_ordre, ordres, active=2)
+
+# Création des boutons radio pour choisir le mécanisme
+ax_mecanisme = plt.axes([0.75, 0.2, 0.2, 0.22], title='Mécanisme')
+radio_mecanisme = RadioButtons(ax_mecanisme, cinetique.MECANISMES, active=0)
+
+# Création du bouton d'ajustement à un fichier de mesures
+ax_ajustement = plt.axes([0.83, 0.06, 0.12, 0.05])
+bouton_ajustement = Button(ax_ajustement, 'Ajuster')
+bouton_ajustement.on_clicked(ajuster)
+
+# Création du bouton de simulation stochastique
+ax_stochastique = plt.axes([0.83, 0.125, 0.12, 0.05])
+bouton_stochastique = Button(ax_stochastique, 'Stochastique')
+bouton_stochastique.on_clicked(stochastique)
+
+# Mise à jour rapide : seuls les courbes et les sliders sont redessinés, pour la dernière position
+preparer(fig, graphes + [x_temps_demi_reaction, y_temps_demi_reaction])
+curseurs(fig, [slider_concentration_initiale, slider_cste_vitesse, slider_cste_vitesse_2])
+update = coalescer(fig, update_graphe)
 
 # Mise à jour lors d'un changement de valeur
-slider_concentration_initiale.on_changed(update_graphe)
-slider_cste_vitesse.on_changed(update_graphe)
-radio_ordre.on_clicked(update_graphe)
+slider_concentration_initiale.on_changed(update)
+slider_cste_vitesse.on_changed(update)
+slider_cste_vitesse_2.on_changed(update)
+radio_ordre.on_clicked(update)
+radio_mecanisme.on_clicked(update)
 
 plt.show()
\ No newline at end of file
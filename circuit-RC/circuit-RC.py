@@ -5,18 +5,87 @@ Ce programme représente le diagramme de Bode (amplitude, phase)
 d'un filtre passe-bas réalisé grâce à un circuit RC.
 Il représente également un signal d'excitation et le signal de sortie.
 On peut régler les valeurs de la résistance et de la capacité.
+
+Une bande de tolérance peut être affichée autour du diagramme de Bode nominal : elle est obtenue
+par un tirage de Monte-Carlo de N_TIRAGES jeux de composants, chacun à ±TOLERANCE_COMPOSANTS
+de sa valeur nominale, dont les diagrammes sont calculés en une seule passe par balayage_bode.
+
+Le signal d'excitation peut être choisi : en régime permanent sinusoïdal, la sortie se déduit du
+diagramme de Bode ; pour les autres signaux (sinus depuis t = 0, créneaux, impulsion, chirp), elle
+est obtenue par la simulation temporelle du circuit (module physique.regime_transitoire), qui
+fait apparaître le régime transitoire.
+
+Les grilles de pulsations et de phases temporelles sont précalculées, et les tableaux de
+résultats alloués une fois pour toutes dans l'espace de travail (module physique.circuit_rc, qui
+n'importe pas matplotlib) : une mise à jour les remplit en place (paramètre out des fonctions
+NumPy), sans créer de tableau intermédiaire. Les courbes sont réduites au nombre de colonnes de
+pixels de leur graphe (module physique.decimation) : le temps de tracé ne dépend pas de
+N_SAMPLES.
+
+Les résultats sont conservés par position des sliders (module physique.memoire) : revenir sur une
+position déjà calculée ne coûte aucun calcul, et les positions voisines de la dernière sont
+calculées à l'avance lorsque l'interface est inactive. Les statistiques du cache sont affichées en
+bas de la figure.
 """
 
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider, Button, RadioButtons, CheckButtons
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from physique.regime_transitoire import formes, forme_onde, simulation
+from physique.decimation import associer, mise_a_jour
+from physique.affichage import preparer, curseurs, coalescer, redessiner
+from physique.memoire import memoiser, oublier, positions, resume
+from physique.circuit_rc import (TOLERANCE_COMPOSANTS, transfer_function, balayage_bode, tirage_composants,
+                                 polygone_bande, espace_travail, bode, sinusoide, representation_etat)
+
 
 N_SAMPLES = 1000
 
 
-def transfer_function(omega, tau):
-    return 1./(1 + 1j * omega * tau)
+def bande_tolerance(log_resistance, log_capacity):
+    """Calcule les bornes de la bande de tolérance autour du diagramme de Bode"""
+    gain, phase_deg = balayage_bode(omega, *tirage_composants((10**log_resistance, 10**log_capacity)))
+    return gain.min(axis=0), gain.max(axis=0), phase_deg.min(axis=0), phase_deg.max(axis=0)
+
+def nouveaux_resultats():
+    """Renvoie l'espace de travail avec des tableaux de résultats nouvellement alloués : les noyaux y
+    écrivent directement le résultat conservé par le cache, sans copie
+    """
+    return dict(travail, gain=np.empty(N_SAMPLES), phase=np.empty(N_SAMPLES), sortie=np.empty(N_SAMPLES))
+
+def reponse_circuit(log_resistance, log_capacity, forme):
+    """Calcule le diagramme de Bode, la sortie à la fréquence d'excitation et les signaux
+    d'excitation et de sortie selon le signal choisi
+    """
+    resistance, capacity = 10**log_resistance, 10**log_capacity
+    resultats = nouveaux_resultats()
+    gain, phase_deg = bode(resultats, resistance * capacity)
+    exit_bode = transfer_function(2*np.pi * excitation_frequency, resistance * capacity)
+    exit_amplitude = np.abs(exit_bode)
+    exit_phase = np.angle(exit_bode)
+    if forme == 'Permanent':
+        entree, sortie = travail['excitation'], sinusoide(resultats, exit_amplitude, exit_phase)
+    else:
+        pas = time[1] - time[0]
+        entree = np.concatenate(list(forme_onde(forme, excitation_frequency, pas, N_SAMPLES)))
+        sortie = np.concatenate(list(simulation([entree], *representation_etat(resistance, capacity), pas)))
+    return gain, phase_deg, exit_amplitude, exit_phase, entree, sortie
+
+def update_bande(log_resistance, log_capacity):
+    """Met à jour la bande de tolérance autour du diagramme de Bode"""
+    visible = check_bande.get_status()[0]
+    bande_amplitude.set_visible(visible)
+    bande_phase.set_visible(visible)
+    if not visible:
+        oublier('circuit-RC bande')       # bande masquée : ses voisins ne sont plus calculés à l'avance
+        return
+    gain_min, gain_max, phase_min, phase_max = bande_memoire(log_resistance, log_capacity)
+    bande_amplitude.set_verts([polygone_bande(frequency, gain_min, gain_max)])
+    bande_phase.set_verts([polygone_bande(frequency, phase_min, phase_max)])
 
 def update_graphe(val):
     """Fonction de mise à jour du graphe"""
@@ -26,24 +95,22 @@ def update_graphe(val):
     capacity = pow(10, slider_capacity.val)
     slider_capacity.valtext.set_text("{:.2E}".format(capacity))
     
-    # Calcul de la fonction de transfert
-    tau = resistance * capacity
-    h = transfer_function(2*np.pi*frequency, tau)
-    
-    # Callcul de l'amplitude et de la phase du signal de sortie
-    exit_bode = transfer_function(2*np.pi * excitation_frequency, resistance * capacity)
-    exit_amplitude = np.abs(exit_bode)
-    exit_phase = np.angle(exit_bode)
+    # Calcul de la fonction de transfert et des signaux, ou lecture dans le cache
+    gain, phase_deg, exit_amplitude, exit_phase, entree, sortie = reponse_memoire(
+        slider_resistance.val, slider_capacity.val, radio_entree.value_selected)
     
     # Mise à jour du graphe
-    amplitude.set_ydata(np.abs(h))
-    phase.set_ydata(180/np.pi * np.angle(h))
-    exit.set_ydata(exit_amplitude * np.sin(2*np.pi * excitation_frequency * time + exit_phase))
+    mise_a_jour(amplitude, y=gain)
+    mise_a_jour(phase, y=phase_deg)
+    mise_a_jour(excitation, y=entree)
+    mise_a_jour(exit, y=sortie)
     x_freq_amplitude.set_ydata([ax['amplitude'].get_ylim()[0], exit_amplitude])
     y_freq_amplitude.set_ydata([exit_amplitude, exit_amplitude])
     x_freq_phase.set_ydata([ax['phase'].get_ylim()[0], 180/np.pi * exit_phase])
     y_freq_phase.set_ydata([180/np.pi * exit_phase, 180/np.pi * exit_phase])
-    fig.canvas.draw_idle()
+    update_bande(slider_resistance.val, slider_capacity.val)
+    texte_cache.set_text(resume())
+    redessiner(fig)
 
 
 # Initialisation des valeurs des composants
@@ -65,8 +132,9 @@ plt.subplots_adjust(bottom=0.23)
 
 # Diagramme de Bode
 frequency = np.logspace(1, 8, N_SAMPLES)
+omega = 2*np.pi*frequency
 tau = resistance * capacity
-h = transfer_function(2*np.pi*frequency, tau)
+h = transfer_function(omega, tau)
 
 # Diagramme en amplitude
 amplitude, = ax['amplitude'].loglog(frequency, np.abs(h), 'r-')
@@ -83,9 +151,15 @@ ax['phase'].set_xlabel('Fréquence (Hz)')
 ax['phase'].set_ylabel('Phase (°)')
 
 
+# Bande de tolérance, masquée par défaut
+bande_amplitude = ax['amplitude'].fill_between(frequency, np.abs(h), np.abs(h), color='r', alpha=0.2, visible=False)
+bande_phase = ax['phase'].fill_between(frequency, 180/np.pi * np.angle(h), 180/np.pi * np.angle(h), color='r', alpha=0.2, visible=False)
+
+
 # Graphe temporel
 excitation_frequency = 1.e4
 time = np.linspace(0, 5.e-4, N_SAMPLES)
+travail = espace_travail(frequency, time, excitation_frequency)
 
 # Signal d'excitation
 excitation, = ax['signal'].plot(time, np.sin(2*np.pi * excitation_frequency * time), 'r-')
@@ -102,6 +176,10 @@ ax['signal'].set_ylim(-1.1, 1.1)
 ax['signal'].set_xlabel('Temps (s)')
 ax['signal'].set_ylabel('Amplitude (V)')
 
+# Réduction des courbes au nombre de pixels des graphes
+for courbe in (amplitude, phase, excitation, exit):
+    associer(courbe, *courbe.get_data())
+
 # Tracé des droites permettant de lire le diagramme de Bode
 x_freq_amplitude, = ax['amplitude'].plot(
     [excitation_frequency, excitation_frequency],           # abscisse de la droite verticale
@@ -137,7 +215,29 @@ ax_capacity = plt.axes([0.1, 0.04, 0.65, 0.03])
 slider_capacity = Slider(ax_capacity, r'C', -9, -6, valinit=np.log10(capacity))
 slider_capacity.valtext.set_text("{:.2E}".format(capacity))         # notation scientifique
 
-slider_resistance.on_changed(update_graphe)
-slider_capacity.on_changed(update_graphe)
+# Création de la case à cocher pour afficher la bande de tolérance
+ax_bande = plt.axes([0.62, 0.82, 0.25, 0.08])
+check_bande = CheckButtons(ax_bande, ['Tolérance ±{:.0%}'.format(TOLERANCE_COMPOSANTS)], [False])
+
+# Création des boutons radio pour choisir le signal d'excitation
+ax_entree = plt.axes([0.8, 0.11, 0.18, 0.19], title='Excitation')
+radio_entree = RadioButtons(ax_entree, ['Permanent'] + formes)
+
+# Résultats conservés par position des sliders, et statistiques du cache
+grilles = [positions(slider_resistance), positions(slider_capacity)]
+reponse_memoire = memoiser('circuit-RC', reponse_circuit, grilles + [None])
+bande_memoire = memoiser('circuit-RC bande', bande_tolerance, grilles)
+texte_cache = fig.text(0.01, 0.005, resume(), fontsize=8, color='gray')
+
+# Mise à jour rapide : seuls les courbes et les sliders sont redessinés, pour la dernière position
+preparer(fig, [amplitude, phase, excitation, exit, x_freq_amplitude, y_freq_amplitude, x_freq_phase, y_freq_phase,
+               bande_amplitude, bande_phase, texte_cache])
+curseurs(fig, [slider_resistance, slider_capacity])
+update = coalescer(fig, update_graphe)
+
+slider_resistance.on_changed(update)
+slider_capacity.on_changed(update)
+check_bande.on_clicked(update)
+radio_entree.on_clicked(update)
 
 plt.show()
\ No newline at end of file
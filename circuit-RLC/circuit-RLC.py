@@ -5,24 +5,109 @@ Ce programme représente le diagramme de Bode (amplitude, phase)
 d'un filtre réalisé grâce à un circuit RLC.
 Il représente également un signal d'excitation et le signal de sortie.
 On peut régler les valeurs de la résistance, de la capacité et de l'incuctance.
-Version 1 : le programme ne prend en compte que le filtre passe-bande.
-
-À implémenter : choix du filtre :
+On peut choisir le filtre :
     - passe-bas (tension condensateur) ;
     - passe-bande (tension résistance) ;
     - passe-haut (tension bobine).
+
+La réponse ne dépend que de x = ω/ω0 et de Q. Elle est précalculée une fois pour toutes sur
+une table (ln x, log Q) pour le filtre passe-bande, les deux autres s'en déduisant exactement :
+    H_bas = H_bande / (j x/Q)   et   H_haut = j Q x H_bande.
+Le pas h de la table en ln x, proche de PAS_TABLE, divise exactement celui de la grille de
+fréquences : changer ω0 décale la grille d'un même nombre de colonnes pour tous les points, et la
+mise à jour se réduit à une interpolation bilinéaire entre quatre tranches contiguës de la table.
+La table n'est pas construite si elle dépasse TAILLE_MAX_TABLE valeurs (grille très fine).
+L'interpolation linéaire de pas h d'une fonction f commet une erreur au plus h²/8 max|f''|, d'où :
+    - gain (erreur relative) : au plus h²/8 * max(4 Q², 2) selon x, plus 1.1e-3 selon Q ;
+    - phase : au plus h²/8 * 0.65 * max(4 Q², 1) rad selon x, plus 0.04 ° selon Q.
+Lorsque ces bornes dépassent TOLERANCE_GAIN ou TOLERANCE_PHASE (Q supérieur à 20 environ),
+ou que les paramètres sortent de la table, la réponse est calculée directement.
+
+Une bande de tolérance peut être affichée autour du diagramme de Bode nominal : elle est obtenue
+par un tirage de Monte-Carlo de N_TIRAGES jeux de composants, chacun à ±TOLERANCE_COMPOSANTS
+de sa valeur nominale, dont les diagrammes sont calculés en une seule passe par balayage_bode.
+
+Le signal d'excitation peut être choisi : en régime permanent sinusoïdal, la sortie se déduit du
+diagramme de Bode ; pour les autres signaux (sinus depuis t = 0, créneaux, impulsion, chirp), elle
+est obtenue par la simulation temporelle du circuit (module physique.regime_transitoire), qui
+fait apparaître le régime transitoire.
+
+Les grilles de pulsations et de phases temporelles sont précalculées, et les tableaux de
+résultats alloués une fois pour toutes dans l'espace de travail (module physique.circuit_rlc,
+qui n'importe pas matplotlib) : une mise à jour les remplit en place (paramètre out des
+fonctions NumPy), sans créer de tableau intermédiaire. Les courbes sont réduites au nombre de
+colonnes de pixels de leur graphe (module physique.decimation) : le temps de tracé ne dépend pas
+de N_SAMPLES. Le calcul direct se fait en réels : avec D = Q (x - 1/x), le filtre passe-bande a
+pour gain 1/sqrt(1 + D²) et pour phase -arctan(D).
+
+Les résultats sont conservés par position des sliders (module physique.memoire) : revenir sur une
+position déjà calculée ne coûte aucun calcul, et les positions voisines de la dernière sont
+calculées à l'avance lorsque l'interface est inactive. Les statistiques du cache sont affichées en
+bas de la figure.
 """
 
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider, Button, RadioButtons, CheckButtons
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from physique.regime_transitoire import formes, forme_onde, simulation
+from physique.decimation import associer, mise_a_jour
+from physique.affichage import preparer, curseurs, coalescer, redessiner
+from physique.memoire import memoiser, oublier, positions, resume
+from physique.circuit_rlc import (TOLERANCE_COMPOSANTS, filtres, transfer_function, parametres_filtre, balayage_bode,
+                                  tirage_composants, polygone_bande, espace_travail, reponse, representation_etat,
+                                  sinusoide)
+
 
 N_SAMPLES = 1000
 
 
-def transfer_function(omega, omega_0, quality_factor):
-    return 1./(1 + 1j * quality_factor * (omega/omega_0 - omega_0/omega))
+def bande_tolerance(log_resistance, log_capacity, log_inductance, filtre):
+    """Calcule les bornes de la bande de tolérance autour du diagramme de Bode"""
+    composants = tirage_composants((10**log_resistance, 10**log_capacity, 10**log_inductance))
+    gain, phase_deg = balayage_bode(omega, *composants, filtre)
+    return gain.min(axis=0), gain.max(axis=0), phase_deg.min(axis=0), phase_deg.max(axis=0)
+
+def nouveaux_resultats():
+    """Renvoie l'espace de travail avec des tableaux de résultats nouvellement alloués : les noyaux y
+    écrivent directement le résultat conservé par le cache, sans copie
+    """
+    return dict(travail, reponse=np.empty((2, N_SAMPLES)), sortie=np.empty(N_SAMPLES))
+
+def reponse_circuit(log_resistance, log_capacity, log_inductance, filtre, forme):
+    """Calcule le diagramme de Bode, la sortie à la fréquence d'excitation et les signaux
+    d'excitation et de sortie selon le signal choisi
+    """
+    resistance, capacity, inductance = 10**log_resistance, 10**log_capacity, 10**log_inductance
+    omega_0, quality_factor = parametres_filtre(resistance, capacity, inductance)
+    resultats = nouveaux_resultats()
+    gain, phase_deg = reponse(resultats, omega_0, quality_factor, filtre)
+    exit_bode = transfer_function(2*np.pi * excitation_frequency, omega_0, quality_factor, filtre)
+    exit_amplitude = np.abs(exit_bode)
+    exit_phase = np.angle(exit_bode)
+    if forme == 'Permanent':
+        entree, sortie = travail['excitation'], sinusoide(resultats, exit_amplitude, exit_phase)
+    else:
+        pas = time[1] - time[0]
+        entree = np.concatenate(list(forme_onde(forme, excitation_frequency, pas, N_SAMPLES)))
+        etat = representation_etat(resistance, capacity, inductance, filtre)
+        sortie = np.concatenate(list(simulation([entree], *etat, pas)))
+    return gain, phase_deg, exit_amplitude, exit_phase, entree, sortie
+
+def update_bande(log_resistance, log_capacity, log_inductance, filtre):
+    """Met à jour la bande de tolérance autour du diagramme de Bode"""
+    visible = check_bande.get_status()[0]
+    bande_amplitude.set_visible(visible)
+    bande_phase.set_visible(visible)
+    if not visible:
+        oublier('circuit-RLC bande')       # bande masquée : ses voisins ne sont plus calculés à l'avance
+        return
+    gain_min, gain_max, phase_min, phase_max = bande_memoire(log_resistance, log_capacity, log_inductance, filtre)
+    bande_amplitude.set_verts([polygone_bande(frequency, gain_min, gain_max)])
+    bande_phase.set_verts([polygone_bande(frequency, phase_min, phase_max)])
 
 def update_graphe(val):
     """Fonction de mise à jour du graphe"""
@@ -33,26 +118,27 @@ def update_graphe(val):
     slider_capacity.valtext.set_text("{:.2E}".format(capacity))
     inductance = pow(10, slider_inductance.val)
     slider_inductance.valtext.set_text("{:.2E}".format(inductance))
+    composants = (slider_resistance.val, slider_capacity.val, slider_inductance.val)
     
-    # Calcul de la fonction de transfert
-    omega_0 = 1./np.sqrt(inductance * capacity)
-    quality_factor = 1./resistance * np.sqrt(inductance / capacity)
-    h = transfer_function(2*np.pi*frequency, omega_0, quality_factor)
-    
-    # Calcul de l'amplitude et de la phase du signal de sortie
-    exit_bode = transfer_function(2*np.pi * excitation_frequency, omega_0, quality_factor)
-    exit_amplitude = np.abs(exit_bode)
-    exit_phase = np.angle(exit_bode)
+    # Calcul de la fonction de transfert et des signaux, ou lecture dans le cache
+    filtre = radio_filtre.value_selected
+    gain, phase_deg, exit_amplitude, exit_phase, entree, sortie = reponse_memoire(
+        *composants, filtre, radio_entree.value_selected)
     
     # Mise à jour du graphe
-    amplitude.set_ydata(np.abs(h))
-    phase.set_ydata(180/np.pi * np.angle(h))
-    exit.set_ydata(exit_amplitude * np.sin(2*np.pi * excitation_frequency * time + exit_phase))
+    mise_a_jour(amplitude, y=gain)
+    mise_a_jour(phase, y=phase_deg)
+    complet = list(ax['phase'].get_ylim()) != limites_phase[filtre]     # changement de filtre
+    ax['phase'].set_ylim(limites_phase[filtre])
+    mise_a_jour(excitation, y=entree)
+    mise_a_jour(exit, y=sortie)
     x_freq_amplitude.set_ydata([ax['amplitude'].get_ylim()[0], exit_amplitude])
     y_freq_amplitude.set_ydata([exit_amplitude, exit_amplitude])
     x_freq_phase.set_ydata([ax['phase'].get_ylim()[0], 180/np.pi * exit_phase])
     y_freq_phase.set_ydata([180/np.pi * exit_phase, 180/np.pi * exit_phase])
-    fig.canvas.draw_idle()
+    update_bande(*composants, filtre)
+    texte_cache.set_text(resume())
+    redessiner(fig, complet)
 
 
 # Initialisation des valeurs des composants
@@ -61,8 +147,9 @@ capacity = 1.e-7
 inductance = 1.e-3
 
 # Calcul des paramètres du filtre
-omega_0 = 1./np.sqrt(inductance * capacity)
-quality_factor = 1./resistance * np.sqrt(inductance / capacity)
+omega_0, quality_factor = parametres_filtre(resistance, capacity, inductance)
+filtre = filtres[1]
+limites_phase = {'Passe-bas': [-182, 2], 'Passe-bande': [-92, 92], 'Passe-haut': [-2, 182]}
 
 # Création des graphes
 mosaic = [
@@ -78,7 +165,8 @@ plt.subplots_adjust(bottom=0.25)
 
 # Diagramme de Bode
 frequency = np.logspace(1, 8, N_SAMPLES)
-h = transfer_function(2*np.pi*frequency, omega_0, quality_factor)
+omega = 2*np.pi*frequency
+h = transfer_function(omega, omega_0, quality_factor, filtre)
 
 # Diagramme en amplitude
 amplitude, = ax['amplitude'].loglog(frequency, np.abs(h), 'r-')
@@ -90,20 +178,26 @@ ax['amplitude'].set_ylabel('Amplitude')
 # Diagramme de phase
 phase, = ax['phase'].semilogx(frequency, 180/np.pi * np.angle(h), 'r-')
 ax['phase'].sharex(ax['amplitude'])
-ax['phase'].set_ylim([-92, 92])
+ax['phase'].set_ylim(limites_phase[filtre])
 ax['phase'].set_xlabel('Fréquence (Hz)')
 ax['phase'].set_ylabel('Phase (°)')
 
 
+# Bande de tolérance, masquée par défaut
+bande_amplitude = ax['amplitude'].fill_between(frequency, np.abs(h), np.abs(h), color='r', alpha=0.2, visible=False)
+bande_phase = ax['phase'].fill_between(frequency, 180/np.pi * np.angle(h), 180/np.pi * np.angle(h), color='r', alpha=0.2, visible=False)
+
+
 # Graphe temporel
 excitation_frequency = 1.e4
 time = np.linspace(0, 5.e-4, N_SAMPLES)
+travail = espace_travail(frequency, time, excitation_frequency)
 
 # Signal d'excitation
 excitation, = ax['signal'].plot(time, np.sin(2*np.pi * excitation_frequency * time), 'r-')
 
 # Signal de sortie
-exit_bode = transfer_function(2*np.pi * excitation_frequency, omega_0, quality_factor)
+exit_bode = transfer_function(2*np.pi * excitation_frequency, omega_0, quality_factor, filtre)
 exit_amplitude = np.abs(exit_bode)
 exit_phase = np.angle(exit_bode)
 exit, = ax['signal'].plot(time, exit_amplitude * np.sin(2*np.pi * excitation_frequency * time + exit_phase), 'b--')
@@ -114,6 +208,10 @@ ax['signal'].set_ylim(-1.1, 1.1)
 ax['signal'].set_xlabel('Temps (s)')
 ax['signal'].set_ylabel('Amplitude (V)')
 
+# Réduction des courbes au nombre de pixels des graphes
+for courbe in (amplitude, phase, excitation, exit):
+    associer(courbe, *courbe.get_data())
+
 # Tracé des droites permettant de lire le diagramme de Bode
 x_freq_amplitude, = ax['amplitude'].plot(
     [excitation_frequency, excitation_frequency],           # abscisse de la droite verticale
@@ -154,8 +252,35 @@ ax_inductance = plt.axes([0.1, 0.04, 0.65, 0.03])
 slider_inductance = Slider(ax_inductance, r'L', -4, -2, valinit=np.log10(inductance))
 slider_inductance.valtext.set_text("{:.2E}".format(inductance))     # notation scientifique
 
-slider_resistance.on_changed(update_graphe)
-slider_capacity.on_changed(update_graphe)
-slider_inductance.on_changed(update_graphe)
+# Création des boutons radio pour choisir le filtre
+ax_filtre = plt.axes([0.62, 0.8, 0.2, 0.12], title='Filtre')
+radio_filtre = RadioButtons(ax_filtre, filtres, active=1)
+
+# Création des boutons radio pour choisir le signal d'excitation
+ax_entree = plt.axes([0.8, 0.14, 0.18, 0.19], title='Excitation')
+radio_entree = RadioButtons(ax_entree, ['Permanent'] + formes)
+
+# Création de la case à cocher pour afficher la bande de tolérance
+ax_bande = plt.axes([0.54, 0.15, 0.24, 0.07])
+check_bande = CheckButtons(ax_bande, ['Tolérance ±{:.0%}'.format(TOLERANCE_COMPOSANTS)], [False])
+
+# Résultats conservés par position des sliders, et statistiques du cache
+grilles = [positions(slider_resistance), positions(slider_capacity), positions(slider_inductance)]
+reponse_memoire = memoiser('circuit-RLC', reponse_circuit, grilles + [None, None])
+bande_memoire = memoiser('circuit-RLC bande', bande_tolerance, grilles + [None])
+texte_cache = fig.text(0.01, 0.005, resume(), fontsize=8, color='gray')
+
+# Mise à jour rapide : seuls les courbes et les sliders sont redessinés, pour la dernière position
+preparer(fig, [amplitude, phase, excitation, exit, x_freq_amplitude, y_freq_amplitude, x_freq_phase, y_freq_phase,
+               bande_amplitude, bande_phase, texte_cache])
+curseurs(fig, [slider_resistance, slider_capacity, slider_inductance])
+update = coalescer(fig, update_graphe)
+
+slider_resistance.on_changed(update)
+slider_capacity.on_changed(update)
+check_bande.on_clicked(update)
+slider_inductance.on_changed(update)
+radio_filtre.on_clicked(update)
+radio_entree.on_clicked(update)
 
 plt.show()
\ No newline at end of file
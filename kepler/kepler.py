@@ -1,25 +1,26 @@
 import math
+import os, sys
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider, Button, RadioButtons, CheckButtons
+from matplotlib.collections import LineCollection
 
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir))
+from physique.kepler import (liste_unite_de_masse,TOLERANCE,mass,echantillonnage,erreur_echantillonnage,trace,
+                             periode,propagation,trace_ensemble,charger_catalogue,conditions_initiales,
+                             ajouter_astre,integration,ecart_trace)
+from physique.affichage import preparer,curseurs,coalescer,redessiner,animer
 
-# Constantes utiles
-G=6.67408e-11 # Constante de la gravitation en m3.kg-1.s-2
-Msun=1.988e30 # Masse du Soleil en kg
-Mearth=5.9722e24 # Masse de la Terre en kg
-UA=1.495978707e11 # Unite astronomique en m
-an=365.0*86400. # annee en s
-liste_unite_de_masse=('Masse solaire', 'Masse terrestre')
+# Parametres de l'affichage et du mode N corps
+PAS_PAR_PERIODE=2000 # Nombre de pas d'integration N corps par periode de l'orbite a deux corps
+HISTORIQUE=5000 # Nombre maximal de points conserves sur les trajectoires N corps tracees
+PLANETE_A=3.0 # Rayon de l'orbite de la planete ajoutee en mode N corps, en demi-grands axes du systeme double
 
 # Creation de la figure
 fig=plt.figure()
 plt.subplots_adjust(left=0., bottom=0.3)
 ax = fig.add_subplot(111, aspect='equal')
 
-# Creation de l'axe des abscisses, ici les angles de 0 a 2pi
-theta=np.linspace(0.000001,2.0*math.pi-0.000001,num=10000)
-
 # Parametres de la fonction, avec des valeurs par defaut
 init_theta0 = 0.0 # Angle du periastre, en degres
 init_M1_val = 1.0 # Masse de l'astre 1, unite definie par M1_unit
@@ -28,40 +29,10 @@ init_M2_val = 1.0 # Masse de l'astre 2, unite definie par M2_unit
 init_M2_unit= 'Masse terrestre' # Unite de la masse de l'astre 2, peut etre 'Masse solaire' pour une masse solaire, ou 'Masse terrestre' pour une masse terrestre 
 init_a_UA = 1.0 # demi grand axe exprime en UA
 init_e=0.0 # Excentricite
+init_tolerance=TOLERANCE # Tolerance de l'echantillonnage de l'orbite
 M1_unit=init_M1_unit
 M2_unit=init_M2_unit
 
-# Fonction retournant la masse en kg
-def mass(M_val,M_unit):
-    if (M_unit=="Masse solaire"):M=M_val*Msun
-    if (M_unit=="Masse terrestre"):M=M_val*Mearth    
-    return(M)
-
-# Creation de la fonction a tracer 
-def trace(theta0,M1_val,M1_unit,M2_val,M2_unit,a_UA,e):
-    M1=mass(M1_val,M1_unit)
-    M2=mass(M2_val,M2_unit)
-    a=a_UA*UA
-    # Masse reduite
-    mu=M1*M2/(M1+M2)
-    # Facteur K de la force centrale F=-K/r2
-    K=G*M1*M2
-    L=math.sqrt(K*mu*a*(1.0-math.pow(e,2.0)))
-    theta0_rad=(math.pi/180.)*theta0
-    p=math.pow(L,2.0)/(K*mu)
-    # Mouvement de la particule fictive
-    r=p/(1+e*np.cos(theta-theta0_rad))
-    # Projection de ce mouvement, converti en UA
-    x=r*np.cos(theta)/UA
-    y=r*np.sin(theta)/UA
-    # Mouvement de l'objet M1
-    x1=-(M2/(M1+M2))*x
-    y1=-(M2/(M1+M2))*y
-    # Mouvement de l'objet M2
-    x2=(M1/(M1+M2))*x
-    y2=(M1/(M1+M2))*y
-    return(x,y,x1,y1,x2,y2)
-
 x,y,x1,y1,x2,y2=trace(init_theta0,init_M1_val,init_M1_unit,init_M2_val,init_M2_unit,init_a_UA,init_e)
 
 # Creation de la trace de la fonction s en fonction de t. C'est un objet qui est sauvegarde dans 'l'
@@ -69,32 +40,58 @@ l,=plt.plot(x,y,'k-',lw=2)
 l1,=plt.plot(x1,y1,'r-',lw=2)
 l2,=plt.plot(x2,y2,'b-',lw=2)
 
+# Positions des astres sur une periode, pour l'animation : une periode dure N_IMAGES images
+N_IMAGES=200
+dates=np.linspace(0.0,1.0,N_IMAGES,endpoint=False) # dates en fraction de periode
+positions=propagation(dates*periode(init_M1_val,init_M1_unit,init_M2_val,init_M2_unit,init_a_UA),init_theta0,init_M1_val,init_M1_unit,init_M2_val,init_M2_unit,init_a_UA,init_e)
+p,=plt.plot([],[],'ko')
+p1,=plt.plot([],[],'ro')
+p2,=plt.plot([],[],'bo')
+p3,=plt.plot([],[],'go')
+
+# Trajectoires du mode N corps (astre 1, astre 2, planete)
+trajectoires=[plt.plot([],[],c+':',lw=1)[0] for c in 'rbg']
+simulation=None # generateur de l'integration N corps en cours, None en mode analytique
+
+# Trace d'un ensemble d'orbites lues dans un catalogue passe en argument : python kepler.py catalogue.csv
+# Les orbites relatives sont tracees en une seule collection de lignes
+if len(sys.argv)>1:
+    ensemble=LineCollection(trace_ensemble(*charger_catalogue(sys.argv[1])),colors='grey',linewidths=0.5,alpha=0.3)
+    ax.add_collection(ensemble,autolim=False)
+
 # Specification des limites des axes (xmin,xmax,ymin,ymax)
 plt.axis([-10.0, 10.0, -10.0, 10.0])
 
+# Affichage du nombre de points du trace et de l'ecart maximal a l'orbite exacte
+def texte_echantillonnage(e,tolerance):
+    E=echantillonnage(e,tolerance)
+    return("{} points, ecart maximal {:.1e} a (tolerance {:.0e})".format(len(E),erreur_echantillonnage(E,e),tolerance))
+info=ax.set_title(texte_echantillonnage(init_e,init_tolerance),fontsize='small')
+
 # Creation des barres de modification amplitude et frequence
 axcolor = 'lightgoldenrodyellow'
-axtheta0 = plt.axes([0.07, 0.07, 0.85, 0.03], axisbg=axcolor)
-axM1 = plt.axes([0.07, 0.19, 0.85, 0.03], axisbg=axcolor)
-axM2 = plt.axes([0.07, 0.16, 0.85, 0.03], axisbg=axcolor)
-axa = plt.axes([0.07, 0.1, 0.85, 0.03], axisbg=axcolor)
-axe = plt.axes([0.07, 0.13, 0.85, 0.03], axisbg=axcolor)
+axtheta0 = plt.axes([0.07, 0.07, 0.85, 0.03], facecolor=axcolor)
+axM1 = plt.axes([0.07, 0.19, 0.85, 0.03], facecolor=axcolor)
+axM2 = plt.axes([0.07, 0.16, 0.85, 0.03], facecolor=axcolor)
+axa = plt.axes([0.07, 0.1, 0.85, 0.03], facecolor=axcolor)
+axe = plt.axes([0.07, 0.13, 0.85, 0.03], facecolor=axcolor)
+axtol = plt.axes([0.07, 0.22, 0.85, 0.03], facecolor=axcolor)
 stheta0 = Slider(axtheta0, r'$\theta_0$', 0.0, 180.0, valinit=init_theta0) # Remarquer la valeur initiale init_theta0
 sM1 = Slider(axM1, r'$M_1$', 0.1, 10.0, valinit=init_M1_val) # Remarquer la valeur initiale init_theta0
 sM2 = Slider(axM2, r'$M_2$', 0.1, 10.0, valinit=init_M2_val) # Remarquer la valeur initiale init_theta0
 sa = Slider(axa, r'$a$', 0.1, 10.0, valinit=init_a_UA) # Remarquer la valeur initiale init_theta0
 se = Slider(axe, r'$e$', 0.0, 0.9999999, valinit=init_e) # Remarquer la valeur initiale init_theta0
+stol = Slider(axtol, r'$\log\,\epsilon$', -9.0, -2.0, valinit=math.log10(init_tolerance)) # Tolerance en echelle logarithmique
 # Creation des menus de changement des unites des masses
-rax_M1_unit = plt.axes([0.7, 0.6, 0.22, 0.15], axisbg=axcolor,title=r'$M_1$'+' '+'[Unit]')
+rax_M1_unit = plt.axes([0.7, 0.6, 0.22, 0.15], facecolor=axcolor,title=r'$M_1$'+' '+'[Unit]')
 radio_M1_unit = RadioButtons(rax_M1_unit, liste_unite_de_masse, active=0) # La valeur par defaut est la numero 0 (Masse solaire)
-rax_M2_unit = plt.axes([0.7, 0.3, 0.22, 0.15], axisbg=axcolor,title=r'$M_2$'+' '+'[Unit]')
+rax_M2_unit = plt.axes([0.7, 0.3, 0.22, 0.15], facecolor=axcolor,title=r'$M_2$'+' '+'[Unit]')
 radio_M2_unit = RadioButtons(rax_M2_unit, liste_unite_de_masse, active=1) # La valeur par defaut est la numero 1 (Masse terrestre)
-
-# Fonction pour recuperer la valeur d'un bouton radio
-def activated_radio_button(x,list):     
-    for i in xrange(len(x.circles)):
-                if x.circles[i].get_facecolor()[0]<.5:
-                    return list[i]
+# Creation du bouton de lancement du mode N corps et de la case d'ajout d'une planete
+axncorps = plt.axes([0.7, 0.91, 0.22, 0.05])
+bouton_ncorps = Button(axncorps, 'N corps')
+raxplanete = plt.axes([0.7, 0.83, 0.22, 0.06], facecolor=axcolor)
+check_planete = CheckButtons(raxplanete, ['Planete'], [False])
 
 # Fonction de mise a jour du graphique
 def update(val):    
@@ -102,10 +99,12 @@ def update(val):
     e=se.val # Mise a jour de l'excentricite
     M1_val=sM1.val # Mise a jour de la masse de l'astre 1
     M2_val=sM2.val # Mise a jour de la masse de l'astre 2
-    M1_unit = activated_radio_button(radio_M1_unit,liste_unite_de_masse) # Mise a jour de l'unite de la masse de l'astre 1
-    M2_unit = activated_radio_button(radio_M2_unit,liste_unite_de_masse) # Mise a jour de l'unite de la masse de l'astre 2
+    M1_unit = radio_M1_unit.value_selected # Mise a jour de l'unite de la masse de l'astre 1
+    M2_unit = radio_M2_unit.value_selected # Mise a jour de l'unite de la masse de l'astre 2
     theta0=stheta0.val # Mise a jour de l'angle du periastre
-    x,y,x1,y1,x2,y2=trace(theta0,M1_val,M1_unit,M2_val,M2_unit,a_UA,e) # Calcul des traces 
+    tolerance=math.pow(10.0,stol.val) # Mise a jour de la tolerance
+    x,y,x1,y1,x2,y2=trace(theta0,M1_val,M1_unit,M2_val,M2_unit,a_UA,e,tolerance) # Calcul des traces 
+    info.set_text(texte_echantillonnage(e,tolerance))
     # Mise a jour des traces
     l.set_xdata(x)
     l.set_ydata(y)
@@ -113,15 +112,78 @@ def update(val):
     l1.set_ydata(y1)
     l2.set_xdata(x2)
     l2.set_ydata(y2)
-    fig.canvas.draw_idle() # On provoque la mise a jour du graphique, qui n'est pas automatique par defaut
-
-# lorsqu'une barre ou un bouton radio est modifie, on applique la fonction update
-sa.on_changed(update)
-se.on_changed(update)
-stheta0.on_changed(update)
-sM1.on_changed(update)
-sM2.on_changed(update)
-radio_M1_unit.on_clicked(update)
-radio_M2_unit.on_clicked(update)
+    # Retour au mode analytique et mise a jour des positions des astres sur une periode
+    global positions
+    arret_ncorps()
+    positions=propagation(dates*periode(M1_val,M1_unit,M2_val,M2_unit,a_UA),theta0,M1_val,M1_unit,M2_val,M2_unit,a_UA,e)
+    redessiner(fig) # On provoque la mise a jour des traces et des barres, seules redessinees
+
+# Seuls les traces, les astres, le titre et les barres sont redessines lors d'une mise a jour
+preparer(fig,[l,l1,l2,p,p1,p2,p3,info]+trajectoires)
+curseurs(fig,[stheta0,sM1,sM2,sa,se,stol])
+
+# lorsqu'une barre ou un bouton radio est modifie, on applique la fonction update, pour la derniere valeur seulement
+mise_a_jour=coalescer(fig,update)
+sa.on_changed(mise_a_jour)
+se.on_changed(mise_a_jour)
+stheta0.on_changed(mise_a_jour)
+stol.on_changed(mise_a_jour)
+sM1.on_changed(mise_a_jour)
+sM2.on_changed(mise_a_jour)
+radio_M1_unit.on_clicked(mise_a_jour)
+radio_M2_unit.on_clicked(mise_a_jour)
+
+# Lancement de l'integration N corps a partir des parametres courants, avec eventuellement une planete
+def lance_ncorps(event):
+    global simulation,historique,parametres_ncorps
+    M1_unit=radio_M1_unit.value_selected
+    M2_unit=radio_M2_unit.value_selected
+    parametres_ncorps=(stheta0.val,sa.val,se.val)
+    r,v,m=conditions_initiales(stheta0.val,sM1.val,M1_unit,sM2.val,M2_unit,sa.val,se.val)
+    if check_planete.get_status()[0]:
+        r,v,m=ajouter_astre(r,v,m,mass(1.0,'Masse terrestre'),PLANETE_A*sa.val)
+    dt=periode(sM1.val,M1_unit,sM2.val,M2_unit,sa.val)/PAS_PAR_PERIODE
+    simulation=integration(r,v,m,dt)
+    historique=np.empty((0,)+r.shape)
+
+# Arret de l'integration N corps et effacement des trajectoires
+def arret_ncorps():
+    global simulation
+    simulation=None
+    for ligne in trajectoires+[p3]:
+        ligne.set_data([],[])
+
+# Avancement d'un bloc de l'integration N corps, avec affichage de la derive de l'energie
+# et, pour deux astres, de l'ecart a l'ellipse de trace
+def anime_ncorps():
+    global historique
+    bloc,derive=next(simulation)
+    historique=np.concatenate((historique,bloc))[-HISTORIQUE:]
+    for k,ligne in enumerate(trajectoires[:bloc.shape[1]]):
+        ligne.set_data(historique[:,k,0],historique[:,k,1])
+    for k,point in enumerate((p1,p2,p3)[:bloc.shape[1]]):
+        point.set_data([bloc[-1,k,0]],[bloc[-1,k,1]])
+    relatif=bloc[-1,1]-bloc[-1,0]
+    p.set_data([relatif[0]],[relatif[1]])
+    texte="N corps : derive de l'energie {:.1e}".format(derive)
+    if bloc.shape[1]==2:
+        texte+=", ecart a l'ellipse {:.1e} a".format(ecart_trace(historique,*parametres_ncorps))
+    info.set_text(texte)
+    return(p,p1,p2,p3)
+
+bouton_ncorps.on_clicked(lance_ncorps)
+
+# Fonction d'animation : deplacement des astres a la date numero i
+def anime(i):
+    if simulation is not None:
+        return(anime_ncorps())
+    x,y,x1,y1,x2,y2=positions
+    i=i%N_IMAGES
+    p.set_data([x[i]],[y[i]])
+    p1.set_data([x1[i]],[y1[i]])
+    p2.set_data([x2[i]],[y2[i]])
+    return(p,p1,p2)
+
+animation=animer(fig,anime,40)
 
 plt.show() # On provoque l'affichage a l'ecran
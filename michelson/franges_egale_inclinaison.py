@@ -1,60 +1,148 @@
 # -*-coding:utf-8 -*
 
 """Ce programme permet d'afficher la figure d'interférence produite par un Michelson
-réglé en lame d'air.
-Il est possible de faire varier l'épaisseur de la lame d'air et la longueur d'onde de
-la source lumineuse.
+réglé en lame d'air (franges d'égale inclinaison) ou en coin d'air (franges d'égale
+épaisseur).
+Il est possible de faire varier l'épaisseur de la lame d'air, l'angle du coin d'air et la
+longueur d'onde de la source lumineuse.
+Un mode haute résolution (N_PIXELS_HR² pixels) peut être activé à l'aide d'une case à cocher.
+
+La source peut être :
+    - monochromatique ;
+    - le doublet du sodium ;
+    - une raie de profil gaussien, centrée sur la longueur d'onde choisie ;
+    - une source de lumière blanche.
+L'intensité est alors la somme incohérente des intensités de chaque longueur d'onde.
+Le rayon angulaire de la source étendue limite le champ éclairé : les franges d'égale
+inclinaison étant localisées à l'infini, l'étendue de la source ne les brouille pas.
+En coin d'air, l'écran est conjugué des miroirs, où les franges sont localisées : l'épaisseur
+est alors celle au centre du champ et l'écran en représente une largeur LARGEUR_MIROIR.
+
+Le bouton "Exporter" enregistre la figure en TAILLE_EXPORT² pixels. L'image est alors
+découpée en bandes calculées en parallèle par plusieurs threads ; au-delà de SEUIL_MEMMAP
+octets, elle est écrite dans un fichier .npy projeté en mémoire.
+
+La figure est calculée par le module physique.michelson, qui n'importe pas matplotlib. Les images
+sont conservées par position des sliders (module physique.memoire) : revenir sur une position déjà
+calculée ne coûte aucun calcul, et les positions voisines de la dernière sont calculées à l'avance
+lorsque l'interface est inactive. Les statistiques du cache sont affichées en bas de la figure.
 """
 
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider, Button, RadioButtons, CheckButtons
 
-def intensity(x, y, wavelength, epaisseur):
-    """Calcule l'intensité lumineuse.
-    Arguments :
-        - x : abscisse sur l'écran ;
-        - y : ordonnée sur l'écran ;
-        - wavelength : longueur d'onde de la source lumineuse ;
-        - epaisseur : épaisseur de la lame d'air.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from physique.michelson import sources, montages, geometrie, calcul_image, rendu_tuiles
+from physique.affichage import preparer, curseurs, coalescer, redessiner
+from physique.memoire import memoiser, positions, resume
+
+
+TAILLE_EXPORT = 4096    # nombre de pixels par côté de l'image exportée
+SEUIL_MEMMAP = 2**29    # taille (octets) au-delà de laquelle l'image exportée est projetée en mémoire
+
+
+def exporter(event):
+    """Enregistre la figure d'interférence en TAILLE_EXPORT² pixels"""
+    nom = "franges_{}".format(TAILLE_EXPORT)
+    fichier = nom + ".npy" if TAILLE_EXPORT**2 * 8 > SEUIL_MEMMAP else None
+    image = rendu_tuiles(TAILLE_EXPORT, radio_montage.value_selected, radio_source.value_selected,
+                         slider_wavelength.val, slider_epaisseur.val, slider_angle.val,
+                         slider_ouverture.val, fichier=fichier)
+    plt.imsave(nom + ".png", image, cmap=graphe.get_cmap(), vmin=0, vmax=2, origin="lower")
+
+def figure_interference(wavelength, epaisseur, angle, ouverture, haute_resolution, montage, source):
+    """Calcule l'image dans un nouveau tableau, conservé par le cache, les paramètres continus
+    (sliders) étant placés en premier
     """
-    return 1 + np.cos(2 * np.pi / wavelength * 2 * epaisseur * (1 - (x**2 + y**2)/(2 * 10**2)))
+    image = np.empty_like(geometrie(haute_resolution)[0])
+    return calcul_image(haute_resolution, montage, source, wavelength, epaisseur, angle, ouverture, out=image)
 
 def update_graphe(val):
     """Fonction de mise à jour du graphe"""
     # Mise à jour des paramètres
     wavelength = slider_wavelength.val
     epaisseur = slider_epaisseur.val
+    haute_resolution = check_resolution.get_status()[0]
+    montage = radio_montage.value_selected
+    source = radio_source.value_selected
+    angle = slider_angle.val
+    ouverture = slider_ouverture.val
 
-    # Mise à jour du graphe
-    graphe = ax.imshow(intensity(x, y, wavelength, epaisseur), interpolation="bicubic", origin="lower", extent=[-1, 1, -1, 1])
-    fig.canvas.draw_idle()
+    # Mise à jour du graphe : image conservée dans le cache, ou calculée
+    graphe.set_data(image_memoire(wavelength, epaisseur, angle, ouverture, haute_resolution, montage, source))
+    graphe.set_interpolation("antialiased" if haute_resolution else "bicubic")
+    texte_cache.set_text(resume())
+    redessiner(fig)
 
 # Initialisation des paramètres
 wavelength = 500.e-9    # longueur d'onde
 epaisseur = 1.e-5       # épaisseur de la lame d'air
-
-# Création de la grille
-x = np.linspace(-0.5, 0.5, 50)
-y = np.linspace(-0.5, 0.5, 50)
-x, y = np.meshgrid(x, y)
+angle = 2.5e-4          # angle du coin d'air (en radians)
+montage = montages[0]   # montage du Michelson
+source = sources[0]     # type de source
+ouverture = 5.          # rayon angulaire de la source (en degrés)
 
 fig, ax = plt.subplots()
-plt.subplots_adjust(bottom=0.23)
+plt.subplots_adjust(left=0.3, bottom=0.29)
 
-graphe = ax.imshow(intensity(x, y, wavelength, epaisseur), interpolation="bicubic", origin="lower", extent=[-1, 1, -1, 1])
+graphe = ax.imshow(calcul_image(False, montage, source, wavelength, epaisseur, angle, ouverture),
+                   interpolation="bicubic", origin="lower", extent=[-1, 1, -1, 1], vmin=0, vmax=2)
 fig.colorbar(graphe)
 
-# Création du slider pour modifier la résistance
+# Création du slider pour modifier la longueur d'onde
 ax_wavelength = plt.axes([0.1, 0.07, 0.65, 0.03])
 slider_wavelength = Slider(ax_wavelength, r'#lambda', 400.e-9, 750.e-9, valinit=500.e-9)
 
-# Création du slider pour modifier la capacité
+# Création du slider pour modifier l'épaisseur
 ax_epaisseur = plt.axes([0.1, 0.04, 0.65, 0.03])
 slider_epaisseur = Slider(ax_epaisseur, r'e', 1.e-5, 5.e-4, valinit=1.e-5)
 
+# Création du slider pour modifier le rayon angulaire de la source
+ax_ouverture = plt.axes([0.1, 0.10, 0.65, 0.03])
+slider_ouverture = Slider(ax_ouverture, r'#alpha', 0.5, 5., valinit=ouverture)
+
+# Création du slider pour modifier l'angle du coin d'air
+ax_angle = plt.axes([0.1, 0.13, 0.65, 0.03])
+slider_angle = Slider(ax_angle, r'#theta', 0., 1.e-3, valinit=angle)
+
+# Création des boutons radio pour choisir la source
+ax_source = plt.axes([0.02, 0.5, 0.22, 0.25], title='Source')
+radio_source = RadioButtons(ax_source, sources, active=0)
+
+# Création des boutons radio pour choisir le montage
+ax_montage = plt.axes([0.02, 0.3, 0.22, 0.12], title='Montage')
+radio_montage = RadioButtons(ax_montage, montages, active=0)
+
+# Création de la case à cocher pour le mode haute résolution
+ax_resolution = plt.axes([0.8, 0.03, 0.18, 0.08])
+check_resolution = CheckButtons(ax_resolution, ['HR'], [False])
+
+# Création du bouton d'export
+ax_export = plt.axes([0.8, 0.12, 0.18, 0.05])
+bouton_export = Button(ax_export, 'Exporter')
+bouton_export.on_clicked(exporter)
+
+# Images conservées par position des sliders, et statistiques du cache
+grilles = [positions(slider_wavelength), positions(slider_epaisseur), positions(slider_angle),
+           positions(slider_ouverture), None, None, None]
+image_memoire = memoiser('michelson', figure_interference, grilles)
+texte_cache = fig.text(0.01, 0.005, resume(), fontsize=8, color='gray')
+
+# Mise à jour rapide : seuls l'image et les sliders sont redessinés, pour la dernière position
+preparer(fig, [graphe, texte_cache])
+curseurs(fig, [slider_wavelength, slider_epaisseur, slider_ouverture, slider_angle])
+update = coalescer(fig, update_graphe)
+
 # Mise à jour du graphe lors d'un changement de paramètre
-slider_wavelength.on_changed(update_graphe)
-slider_epaisseur.on_changed(update_graphe)
+slider_wavelength.on_changed(update)
+slider_epaisseur.on_changed(update)
+slider_ouverture.on_changed(update)
+slider_angle.on_changed(update)
+radio_source.on_clicked(update)
+radio_montage.on_clicked(update)
+check_resolution.on_clicked(update)
 
-plt.show()
\ No newline at end of file
+plt.show()
@@ -0,0 +1,343 @@
+# -*-coding:utf-8 -*
+
+"""Mesure des performances des noyaux de calcul et du temps de mise à jour des démonstrations.
+
+Deux séries de mesures sont faites, sans fenêtre (moteur Agg de matplotlib) :
+    - les noyaux du paquet physique (NOYAUX), pour des tailles de 10³ à 10⁷ valeurs : nombre de
+      fréquences pour les fonctions de transfert, de points de l'orbite pour le tracé de Kepler
+      (la tolérance est choisie pour obtenir ce nombre), de pixels de l'écran du Michelson,
+      d'instants pour la cinétique et d'échantillons pour les battements ;
+    - le cycle complet d'une démonstration (CURSEURS) : déplacement d'un slider, calcul et tracé
+      de la figure, sur N_POSITIONS positions successives. Le programme est exécuté tel quel, un
+      premier tracé complet préparant la copie de l'arrière-plan. Le balayage des positions est
+      mesuré deux fois : les résultats calculés (cache du module physique.memoire vidé avant
+      chaque balayage) puis lus dans le cache ; le calcul anticipé est désactivé. Chaque passage
+      est aussi mesuré sans tracé (clés « sans tracé ») : la fonction redessiner du programme est
+      alors remplacée par une fonction vide, ce qui isole le calcul de la mise à jour, seul
+      concerné par le cache.
+Chaque mesure est répétée jusqu'à durer DUREE_MIN secondes, au moins REPETITIONS_MIN fois, après
+un premier appel non mesuré (pour un cycle, une répétition est un balayage, dont la durée est
+rapportée à une position) ; la médiane et le minimum des durées sont conservés. La vitesse d'une
+machine partagée varie sur quelques secondes : la série complète est parcourue TOURS fois, les
+mesures d'une même quantité étant ainsi espacées, et le plus petit des minimums est conservé.
+
+Utilisation :
+    python performances/performances.py
+    python performances/performances.py --tailles 3:5 --noyaux michelson.intensity kepler.trace
+    python performances/performances.py --enregistrer-reference
+
+Les résultats sont écrits dans un fichier JSON (--sortie), avec la description de la machine.
+Ils sont comparés à ceux du fichier de référence (REFERENCE), par les minimums : le minimum des
+répétitions, qui écarte les interruptions par le système, varie bien moins d'une exécution à
+l'autre que la médiane. Pour chaque mesure commune, le rapport des minimums est divisé par le
+rapport médian de toutes les mesures, qui traduit la vitesse de la machine au moment de
+l'exécution (un ralentissement uniforme de toutes les mesures n'est donc pas signalé). Une mesure
+est signalée comme régression (code de retour 1) si ce rapport corrigé dépasse 1 + tolérance et
+si l'écart dépasse ECART_MIN secondes, en deçà duquel les durées les plus courtes ne sont pas
+significatives. La tolérance est SEUIL_REGRESSION pour toutes les mesures : elle ne dépend pas du
+bruit observé, qui sur une machine partagée rendrait les mesures bruitées insensibles à des
+ralentissements de plusieurs fois. Les régressions sont confirmées : les mesures signalées sont
+refaites TOURS fois, et ne restent signalées que si leur nouveau minimum dépasse encore le seuil,
+jusqu'à CONFIRMATIONS fois ; un ralentissement passager de la machine ne produit ainsi pas de
+régression. La référence est
+enregistrée de la même façon (plus petit des minimums des tours) ; elle doit l'être sur une machine
+peu chargée.
+--enregistrer-reference remplace la référence par les nouveaux résultats.
+"""
+
+import os
+import sys
+import json
+import time
+import runpy
+import inspect
+import platform
+import argparse
+import statistics
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, RACINE)
+from physique import circuit_rc, circuit_rlc, battements, michelson, kepler, cinetique, memoire
+
+
+TAILLES = [10**3, 10**4, 10**5, 10**6, 10**7]
+DUREE_MIN = 0.2                 # durée minimale (s) de la série de répétitions d'une mesure
+REPETITIONS_MIN = 3             # nombre minimal de répétitions d'une mesure
+N_POSITIONS = 20                # nombre de positions du slider pour le cycle d'une démonstration
+SEUIL_REGRESSION = 0.2          # augmentation relative du minimum signalée comme régression
+TOURS = 3                       # nombre de tours de la série complète de mesures
+CONFIRMATIONS = 2               # nombre de confirmations successives des régressions
+ECART_MIN = 5.e-5               # augmentation (s) en deçà de laquelle une mesure n'est pas une régression
+REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reference.json')
+FREQUENCE_ECHANTILLONNAGE = 44100
+
+# Démonstration -> programme, slider déplacé et bornes du déplacement
+CURSEURS = {
+    'circuit-RC': ('circuit-RC/circuit-RC.py', 'slider_resistance', (2., 4.)),
+    'circuit-RLC': ('circuit-RLC/circuit-RLC.py', 'slider_capacity', (-8.5, -6.5)),
+    'battements': ('battements/battements.py', 's_frequence2', (440., 460.)),
+    'michelson': ('michelson/franges_egale_inclinaison.py', 'slider_epaisseur', (1.e-5, 1.e-4)),
+    'kepler': ('kepler/kepler.py', 'se', (0.1, 0.8)),
+    'cinetique': ('cinetique/cinetique.py', 'slider_cste_vitesse', (0.02, 0.2)),
+}
+
+
+def mesure(fonction, duree_min=DUREE_MIN, repetitions_min=REPETITIONS_MIN):
+    """Renvoie la médiane et le minimum (s) des durées d'exécution de fonction, appelée sans argument"""
+    fonction()
+    durees = []
+    debut = time.perf_counter()
+    while len(durees) < repetitions_min or time.perf_counter() - debut < duree_min:
+        t = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - t)
+    return {'mediane': statistics.median(durees), 'minimum': min(durees), 'repetitions': len(durees)}
+
+
+def noyau_rc(n):
+    """Fonction de transfert du circuit RC sur n fréquences"""
+    omega = 2*np.pi * np.logspace(1, 8, n)
+    return lambda: circuit_rc.transfer_function(omega, 1.e-5)
+
+def noyau_rc_bode(n):
+    """Diagramme de Bode du circuit RC sur n fréquences, calculé en place (mise à jour d'un slider)"""
+    travail = circuit_rc.espace_travail(np.logspace(1, 8, n), np.linspace(0, 5.e-4, 2), 1.e4)
+    return lambda: circuit_rc.bode(travail, 1.e-5)
+
+def noyau_rlc(n):
+    """Fonction de transfert du circuit RLC (passe-bande) sur n fréquences"""
+    omega = 2*np.pi * np.logspace(1, 8, n)
+    omega_0, quality_factor = circuit_rlc.parametres_filtre(100, 1.e-7, 1.e-3)
+    return lambda: circuit_rlc.transfer_function(omega, omega_0, quality_factor)
+
+def noyau_rlc_reponse(n):
+    """Réponse du circuit RLC sur n fréquences, par la table ou directement (mise à jour d'un slider)"""
+    travail = circuit_rlc.espace_travail(np.logspace(1, 8, n), np.linspace(0, 5.e-4, 2), 1.e4)
+    omega_0, quality_factor = circuit_rlc.parametres_filtre(100, 1.e-7, 1.e-3)
+    return lambda: circuit_rlc.reponse(travail, omega_0, quality_factor, 'Passe-bande')
+
+def noyau_kepler(n):
+    """Tracé d'une orbite de Kepler d'environ n points : le nombre de points varie comme
+    tolerance^(-1/2), la tolérance est déduite de celui obtenu pour TOLERANCE
+    """
+    n_reference = len(kepler.echantillonnage(0.5))
+    tolerance = kepler.TOLERANCE * (n_reference / n)**2
+    return lambda: kepler.trace(0., 1., 'Masse solaire', 1., 'Masse terrestre', 1., 0.5, tolerance)
+
+def noyau_michelson(n):
+    """Intensité en lame d'air sur un écran d'environ n pixels"""
+    cote = int(round(np.sqrt(n)))
+    x = np.linspace(-0.5, 0.5, cote)
+    return lambda: michelson.intensity(x[np.newaxis, :], x[:, np.newaxis], 500.e-9, 1.e-4)
+
+def noyau_cinetique(n):
+    """Concentration d'une réaction d'ordre 1.5 en n instants"""
+    temps = np.linspace(0, 100, n)
+    return lambda: cinetique.calcul_concentration(1., temps, 0.05, 1.5)
+
+def noyau_battements(n):
+    """Deux signaux, leur somme et l'enveloppe en n instants"""
+    temps = np.linspace(0, 1., n)
+    return lambda: battements.signaux(temps, 440., 450.)
+
+def noyau_flux_battements(n):
+    """Production de n échantillons de la somme par les oscillateurs à phase continue"""
+    def synthese():
+        flux = battements.signal_battements(lambda: (440., 450.), FREQUENCE_ECHANTILLONNAGE)
+        for _ in range(-(-n // battements.TAILLE_BLOC)):
+            next(flux)
+    return synthese
+
+NOYAUX = {
+    'circuit_rc.transfer_function': noyau_rc,
+    'circuit_rc.bode': noyau_rc_bode,
+    'circuit_rlc.transfer_function': noyau_rlc,
+    'circuit_rlc.reponse': noyau_rlc_reponse,
+    'kepler.trace': noyau_kepler,
+    'michelson.intensity': noyau_michelson,
+    'cinetique.calcul_concentration': noyau_cinetique,
+    'battements.signaux': noyau_battements,
+    'battements.signal_battements': noyau_flux_battements,
+}
+
+
+def fusion(series):
+    """Réunit les mesures d'une même quantité faites à plusieurs tours : médiane des médianes,
+    minimum des minimums et nombre total de répétitions
+    """
+    return {'mediane': statistics.median(m['mediane'] for m in series),
+            'minimum': min(m['minimum'] for m in series),
+            'repetitions': sum(m['repetitions'] for m in series)}
+
+def mesure_noyaux(noms, tailles, tours=TOURS):
+    """Mesure chaque noyau à chaque taille, à chacun des tours"""
+    series = {}
+    for _ in range(tours):
+        for nom in noms:
+            for n in tailles:
+                series.setdefault(nom, {}).setdefault(str(n), []).append(mesure(NOYAUX[nom](n)))
+    resultats = {nom: {n: fusion(s) for n, s in tailles_nom.items()} for nom, tailles_nom in series.items()}
+    for nom, tailles_nom in resultats.items():
+        for n, duree in tailles_nom.items():
+            print("{:32s} {:>18s} {:10.3f} ms".format(nom, n, 1000 * duree['minimum']))
+    return resultats
+
+def cycle(demo, n_positions=N_POSITIONS):
+    """Mesure la durée de la mise à jour d'une démonstration (slider, calcul et tracé) par position
+    du slider, pour n_positions positions calculées puis lues dans le cache, avec et sans tracé
+    """
+    chemin, nom_curseur, (debut, fin) = CURSEURS[demo]
+    chemin = os.path.join(RACINE, chemin)
+    argv, show, voisinage = sys.argv, plt.show, memoire.VOISINAGE
+    sys.argv = [chemin]
+    plt.show = lambda *args, **kwargs: None
+    memoire.VOISINAGE = 0       # pas de calcul anticipé pendant les mesures
+    try:
+        programme = runpy.run_path(chemin, run_name='__demo__')
+        # espace de noms où les fonctions du programme trouvent redessiner (run_path renvoie une copie)
+        espace = next(f.__globals__ for f in programme.values()
+                      if inspect.isfunction(f) and f.__module__ == '__demo__')
+        curseur = programme[nom_curseur]
+        curseur.ax.figure.canvas.draw()
+        valeurs = np.linspace(debut, fin, n_positions)
+
+        def balayage(vidage):
+            """Parcourt les positions du slider, le cache étant d'abord vidé si vidage est vrai"""
+            if vidage:
+                memoire.vider()
+            for valeur in valeurs:
+                curseur.set_val(valeur)
+
+        resultats = {}
+        for trace in (True, False):
+            espace['redessiner'] = programme['redessiner'] if trace else lambda *args, **kwargs: None
+            for passage in ('calcul', 'cache'):
+                duree = mesure(lambda: balayage(passage == 'calcul'))
+                resultats[passage if trace else passage + ' sans tracé'] = {
+                    'mediane': duree['mediane'] / n_positions, 'minimum': duree['minimum'] / n_positions,
+                    'repetitions': duree['repetitions']}
+        espace['redessiner'] = programme['redessiner']
+    finally:
+        plt.close('all')
+        sys.argv, plt.show, memoire.VOISINAGE = argv, show, voisinage
+    return resultats
+
+def mesure_cycles(demos, tours=TOURS):
+    """Mesure le cycle de mise à jour de chaque démonstration, à chacun des tours"""
+    series = {}
+    for _ in range(tours):
+        for demo in demos:
+            for cle, duree in cycle(demo).items():
+                series.setdefault(demo, {}).setdefault(cle, []).append(duree)
+    resultats = {demo: {cle: fusion(s) for cle, s in cles.items()} for demo, cles in series.items()}
+    for demo, cles in resultats.items():
+        for cle, duree in cles.items():
+            print("{:32s} {:>18s} {:10.3f} ms".format(demo, cle, 1000 * duree['minimum']))
+    return resultats
+
+def machine():
+    """Décrit la machine et les versions utilisées"""
+    return {
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'systeme': platform.platform(),
+        'processeur': platform.processor() or platform.machine(),
+        'coeurs': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'matplotlib': matplotlib.__version__,
+    }
+
+def mesures(resultats):
+    """Renvoie les minimums d'un fichier de résultats, indexés par (série, nom, taille ou passage)"""
+    return {(serie, nom, cle): valeur['minimum']
+            for serie in ('noyaux', 'cycles') for nom, tailles in resultats.get(serie, {}).items()
+            for cle, valeur in tailles.items()}
+
+def comparaison(resultats, reference, seuil=SEUIL_REGRESSION, ecart_min=ECART_MIN):
+    """Compare les minimums aux mesures communes de la référence. Renvoie la liste des
+    comparaisons (série, nom, taille ou passage, minimum, minimum de référence, rapport corrigé de
+    la vitesse de la machine, régression)
+    """
+    nouvelles, anciennes = mesures(resultats), mesures(reference)
+    communes = [cle for cle in nouvelles if cle in anciennes]
+    if not communes:
+        return []
+    vitesse = statistics.median(nouvelles[cle] / anciennes[cle] for cle in communes)
+    comparaisons = []
+    for serie, nom, cle in communes:
+        minimum, ancien = nouvelles[serie, nom, cle], anciennes[serie, nom, cle]
+        rapport = minimum / (vitesse * ancien)
+        comparaisons.append({'serie': serie, 'nom': nom, 'cle': cle, 'minimum': minimum, 'reference': ancien,
+                             'vitesse': vitesse, 'rapport': rapport,
+                             'regression': rapport > 1 + seuil and minimum - vitesse * ancien > ecart_min})
+    return comparaisons
+
+def confirmation(resultats, comparaisons, tours=TOURS):
+    """Mesure de nouveau, tours fois, les quantités signalées comme régressions, et réunit ces
+    mesures aux résultats (le minimum ne peut que baisser). Comme pour la série complète, chaque
+    tour parcourt toutes les quantités signalées, dont les mesures sont ainsi espacées.
+    """
+    signalees = [c for c in comparaisons if c['regression']]
+    series = {id(c): [resultats[c['serie']][c['nom']][c['cle']]] for c in signalees}
+    for _ in range(tours):
+        for c in signalees:
+            if c['serie'] == 'noyaux':
+                series[id(c)].append(mesure(NOYAUX[c['nom']](int(c['cle']))))
+            else:
+                series[id(c)].append(cycle(c['nom'])[c['cle']])
+    for c in signalees:
+        resultats[c['serie']][c['nom']][c['cle']] = fusion(series[id(c)])
+
+def affichage(comparaisons):
+    """Affiche les comparaisons à la référence"""
+    if comparaisons:
+        print("Rapport médian des durées (vitesse de la machine) : {:.2f}".format(comparaisons[0]['vitesse']))
+    for c in comparaisons:
+        print("{:32s} {:>18s} {:10.3f} ms {:10.3f} ms  x{:5.2f}{}".format(
+            c['nom'], c['cle'], 1000 * c['minimum'], 1000 * c['reference'], c['rapport'],
+            "  RÉGRESSION" if c['regression'] else ""))
+
+if __name__ == '__main__':
+    analyse = argparse.ArgumentParser(description="Mesure des performances des noyaux et des démonstrations")
+    analyse.add_argument('--noyaux', nargs='*', choices=list(NOYAUX), default=list(NOYAUX))
+    analyse.add_argument('--demos', nargs='*', choices=list(CURSEURS), default=list(CURSEURS))
+    analyse.add_argument('--tailles', default='3:7', help="exposants de 10 des tailles, debut:fin")
+    analyse.add_argument('--sortie', default='performances.json', help="fichier JSON des résultats")
+    analyse.add_argument('--reference', default=REFERENCE, help="fichier JSON de référence")
+    analyse.add_argument('--tours', type=int, default=TOURS, help="nombre de tours de la série de mesures")
+    analyse.add_argument('--seuil', type=float, default=SEUIL_REGRESSION, help="augmentation relative tolérée")
+    analyse.add_argument('--enregistrer-reference', action='store_true', help="remplace la référence par les résultats")
+    arguments = analyse.parse_args()
+
+    debut, _, fin = arguments.tailles.partition(':')
+    tailles = [10**i for i in range(int(debut), int(fin or debut) + 1)]
+    resultats = {'machine': machine(), 'noyaux': mesure_noyaux(arguments.noyaux, tailles, arguments.tours),
+                 'cycles': mesure_cycles(arguments.demos, arguments.tours)}
+
+    regressions = []
+    if os.path.exists(arguments.reference) and not arguments.enregistrer_reference:
+        with open(arguments.reference, encoding='utf-8') as fichier:
+            reference = json.load(fichier)
+        resultats['comparaison'] = comparaison(resultats, reference, arguments.seuil)
+        for _ in range(CONFIRMATIONS):
+            signalees = sum(c['regression'] for c in resultats['comparaison'])
+            if not signalees:
+                break
+            print("\nConfirmation de {} régressions".format(signalees))
+            confirmation(resultats, resultats['comparaison'], arguments.tours)
+            resultats['comparaison'] = comparaison(resultats, reference, arguments.seuil)
+        print("\nComparaison à {} ({}) :".format(arguments.reference, reference['machine']['date']))
+        affichage(resultats['comparaison'])
+        regressions = [c for c in resultats['comparaison'] if c['regression']]
+        print("{} mesures comparées, {} régressions (seuil {:.0%})".format(
+            len(resultats['comparaison']), len(regressions), arguments.seuil))
+
+    chemin = arguments.reference if arguments.enregistrer_reference else arguments.sortie
+    with open(chemin, 'w', encoding='utf-8') as fichier:
+        json.dump(resultats, fichier, indent=1, ensure_ascii=False)
+    print("Résultats enregistrés dans {}".format(chemin))
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,8 @@
+# -*-coding:utf-8 -*
+
+"""Moteurs de calcul partagés par les programmes de démonstration.
+Ces modules ne dépendent que de NumPy : ils n'ouvrent aucune fenêtre et peuvent être
+importés par des programmes de calcul ou de test. Les noyaux de chaque démonstration
+(circuit_rc, circuit_rlc, battements, michelson, kepler, cinetique) y sont regroupés :
+seuls les programmes interactifs, qui n'en sont que l'interface, importent matplotlib.
+"""
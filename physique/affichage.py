@@ -0,0 +1,136 @@
+# -*-coding:utf-8 -*
+
+"""Mise à jour rapide des figures interactives : copie d'arrière-plan (blitting) et regroupement
+des événements des widgets.
+
+Lorsqu'un slider bouge, seules quelques courbes changent ; redessiner toute la figure (axes,
+graduations, barres de couleur, widgets) coûte bien plus cher que les recalculer. Les artistes
+dynamiques d'une figure, déclarés par preparer(), sont exclus du tracé complet (animated=True) :
+à chaque tracé complet, la figure sans eux est copiée comme arrière-plan. Une mise à jour
+(redessiner) restaure cet arrière-plan, trace les seuls artistes dynamiques et transmet l'image à
+l'écran. Un tracé complet n'est demandé que si la partie statique change (limites d'un axe,
+légende), si la taille de la figure a changé ou si le moteur graphique ne sait pas copier
+l'arrière-plan. Les widgets déclarés par curseurs() ne provoquent plus de tracé complet : leur axe
+est un artiste dynamique.
+
+Un glissement rapide d'un slider produit un événement par déplacement de la souris. La fonction
+renvoyée par coalescer() remplace la fonction de mise à jour auprès des widgets : elle ne fait que
+noter la dernière valeur et programmer un calcul unique, au plus tôt INTERVALLE_MINIMAL ms après le
+précédent. Les valeurs intermédiaires reçues entre-temps sont abandonnées : seule la dernière est
+calculée. Sans boucle d'événements (moteur Agg, programme de calcul), la mise à jour est appelée
+immédiatement.
+
+Comme physique.decimation, le module n'importe pas matplotlib : il n'utilise que les objets qui
+lui sont transmis.
+"""
+
+import time
+
+
+INTERVALLE_MINIMAL = 1000 / 60  # durée minimale (ms) entre deux calculs d'une même mise à jour
+
+figures = {}    # figure -> artistes dynamiques et arrière-plan
+
+
+def etat_figure(figure):
+    """Renvoie l'état d'une figure, créé lors du premier appel"""
+    if figure not in figures:
+        figures[figure] = {'artistes': [], 'fond': None, 'bornes': None, 'canvas': figure.canvas}
+        figure.canvas.mpl_connect('draw_event', capture)
+    return figures[figure]
+
+def preparer(figure, artistes):
+    """Déclare des artistes dynamiques d'une figure, qui ne sont plus tracés qu'à la demande"""
+    etat = etat_figure(figure)
+    for artiste in artistes:
+        artiste.set_animated(True)
+        etat['artistes'].append(artiste)
+
+def curseurs(figure, widgets):
+    """Déclare des widgets (sliders, boutons) dont le changement de valeur ne doit plus provoquer
+    de tracé complet de la figure : leur axe devient un artiste dynamique
+    """
+    for widget in widgets:
+        widget.drawon = False
+    preparer(figure, [widget.ax for widget in widgets])
+
+def capture(event):
+    """Après un tracé complet, copie l'arrière-plan puis y trace les artistes dynamiques.
+    Lors d'un enregistrement (savefig), seuls les artistes dynamiques sont tracés : l'image
+    enregistrée est complète et l'arrière-plan de l'écran n'est pas modifié.
+    """
+    figure = event.canvas.figure
+    etat = figures[figure]
+    if event.canvas is etat['canvas'] and event.canvas.supports_blit:
+        etat['fond'] = event.canvas.copy_from_bbox(figure.bbox)
+        etat['bornes'] = figure.bbox.bounds
+    for artiste in etat['artistes']:
+        artiste.draw(event.renderer)
+
+def redessiner(figure, complet=False):
+    """Met à jour l'affichage d'une figure : artistes dynamiques seuls sur l'arrière-plan copié, ou
+    tracé complet si complet est vrai ou si l'arrière-plan n'est pas utilisable
+    """
+    etat = figures.get(figure)
+    canvas = figure.canvas
+    if (complet or etat is None or etat['fond'] is None or canvas is not etat['canvas']
+            or etat['bornes'] != figure.bbox.bounds):
+        if etat is not None:
+            etat['fond'] = None     # pas de copie tant que le tracé complet n'a pas eu lieu
+        canvas.draw_idle()
+        return
+    canvas.restore_region(etat['fond'])
+    for artiste in etat['artistes']:
+        figure.draw_artist(artiste)
+    canvas.blit(figure.bbox)
+
+def boucle_evenements(minuterie):
+    """Indique si une minuterie est gérée par une boucle d'événements (moteur interactif).
+    La minuterie de base, renvoyée par les moteurs sans fenêtre, ne se déclenche jamais.
+    """
+    return type(minuterie).__name__ != 'TimerBase'
+
+def coalescer(figure, fonction, intervalle=INTERVALLE_MINIMAL):
+    """Renvoie une fonction à connecter aux widgets à la place de fonction : chaque appel note la
+    valeur reçue, et fonction n'est appelée qu'une fois, avec la dernière valeur, au plus tôt
+    intervalle ms après l'appel précédent
+    """
+    minuterie = figure.canvas.new_timer()
+    if not boucle_evenements(minuterie):
+        return fonction
+    minuterie.single_shot = True
+    etat = {'valeur': None, 'en_attente': False, 'dernier': float('-inf')}
+
+    def execution():
+        """Calcule la mise à jour pour la dernière valeur reçue"""
+        etat['en_attente'] = False
+        etat['dernier'] = time.perf_counter()
+        fonction(etat['valeur'])
+
+    def rappel(valeur):
+        """Note la valeur et programme le calcul s'il ne l'est pas déjà"""
+        etat['valeur'] = valeur
+        if not etat['en_attente']:
+            etat['en_attente'] = True
+            attente = intervalle - 1000 * (time.perf_counter() - etat['dernier'])
+            minuterie.start(max(0, int(attente)))
+
+    minuterie.add_callback(execution)
+    return rappel
+
+def animer(figure, fonction, intervalle):
+    """Appelle fonction(i), i = 0, 1, 2, ..., toutes les intervalle ms, puis met à jour les artistes
+    dynamiques de la figure. Renvoie la minuterie, dont une référence doit être conservée.
+    """
+    minuterie = figure.canvas.new_timer(interval=intervalle)
+    compteur = {'i': 0}
+
+    def image():
+        """Calcule l'image suivante et l'affiche"""
+        fonction(compteur['i'])
+        compteur['i'] += 1
+        redessiner(figure)
+
+    minuterie.add_callback(image)
+    minuterie.start()
+    return minuterie
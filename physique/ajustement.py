@@ -0,0 +1,201 @@
+# -*-coding:utf-8 -*
+
+"""Ajustement de la loi de vitesse dC/dt = - k C^n à des mesures de concentration.
+
+Pour chaque série de mesures, la concentration initiale C_0, la constante de vitesse k et l'ordre
+réel n sont estimés en deux temps :
+    - une recherche sur une grille dense (ordre, constante de vitesse) : la constante de vitesse
+      est parcourue sous forme réduite k C_0^(n-1) T (T : durée des mesures), si bien que les
+      courbes C / C_0 de la grille sont communes à toutes les séries et calculées une seule fois
+      (broadcasting). L'écart quadratique de chaque série à chaque point de la grille, C_0 étant
+      optimal, est obtenu par produits matriciels ; le meilleur point est retenu ;
+    - un affinage par moindres carrés (méthode de Levenberg-Marquardt) mené simultanément sur toutes
+      les séries, sur les paramètres (ln C_0, ln k, n). Les dérivées par rapport à C_0 et à k sont
+      exactes : ∂C/∂C_0 = (C / C_0)^n et ∂C/∂k = - t C^n.
+Les mesures manquantes (cases vides du fichier) sont ignorées.
+
+Les mesures sont lues dans un fichier CSV : la première colonne contient les dates (s), chacune
+des suivantes une série de concentrations (mol/L) ; une ligne d'en-tête donne éventuellement le nom
+des séries. Le séparateur est la virgule, ou le point-virgule, la virgule étant alors le séparateur
+décimal.
+
+Exécuter ce module (python -m physique.ajustement mesures.csv) ajuste toutes les séries d'un
+fichier et écrit les résultats dans mesures_ajustement.csv ; sans argument, il ajuste des séries
+simulées et compare les paramètres obtenus aux vrais.
+"""
+
+import io
+import os
+import sys
+import time
+import numpy as np
+
+from physique.cinetique import concentration_exacte, temps_demi_reaction
+
+
+ORDRE_MAX = 3.                                  # ordre maximal recherché
+ORDRES_GRILLE = np.linspace(0, ORDRE_MAX, 61)   # ordres de la grille
+K_REDUITS = np.logspace(-2, 2, 81)              # constantes de vitesse réduites k C_0^(n-1) T de la grille
+MEMOIRE_BLOC = 2**22                            # nombre d'écarts (séries × grille) calculés simultanément
+N_ITERATIONS = 30                               # nombre d'itérations de Levenberg-Marquardt
+AMORTISSEMENT = 1.e-3                           # amortissement initial de Levenberg-Marquardt
+DELTA_ORDRE = 1.e-6                             # pas de la dérivée numérique par rapport à l'ordre
+
+
+def lecture_csv(chemin):
+    """Lit un fichier de mesures. Renvoie les dates (T,), les concentrations (séries, T) et les
+    noms des séries
+    """
+    with open(chemin, encoding='utf-8') as fichier:
+        texte = fichier.read()
+    separateur = ';' if ';' in texte.splitlines()[0] else ','
+    if separateur == ';':
+        texte = texte.replace(',', '.')
+    premiere = texte.splitlines()[0].split(separateur)
+    try:
+        [float(x) for x in premiere if x.strip()]
+        entete = False
+    except ValueError:
+        entete = True
+    tableau = np.atleast_2d(np.genfromtxt(io.StringIO(texte), delimiter=separateur, skip_header=int(entete)))
+    if tableau.shape[1] < 2:
+        raise ValueError("{} : il faut une colonne de dates et au moins une série".format(chemin))
+    noms = ([x.strip() for x in premiere[1:]] if entete
+            else ['série {}'.format(i + 1) for i in range(tableau.shape[1] - 1)])
+    return tableau[:, 0], tableau[:, 1:].T, noms
+
+def ecriture_csv(chemin, noms, resultat):
+    """Écrit les paramètres ajustés des séries dans un fichier CSV"""
+    colonnes = ['concentration_initiale', 'cste_vitesse', 'ordre', 'temps_demi_reaction', 'ecart_type']
+    with open(chemin, 'w', encoding='utf-8') as fichier:
+        fichier.write(','.join(['serie'] + colonnes) + '\n')
+        for i, nom in enumerate(noms):
+            fichier.write(','.join([nom] + ['{:.6g}'.format(resultat[c][i]) for c in colonnes]) + '\n')
+
+def courbes_reduites(temps):
+    """Renvoie les courbes C / C_0 de la grille, de forme (ordres × constantes réduites, T)"""
+    duree = np.max(temps) - np.min(temps)
+    courbes = concentration_exacte(1., temps, K_REDUITS[np.newaxis, :, np.newaxis] / duree,
+                                   ORDRES_GRILLE[:, np.newaxis, np.newaxis])
+    return courbes.reshape(-1, len(temps))
+
+def recherche_grille(temps, mesures, poids):
+    """Renvoie, pour chaque série, la concentration initiale, la constante de vitesse et l'ordre du
+    point de la grille le plus proche des mesures (au sens des moindres carrés).
+    À ordre et constante réduite fixés, la courbe C_0 g(t) est proportionnelle à C_0, dont la valeur
+    optimale est Σ g y / Σ g² : l'écart quadratique de tous les points de la grille se déduit de
+    deux produits matriciels (mesures × courbes).
+    """
+    courbes = courbes_reduites(temps)
+    taille_bloc = max(1, MEMOIRE_BLOC // len(courbes))
+    indices = np.empty(len(mesures), dtype=int)
+    concentration_initiale = np.empty(len(mesures))
+    for debut in range(0, len(mesures), taille_bloc):
+        bloc = slice(debut, debut + taille_bloc)
+        produits = (poids[bloc] * mesures[bloc]) @ courbes.T
+        normes = poids[bloc] @ (courbes**2).T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gains = np.where(normes > 0, produits**2 / normes, 0)
+        indices[bloc] = np.argmax(gains, axis=1)    # écart minimal : Σ y² - (Σ g y)² / Σ g²
+        lignes = np.arange(len(indices[bloc]))
+        concentration_initiale[bloc] = produits[lignes, indices[bloc]] / normes[lignes, indices[bloc]]
+    i, j = np.unravel_index(indices, (len(ORDRES_GRILLE), len(K_REDUITS)))
+    concentration_initiale = np.maximum(concentration_initiale, 1.e-12)
+    ordre = ORDRES_GRILLE[i]
+    duree = np.max(temps) - np.min(temps)
+    return concentration_initiale, K_REDUITS[j] / (duree * concentration_initiale**(ordre - 1)), ordre
+
+def modele(parametres, temps):
+    """Renvoie les concentrations (séries, T) et leurs dérivées par rapport aux paramètres
+    (ln C_0, ln k, n), de forme (séries, T, 3)
+    """
+    c0 = np.exp(parametres[:, :1])
+    k = np.exp(parametres[:, 1:2])
+    n = parametres[:, 2:]
+    c = concentration_exacte(c0, temps, k, n)
+    # dérivée numérique décentrée vers l'intérieur de [0, ORDRE_MAX]
+    delta = np.where(n + DELTA_ORDRE > ORDRE_MAX, -DELTA_ORDRE, DELTA_ORDRE)
+    derivees = np.stack((c0 * (c / c0)**n, -k * temps * c**n,
+                         (concentration_exacte(c0, temps, k, n + delta) - c) / delta), axis=2)
+    return c, derivees
+
+def ajustement(temps, mesures):
+    """Ajuste la loi de vitesse à un lot de séries de mesures.
+    Arguments :
+        - temps : dates des mesures (T,) ;
+        - mesures : concentrations mesurées (séries, T), nan pour une mesure manquante.
+    Renvoie un dictionnaire de tableaux (séries,) : 'concentration_initiale', 'cste_vitesse',
+    'ordre', 'temps_demi_reaction', 'ecart_type' (écart quadratique moyen), et les résidus
+    'residus' (séries, T).
+    """
+    temps = np.asarray(temps, dtype=float)
+    mesures = np.atleast_2d(np.asarray(mesures, dtype=float))
+    poids = np.isfinite(mesures).astype(float)
+    mesures = np.where(poids > 0, mesures, 0)
+
+    concentration_initiale, cste_vitesse, ordre = recherche_grille(temps, mesures, poids)
+    parametres = np.column_stack((np.log(concentration_initiale), np.log(cste_vitesse), ordre))
+    c, derivees = modele(parametres, temps)
+    ecarts = np.sum(poids * (mesures - c)**2, axis=1)
+    amortissement = np.full(len(mesures), AMORTISSEMENT)
+    for _ in range(N_ITERATIONS):
+        j = derivees * poids[:, :, np.newaxis]
+        jtj = np.einsum('mti,mtj->mij', j, j)
+        gradient = np.einsum('mti,mt->mi', j, mesures - c)
+        diagonale = np.einsum('mii->mi', jtj)
+        systeme = jtj + (amortissement[:, np.newaxis] * (diagonale + 1.e-12))[:, :, np.newaxis] * np.eye(3)
+        with np.errstate(invalid='ignore'):
+            increment = np.linalg.solve(systeme, gradient[:, :, np.newaxis])[:, :, 0]
+        essai = parametres + np.nan_to_num(increment)
+        essai[:, 2] = np.clip(essai[:, 2], 0, ORDRE_MAX)
+        c_essai, derivees_essai = modele(essai, temps)
+        ecarts_essai = np.sum(poids * (mesures - c_essai)**2, axis=1)
+        meilleurs = ecarts_essai < ecarts
+        parametres[meilleurs] = essai[meilleurs]
+        c[meilleurs], derivees[meilleurs], ecarts[meilleurs] = c_essai[meilleurs], derivees_essai[meilleurs], ecarts_essai[meilleurs]
+        amortissement = np.where(meilleurs, amortissement / 3, amortissement * 10)
+
+    concentration_initiale, cste_vitesse, ordre = np.exp(parametres[:, 0]), np.exp(parametres[:, 1]), parametres[:, 2]
+    residus = np.where(poids > 0, mesures - c, np.nan)
+    return {
+        'concentration_initiale': concentration_initiale,
+        'cste_vitesse': cste_vitesse,
+        'ordre': ordre,
+        'temps_demi_reaction': temps_demi_reaction(concentration_initiale, cste_vitesse, ordre),
+        'ecart_type': np.sqrt(ecarts / np.maximum(np.sum(poids, axis=1), 1)),
+        'residus': residus,
+    }
+
+def series_simulees(n_series, temps, bruit=0.01, graine=0):
+    """Renvoie des séries de mesures simulées (bruit gaussien d'écart-type bruit C_0) et leurs
+    paramètres (concentration initiale, constante de vitesse, ordre)
+    """
+    generateur = np.random.default_rng(graine)
+    c0 = generateur.uniform(0.2, 1., n_series)
+    ordre = generateur.uniform(0, ORDRE_MAX, n_series)
+    k = generateur.uniform(0.5, 3., n_series) / ((temps[-1] - temps[0]) * c0**(ordre - 1))
+    c = concentration_exacte(c0[:, np.newaxis], temps, k[:, np.newaxis], ordre[:, np.newaxis])
+    return c + bruit * c0[:, np.newaxis] * generateur.standard_normal(c.shape), (c0, k, ordre)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        temps, mesures, noms = lecture_csv(sys.argv[1])
+        debut = time.perf_counter()
+        resultat = ajustement(temps, mesures)
+        print("{} séries ajustées en {:.2f} s".format(len(noms), time.perf_counter() - debut))
+        for i, nom in enumerate(noms[:10]):
+            print("{:<16} k = {:.4g}  ordre = {:.3f}  t1/2 = {:.4g} s  écart-type = {:.2g}".format(
+                nom, resultat['cste_vitesse'][i], resultat['ordre'][i],
+                resultat['temps_demi_reaction'][i], resultat['ecart_type'][i]))
+        chemin = os.path.splitext(sys.argv[1])[0] + '_ajustement.csv'
+        ecriture_csv(chemin, noms, resultat)
+        print("Résultats écrits dans {}".format(chemin))
+    else:
+        temps = np.linspace(0, 100, 40)
+        mesures, (c0, k, ordre) = series_simulees(2000, temps)
+        debut = time.perf_counter()
+        resultat = ajustement(temps, mesures)
+        print("2000 séries simulées (bruit 1 %) ajustées en {:.2f} s".format(time.perf_counter() - debut))
+        print("Écart médian sur l'ordre : {:.3f}".format(np.median(np.abs(resultat['ordre'] - ordre))))
+        print("Écart relatif médian sur k : {:.3f}".format(np.median(np.abs(resultat['cste_vitesse'] / k - 1))))
@@ -0,0 +1,231 @@
+# -*-coding:utf-8 -*
+
+"""Analyse fréquentielle d'un circuit linéaire quelconque (résistances, bobines, condensateurs,
+sources de tension et de courant) décrit par une netlist.
+
+Le circuit est mis en équations par l'analyse nodale modifiée : les inconnues sont les potentiels
+des noeuds (la masse '0' exceptée) et les intensités dans les bobines et les sources de tension.
+Le système s'écrit, pour la variable de Laplace s = jω :
+    (G + s C) x = b
+Les matrices G et C sont assemblées à partir de triplets (ligne, colonne, valeur), chaque dipôle
+n'apportant que quelques termes.
+
+Pour balayer un grand nombre de fréquences, le système n'est factorisé qu'une fois. En posant
+K = G + s0 C pour une pulsation s0 au milieu de la grille et M = K⁻¹ C = V Λ V⁻¹, il vient :
+    x(s) = V diag(1 / (1 + (s - s0) λ)) V⁻¹ K⁻¹ b
+Une fois la décomposition calculée, chaque fréquence ne coûte qu'un produit de n termes par
+tension demandée. La décomposition est vérifiée à N_VERIFICATIONS fréquences par une résolution
+directe ; si l'écart dépasse TOLERANCE (matrice M mal conditionnée ou non diagonalisable), toute
+la grille est résolue directement.
+
+Exécuter ce module (python -m physique.analyse_nodale) compare ses résultats aux fonctions de
+transfert des circuits RC et RLC et mesure la durée du balayage d'une échelle RC.
+"""
+
+import re
+import time
+import numpy as np
+
+
+N_VERIFICATIONS = 8     # nombre de fréquences de contrôle de la décomposition
+TOLERANCE = 1.e-8       # écart relatif toléré entre décomposition et résolution directe
+TAILLE_BLOC = 1024      # nombre de fréquences traitées simultanément
+MEMOIRE_BLOC = 2**22    # nombre de termes des matrices résolues simultanément
+MULTIPLICATEURS = {
+    'f': 1.e-15, 'p': 1.e-12, 'n': 1.e-9, 'u': 1.e-6, 'µ': 1.e-6,
+    'm': 1.e-3, 'k': 1.e3, 'meg': 1.e6, 'g': 1.e9,
+}
+
+
+def valeur(texte):
+    """Convertit une valeur de netlist, éventuellement suivie d'un multiplicateur SPICE (1k, 100n, 2meg)"""
+    correspondance = re.fullmatch(r'([-+0-9.eE]+?)(meg|[fpnuµmkg])?[a-zA-Z]*', texte.lower())
+    if correspondance is None:
+        raise ValueError("Valeur illisible : {}".format(texte))
+    nombre, multiplicateur = correspondance.groups()
+    return float(nombre) * MULTIPLICATEURS.get(multiplicateur, 1.)
+
+def lire_netlist(texte):
+    """Lit une netlist au format SPICE simplifié : une ligne 'nom noeud+ noeud- valeur' par dipôle,
+    dont le type est donné par la première lettre du nom (R, L, C, V : source de tension,
+    I : source de courant, débitant de noeud+ vers noeud- à travers la source).
+    Le noeud '0' est la masse ; les lignes vides ou commençant par '*' sont ignorées.
+    Renvoie la liste des dipôles (type, nom, noeud+, noeud-, valeur).
+    """
+    elements = []
+    for ligne in texte.splitlines():
+        champs = ligne.split()
+        if not champs or champs[0].startswith('*'):
+            continue
+        if len(champs) != 4 or champs[0][0].upper() not in 'RLCVI':
+            raise ValueError("Ligne de netlist invalide : {}".format(ligne))
+        nom, plus, moins, texte_valeur = champs
+        elements.append((nom[0].upper(), nom, plus, moins, valeur(texte_valeur)))
+    return elements
+
+def assemblage(elements):
+    """Assemble les matrices G et C et le second membre b de l'analyse nodale modifiée.
+    Renvoie un dictionnaire contenant G, C, b et les indices des noeuds et des courants de branche.
+    Arguments :
+        - elements : liste de dipôles (type, nom, noeud+, noeud-, valeur), voir lire_netlist.
+    """
+    noeuds = {'0': -1}
+    for _, _, plus, moins, _ in elements:
+        for noeud in (plus, moins):
+            if noeud not in noeuds:
+                noeuds[noeud] = len(noeuds) - 1
+    branches = {}
+    for type_element, nom, _, _, _ in elements:
+        if type_element in 'LV':
+            branches[nom] = len(noeuds) - 1 + len(branches)
+    taille = len(noeuds) - 1 + len(branches)
+
+    triplets = {'G': ([], [], []), 'C': ([], [], [])}
+    def ajouter(matrice, ligne, colonne, terme):
+        if ligne >= 0 and colonne >= 0:
+            for liste, element in zip(triplets[matrice], (ligne, colonne, terme)):
+                liste.append(element)
+    def admittance(matrice, a, b, terme):
+        ajouter(matrice, a, a, terme)
+        ajouter(matrice, b, b, terme)
+        ajouter(matrice, a, b, -terme)
+        ajouter(matrice, b, a, -terme)
+    def branche(k, a, b):
+        ajouter('G', a, k, 1.)
+        ajouter('G', b, k, -1.)
+        ajouter('G', k, a, 1.)
+        ajouter('G', k, b, -1.)
+
+    second_membre = np.zeros(taille)
+    for type_element, nom, plus, moins, grandeur in elements:
+        a, b = noeuds[plus], noeuds[moins]
+        if type_element == 'R':
+            admittance('G', a, b, 1. / grandeur)
+        elif type_element == 'C':
+            admittance('C', a, b, grandeur)
+        elif type_element == 'L':
+            # v+ - v- - s L i = 0
+            branche(branches[nom], a, b)
+            ajouter('C', branches[nom], branches[nom], -grandeur)
+        elif type_element == 'V':
+            # v+ - v- = V
+            branche(branches[nom], a, b)
+            second_membre[branches[nom]] = grandeur
+        else:
+            if a >= 0:
+                second_membre[a] -= grandeur
+            if b >= 0:
+                second_membre[b] += grandeur
+
+    matrices = {}
+    for matrice, (lignes, colonnes, termes) in triplets.items():
+        matrices[matrice] = np.zeros((taille, taille))
+        np.add.at(matrices[matrice], (np.array(lignes, dtype=int), np.array(colonnes, dtype=int)), termes)
+    return {
+        'G': matrices['G'],
+        'C': matrices['C'],
+        'b': second_membre,
+        'noeuds': noeuds,
+        'branches': branches,
+    }
+
+def resolution_directe(circuit, omega):
+    """Résout le système (G + jω C) x = b pour chaque pulsation, par blocs de fréquences.
+    Renvoie un tableau (len(omega), n) des inconnues.
+    """
+    g, c, b = circuit['G'], circuit['C'], circuit['b']
+    bloc = max(1, MEMOIRE_BLOC // len(b)**2)
+    resultat = np.empty((len(omega), len(b)), dtype=complex)
+    for debut in range(0, len(omega), bloc):
+        s = 1j * omega[debut:debut + bloc, np.newaxis, np.newaxis]
+        resultat[debut:debut + bloc] = np.linalg.solve(g + s * c, np.broadcast_to(b, (len(s), len(b)))[..., np.newaxis])[..., 0]
+    return resultat
+
+def reponse_frequentielle(circuit, omega, sorties):
+    """Calcule les potentiels complexes des noeuds demandés sur toute la grille de pulsations.
+    Arguments :
+        - circuit : dictionnaire renvoyé par assemblage (ou netlist, lue par lire_netlist) ;
+        - omega : grille de pulsations (N valeurs) ;
+        - sorties : noms des noeuds dont on veut le potentiel.
+    Renvoie un tableau (len(sorties), N).
+    """
+    if isinstance(circuit, str):
+        circuit = assemblage(lire_netlist(circuit))
+    omega = np.asarray(omega, dtype=float)
+    indices = [circuit['noeuds'][noeud] for noeud in sorties]
+    observation = np.zeros((len(sorties), len(circuit['b'])))
+    for ligne, indice in enumerate(indices):
+        if indice >= 0:
+            observation[ligne, indice] = 1.
+
+    # Décomposition autour de s0, au milieu (géométrique) de la grille
+    s0 = 1j * np.sqrt(np.min(omega) * np.max(omega))
+    k = circuit['G'] + s0 * circuit['C']
+    try:
+        valeurs_propres, vecteurs = np.linalg.eig(np.linalg.solve(k, circuit['C']))
+        coefficients = np.linalg.solve(vecteurs, np.linalg.solve(k, circuit['b']))
+    except np.linalg.LinAlgError:
+        return (resolution_directe(circuit, omega) @ observation.T).T
+
+    poids = (observation @ vecteurs) * coefficients
+    resultat = np.empty((len(sorties), len(omega)), dtype=complex)
+    for debut in range(0, len(omega), TAILLE_BLOC):
+        s = 1j * omega[debut:debut + TAILLE_BLOC]
+        resultat[:, debut:debut + TAILLE_BLOC] = poids @ (1. / (1 + (s - s0)[np.newaxis, :] * valeurs_propres[:, np.newaxis]))
+
+    # Contrôle de la décomposition à quelques fréquences
+    controle = np.unique(np.linspace(0, len(omega) - 1, N_VERIFICATIONS).astype(int))
+    reference = resolution_directe(circuit, omega[controle]) @ observation.T
+    ecart = np.abs(resultat[:, controle].T - reference).max()
+    if ecart > TOLERANCE * max(np.abs(reference).max(), 1.e-300):
+        return (resolution_directe(circuit, omega) @ observation.T).T
+    return resultat
+
+def echelle_rc(n_cellules, resistance=1.e3, capacity=1.e-9):
+    """Renvoie la netlist d'une échelle de n_cellules cellules RC alimentée par une source de tension"""
+    lignes = ['V1 n0 0 1']
+    for i in range(n_cellules):
+        lignes.append('R{} n{} n{} {}'.format(i + 1, i, i + 1, resistance))
+        lignes.append('C{} n{} 0 {}'.format(i + 1, i + 1, capacity))
+    return '\n'.join(lignes)
+
+def verification():
+    """Compare l'analyse nodale aux fonctions de transfert des circuits RC et RLC et à la
+    résolution directe d'une échelle RC ; renvoie les écarts relatifs maximaux. L'atténuation de
+    l'échelle dépassant la précision des calculs en haute fréquence, son écart est rapporté au
+    maximum de la réponse.
+    """
+    omega = 2*np.pi * np.logspace(1, 8, 1000)
+    resistance, capacity, inductance = 100., 1.e-7, 1.e-3
+    omega_0 = 1. / np.sqrt(inductance * capacity)
+    quality_factor = 1. / resistance * np.sqrt(inductance / capacity)
+    h = 1. / (1 + 1j * quality_factor * (omega / omega_0 - omega_0 / omega))
+    cas = {
+        'RC': ('V1 e 0 1\nR1 e s {}\nC1 s 0 {}'.format(resistance, capacity),
+               1. / (1 + 1j * omega * resistance * capacity)),
+        'RLC passe-bas': ('V1 e 0 1\nR1 e a {}\nL1 a b {}\nC1 b 0 {}'.format(resistance, inductance, capacity),
+                          h * quality_factor * omega_0 / (1j * omega)),
+        'RLC passe-bande': ('V1 e 0 1\nL1 e a {}\nC1 a b {}\nR1 b 0 {}'.format(inductance, capacity, resistance),
+                            h),
+        'RLC passe-haut': ('V1 e 0 1\nC1 e a {}\nR1 a b {}\nL1 b 0 {}'.format(capacity, resistance, inductance),
+                           h * 1j * quality_factor * omega / omega_0),
+    }
+    ecarts = {}
+    for nom, (netlist, attendu) in cas.items():
+        sortie = 's' if nom == 'RC' else 'b'
+        calcule = reponse_frequentielle(netlist, omega, [sortie])[0]
+        ecarts[nom] = np.max(np.abs(calcule - attendu) / np.abs(attendu))
+    circuit = assemblage(lire_netlist(echelle_rc(50)))
+    calcule = reponse_frequentielle(circuit, omega[::10], ['n50'])[0]
+    attendu = resolution_directe(circuit, omega[::10])[:, circuit['noeuds']['n50']]
+    ecarts['échelle RC'] = np.max(np.abs(calcule - attendu)) / np.max(np.abs(attendu))
+    return ecarts
+
+
+if __name__ == '__main__':
+    for nom, ecart in verification().items():
+        print("{:<16} écart relatif maximal : {:.1e}".format(nom, ecart))
+    circuit = assemblage(lire_netlist(echelle_rc(300)))
+    debut = time.perf_counter()
+    reponse_frequentielle(circuit, 2*np.pi * np.logspace(1, 8, 10**4), ['n1', 'n150', 'n300'])
+    print("Échelle de 300 cellules, 10⁴ fréquences : {:.2f} s".format(time.perf_counter() - debut))
@@ -0,0 +1,119 @@
+# -*-coding:utf-8 -*
+
+"""Génération de signaux sonores par blocs et écriture de fichiers WAV.
+
+Les oscillateurs accumulent leur phase d'un bloc à l'autre : une modification des fréquences en
+cours de génération ne provoque aucune discontinuité du signal. Les blocs sont calculés dans des
+tableaux alloués une fois pour toutes.
+
+Les fichiers WAV (PCM 16 bits, mono) sont écrits à travers une projection en mémoire (np.memmap) :
+le fichier est rempli bloc par bloc, et la mémoire utilisée ne dépend que de la taille des blocs,
+quelle que soit la durée de l'enregistrement. Ils sont relus de la même façon, par blocs extraits
+d'une projection en mémoire.
+"""
+
+import struct
+import numpy as np
+
+
+TAILLE_BLOC = 2**14             # nombre d'échantillons par bloc
+TAILLE_ENTETE = 44              # taille de l'en-tête d'un fichier WAV PCM
+PLEINE_ECHELLE = 2**15 - 1      # valeur maximale d'un échantillon 16 bits
+VIDAGE = 2**22                  # nombre d'échantillons écrits entre deux vidages sur le disque
+
+
+def oscillateurs(frequences, frequence_echantillonnage, taille_bloc=TAILLE_BLOC):
+    """Générateur des blocs successifs de signaux sinusoïdaux d'amplitude 1, à phase continue.
+    Chaque bloc est un tableau (nombre de signaux, taille_bloc), réutilisé d'un bloc à l'autre :
+    il doit être copié s'il est conservé.
+    Arguments :
+        - frequences : fréquences des signaux, ou fonction sans argument les renvoyant, appelée
+          avant chaque bloc (réglage en cours de génération) ;
+        - frequence_echantillonnage : fréquence d'échantillonnage (Hz) ;
+        - taille_bloc : nombre d'échantillons par bloc.
+    """
+    lire = frequences if callable(frequences) else (lambda: frequences)
+    phases = np.zeros(len(lire()))
+    rampe = np.arange(taille_bloc, dtype=float)
+    bloc = np.empty((len(phases), taille_bloc))
+    while True:
+        increments = 2*np.pi * np.asarray(lire(), dtype=float) / frequence_echantillonnage
+        np.multiply(increments[:, np.newaxis], rampe, out=bloc)
+        np.add(bloc, phases[:, np.newaxis], out=bloc)
+        np.sin(bloc, out=bloc)
+        phases = np.mod(phases + increments * taille_bloc, 2*np.pi)
+        yield bloc
+
+def entete_wav(n_echantillons, frequence_echantillonnage):
+    """Renvoie l'en-tête d'un fichier WAV PCM 16 bits mono de n_echantillons échantillons"""
+    taille = 2 * n_echantillons
+    return struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', TAILLE_ENTETE - 8 + taille, b'WAVE',
+                       b'fmt ', 16, 1, 1, frequence_echantillonnage, 2 * frequence_echantillonnage, 2, 16,
+                       b'data', taille)
+
+def lecture_wav(chemin):
+    """Ouvre un fichier WAV PCM 16 bits sans le charger en mémoire.
+    Renvoie la fréquence d'échantillonnage et les échantillons, projection en mémoire de forme
+    (nombre d'échantillons, nombre de canaux).
+    """
+    with open(chemin, 'rb') as fichier:
+        riff, _, wave = struct.unpack('<4sI4s', fichier.read(12))
+        if riff != b'RIFF' or wave != b'WAVE':
+            raise ValueError("{} n'est pas un fichier WAV".format(chemin))
+        format_audio = None
+        while True:
+            entete = fichier.read(8)
+            if len(entete) < 8:
+                raise ValueError("{} ne contient pas de données audio".format(chemin))
+            identifiant, taille = struct.unpack('<4sI', entete)
+            if identifiant == b'fmt ':
+                format_audio, canaux, frequence_echantillonnage, _, _, bits = struct.unpack('<HHIIHH', fichier.read(16))
+                fichier.seek(taille - 16 + taille % 2, 1)
+            elif identifiant == b'data':
+                debut = fichier.tell()
+                break
+            else:
+                fichier.seek(taille + taille % 2, 1)
+    if format_audio != 1 or bits != 16:
+        raise ValueError("{} : seuls les fichiers PCM 16 bits sont pris en charge".format(chemin))
+    n_echantillons = taille // (2 * canaux)
+    donnees = np.memmap(chemin, dtype='<i2', mode='r', offset=debut, shape=(n_echantillons, canaux))
+    return frequence_echantillonnage, donnees
+
+def blocs_wav(donnees, taille_bloc=TAILLE_BLOC):
+    """Générateur des blocs d'un signal lu par lecture_wav, moyenne des canaux ramenée à [-1, 1]"""
+    for debut in range(0, len(donnees), taille_bloc):
+        yield np.mean(donnees[debut:debut + taille_bloc], axis=1) / PLEINE_ECHELLE
+
+def ecriture_wav(chemin, blocs, n_echantillons, frequence_echantillonnage, amplitude=1.):
+    """Écrit un signal fourni par blocs dans un fichier WAV PCM 16 bits mono.
+    Arguments :
+        - chemin : chemin du fichier ;
+        - blocs : itérable de tableaux 1D, échantillons successifs du signal ;
+        - n_echantillons : nombre d'échantillons à écrire (le fichier est complété par des zéros
+          si les blocs s'épuisent avant) ;
+        - frequence_echantillonnage : fréquence d'échantillonnage (Hz) ;
+        - amplitude : valeur du signal correspondant à la pleine échelle.
+    """
+    with open(chemin, 'wb') as fichier:
+        fichier.write(entete_wav(n_echantillons, frequence_echantillonnage))
+        fichier.truncate(TAILLE_ENTETE + 2 * n_echantillons)
+    donnees = np.memmap(chemin, dtype='<i2', mode='r+', offset=TAILLE_ENTETE, shape=(n_echantillons,))
+    tampon = None
+    debut = 0
+    for bloc in blocs:
+        if debut >= n_echantillons:
+            break
+        bloc = bloc[:n_echantillons - debut]
+        if tampon is None or len(tampon) < len(bloc):
+            tampon = np.empty(len(bloc))
+        echantillons = tampon[:len(bloc)]
+        np.multiply(bloc, PLEINE_ECHELLE / amplitude, out=echantillons)
+        np.clip(echantillons, -PLEINE_ECHELLE, PLEINE_ECHELLE, out=echantillons)
+        np.rint(echantillons, out=echantillons)
+        donnees[debut:debut + len(bloc)] = echantillons
+        if (debut + len(bloc)) // VIDAGE > debut // VIDAGE:
+            donnees.flush()
+        debut += len(bloc)
+    donnees.flush()
+    del donnees
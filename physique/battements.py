@@ -0,0 +1,33 @@
+# -*-coding:utf-8 -*
+
+"""Somme de deux signaux sinusoïdaux de fréquences proches (battements).
+
+Pour deux sinus d'amplitude 1 et de fréquences f1 et f2 :
+    sin(2π f1 t) + sin(2π f2 t) = 2 cos(π (f1 - f2) t) sin(π (f1 + f2) t)
+l'enveloppe ±2 cos(π (f1 - f2) t) oscille à la fréquence des battements |f1 - f2|.
+Le module n'importe pas matplotlib : le programme battements/battements.py n'en est que l'interface.
+"""
+
+import numpy as np
+
+from physique.audio import TAILLE_BLOC, oscillateurs
+
+
+def signaux(temps, frequence1, frequence2):
+    """Renvoie les deux signaux, leur somme et l'enveloppe de la somme aux instants temps"""
+    sig1 = np.sin(2 * np.pi * frequence1 * temps)
+    sig2 = np.sin(2 * np.pi * frequence2 * temps)
+    return sig1, sig2, sig1 + sig2, 2 * np.cos(np.pi * (frequence1 - frequence2) * temps)
+
+def signal_battements(frequences, frequence_echantillonnage, taille_bloc=TAILLE_BLOC):
+    """Générateur des blocs de la somme des deux signaux.
+    Arguments :
+        - frequences : fonction sans argument renvoyant les deux fréquences, appelée avant chaque bloc ;
+        - frequence_echantillonnage : fréquence d'échantillonnage (Hz) ;
+        - taille_bloc : nombre d'échantillons par bloc.
+    Le bloc renvoyé est réutilisé d'un appel à l'autre.
+    """
+    somme = np.empty(taille_bloc)
+    for bloc in oscillateurs(frequences, frequence_echantillonnage, taille_bloc):
+        np.add(bloc[0], bloc[1], out=somme)
+        yield somme
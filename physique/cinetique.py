@@ -0,0 +1,364 @@
+# -*-coding:utf-8 -*
+
+"""Cinétique chimique : réaction d'ordre quelconque et petits réseaux de réactions.
+
+Pour une réaction A → P d'ordre réel n ≥ 0, la loi de vitesse dC/dt = - k C^n s'intègre exactement :
+    C(t) = C_0 exp(- k t)                               si n = 1
+    C(t) = (C_0^(1-n) - (1 - n) k t)^(1/(1-n))          sinon
+(pour n < 1, le réactif est épuisé en un temps fini, après lequel C = 0). Le temps de
+demi-réaction vaut ln 2 / k si n = 1, et (2^(n-1) - 1) / ((n - 1) k C_0^(n-1)) sinon.
+
+Un réseau de réactions est décrit par ses réactions, dictionnaires donnant les coefficients
+stoechiométriques des réactifs et des produits et, éventuellement, les ordres partiels des réactifs
+(égaux par défaut aux coefficients). La vitesse de la réaction j vaut :
+    r_j = k_j Π C_s^(ordre_js)
+et les concentrations évoluent selon dC/dt = N r, où N est la matrice stoechiométrique. Une réaction
+s'arrête lorsqu'un de ses réactifs est épuisé, quel que soit son ordre : pour un ordre n < 1, le
+facteur C^n, discontinu (n = 0) ou de dérivée infinie en 0, est remplacé par C^(n+1) / (C + ε), qui
+n'en diffère que lorsque C est de l'ordre de ε = EPUISEMENT.
+
+Les réseaux sans solution exacte sont intégrés par la méthode de Rosenbrock ROS2 (ordre 2,
+L-stable), adaptée aux systèmes raides : chaque pas ne demande que la résolution de deux systèmes
+linéaires (I - γ h J) k = f, sans itération de Newton. Tous les jeux de paramètres (concentrations
+initiales, constantes de vitesse) sont intégrés simultanément comme un seul système : chaque jeu a
+son propre pas, adapté à l'erreur estimée, et les systèmes linéaires sont résolus par lots.
+Les concentrations sont enregistrées sur une grille de temps imposée.
+
+Coût de l'intégration : chaque pas coûte environ 0,3 ms (une soixantaine d'opérations NumPy, quel
+que soit le lot), plus 0,5 µs par jeu de paramètres. Le nombre de pas est fixé par la précision de
+la méthode d'ordre 2 : de l'ordre de 10³ pas pour k t ≈ 10 et RTOL = 1.e-4. Le lot est donc
+intéressant au-delà de 10³ jeux, où le coût fixe d'un pas devient négligeable : A → B → C d'ordre
+1,5 sur 101 instants prend 0,4 s pour un jeu, 1,3 s pour 10³ jeux et 7 s pour 10⁴ jeux (un cœur).
+Un lot de 10³ à 10⁴ jeux est la taille visée ; au-delà, la durée croît proportionnellement.
+
+Les mécanismes de MECANISMES ont une solution exacte lorsque l'ordre le permet ; evolution() l'utilise
+alors de préférence à l'intégration. Exécuter ce module (python -m physique.cinetique) compare
+l'intégration aux solutions exactes et mesure la durée de l'intégration d'un lot de paramètres.
+"""
+
+import time
+import numpy as np
+
+
+RTOL = 1.e-4                # tolérance relative de l'intégration
+ATOL = 1.e-8                # tolérance absolue de l'intégration (mol/L)
+GAMMA = 1 + 1 / np.sqrt(2)  # coefficient de la méthode ROS2
+PAS_INITIAL = 1.e-4         # premier pas, rapporté à la durée de l'intégration
+PAS_MINIMAL = 1.e-12        # pas en dessous duquel l'intégration est abandonnée (relatif)
+EPUISEMENT = 1.e-10         # concentration de régularisation des ordres inférieurs à 1 (mol/L)
+MECANISMES = ['A → P', 'A → B → C', 'A ⇌ B', 'A → B, A → C']
+
+
+def concentration_exacte(concentration_initiale, temps, cste_vitesse, ordre):
+    """Concentration du réactif d'une réaction d'ordre réel ordre ≥ 0 ; les arguments sont
+    combinés selon les règles de diffusion (broadcasting) de NumPy
+    """
+    c0, t, k, n = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in
+                                        (concentration_initiale, temps, cste_vitesse, ordre)))
+    un = n == 1
+    e = np.where(un, 1., 1 - n)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        base = np.maximum(c0**e - e * k * t, 0)
+        return np.where(un, c0 * np.exp(-k * t), base**(1 / e))
+
+def temps_demi_reaction(concentration_initiale, cste_vitesse, ordre):
+    """Temps de demi-réaction d'une réaction d'ordre réel ordre ≥ 0"""
+    c0, k, n = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in
+                                     (concentration_initiale, cste_vitesse, ordre)))
+    un = n == 1
+    e = np.where(un, 1., n - 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(un, np.log(2) / k, (2**e - 1) / (e * k * c0**e))
+
+def reseau(reactions):
+    """Renvoie la description matricielle (dictionnaire) d'un réseau de réactions.
+    Arguments :
+        - reactions : liste de dictionnaires {'reactifs': {espèce: coefficient}, 'produits':
+          {espèce: coefficient}, 'ordres': {espèce: ordre partiel}}, la clé 'ordres' étant facultative.
+    Les espèces sont numérotées dans leur ordre d'apparition. Les vitesses ne sont calculées qu'à
+    partir des termes (réaction, réactif, ordre), rangés par réaction.
+    """
+    especes = []
+    for reaction in reactions:
+        for espece in list(reaction['reactifs']) + list(reaction.get('produits', {})):
+            if espece not in especes:
+                especes.append(espece)
+    stoechiometrie = np.zeros((len(especes), len(reactions)))
+    termes = []
+    for j, reaction in enumerate(reactions):
+        if not reaction['reactifs']:
+            raise ValueError("Chaque réaction doit avoir au moins un réactif")
+        for espece, coefficient in reaction['reactifs'].items():
+            s = especes.index(espece)
+            stoechiometrie[s, j] -= coefficient
+            termes.append((j, s, reaction.get('ordres', {}).get(espece, coefficient)))
+        for espece, coefficient in reaction.get('produits', {}).items():
+            stoechiometrie[especes.index(espece), j] += coefficient
+    reaction_terme, espece_terme, ordres = (np.array(x) for x in zip(*termes))
+    if np.any(ordres < 0):
+        raise ValueError("Les ordres partiels doivent être positifs ou nuls")
+    # contribution de chaque terme à la jacobienne : colonne de N de sa réaction, dans la colonne de son espèce
+    contributions = np.zeros((len(termes), len(especes), len(especes)))
+    contributions[np.arange(len(termes)), :, espece_terme] = stoechiometrie[:, reaction_terme].T
+    return {
+        'especes': especes,
+        'stoechiometrie': stoechiometrie,
+        'n_reactions': len(reactions),
+        'reaction_terme': reaction_terme,
+        'espece_terme': espece_terme,
+        'ordres': ordres.astype(float),
+        'debuts': np.searchsorted(reaction_terme, np.arange(len(reactions))),
+        'autres': [np.flatnonzero((reaction_terme == j) & (np.arange(len(termes)) != i))
+                   for i, j in enumerate(reaction_terme)],
+        'contributions': contributions,
+    }
+
+def facteurs(systeme, concentrations):
+    """Renvoie les facteurs C_s^ordre des termes des vitesses (régularisés pour les ordres
+    inférieurs à 1), de forme (jeux, termes), nuls pour un réactif épuisé
+    """
+    c = np.maximum(concentrations[:, systeme['espece_terme']], 0)
+    ordres = systeme['ordres']
+    return np.where(ordres < 1, c**(ordres + 1) / (c + EPUISEMENT), c**ordres)
+
+def derivee(systeme, concentrations, constantes):
+    """Renvoie dC/dt pour chaque jeu de paramètres, de forme (jeux, espèces)"""
+    vitesses = constantes * np.multiply.reduceat(facteurs(systeme, concentrations), systeme['debuts'], axis=1)
+    return vitesses @ systeme['stoechiometrie'].T
+
+def jacobienne(systeme, concentrations, constantes):
+    """Renvoie la matrice jacobienne de dC/dt pour chaque jeu de paramètres, de forme
+    (espèces, espèces, jeux) : chaque coefficient est un vecteur contigu sur les jeux
+    """
+    f = facteurs(systeme, concentrations)
+    c = np.maximum(concentrations[:, systeme['espece_terme']], 0)
+    ordres = systeme['ordres']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        propres = np.where(ordres < 1, c**ordres * (ordres * c + (ordres + 1) * EPUISEMENT) / (c + EPUISEMENT)**2,
+                           ordres * np.where(ordres == 1, 1, c**(ordres - 1)))
+    derivees = propres * constantes[:, systeme['reaction_terme']]
+    for i, autres in enumerate(systeme['autres']):
+        if len(autres):
+            derivees[:, i] *= np.prod(f[:, autres], axis=1)
+    return np.tensordot(systeme['contributions'], derivees, axes=(0, 1))
+
+def factorisation(w):
+    """Factorisation LU, avec pivot partiel, d'un lot de petites matrices (n, n, lots).
+    La boucle ne porte que sur les n colonnes, chaque opération traitant tout le lot : pour les
+    quelques espèces d'un réseau, c'est bien plus rapide qu'un appel à LAPACK par matrice. Le lot
+    est le dernier indice, si bien que chaque coefficient est un vecteur contigu ; les échanges de
+    lignes sont limités aux matrices concernées, rares pour un réseau de réactions.
+    Renvoie les facteurs L et U (rangés dans une même matrice) et les permutations des lignes (n, lots).
+    """
+    lu = np.array(w, dtype=float)
+    n = lu.shape[0]
+    lots = np.arange(lu.shape[2])
+    permutations = np.tile(np.arange(n)[:, np.newaxis], (1, lu.shape[2]))
+    for j in range(n - 1):
+        p = j + np.argmax(np.abs(lu[j:, j]), axis=0)
+        echanges = lots[p != j]
+        if len(echanges):
+            p = p[echanges]
+            lu[j, :, echanges], lu[p, :, echanges] = lu[p, :, echanges], lu[j, :, echanges].copy()
+            permutations[j, echanges], permutations[p, echanges] = permutations[p, echanges], permutations[j, echanges].copy()
+        lu[j + 1:, j] /= lu[j, j]
+        lu[j + 1:, j + 1:] -= lu[j + 1:, j, np.newaxis] * lu[j, np.newaxis, j + 1:]
+    return lu, permutations
+
+def substitution(lu, permutations, b):
+    """Résout les systèmes factorisés par factorisation() pour les seconds membres b (n, lots)"""
+    x = np.take_along_axis(b, permutations, axis=0)
+    for i in range(1, len(x)):
+        for j in range(i):
+            x[i] -= lu[i, j] * x[j]
+    for i in reversed(range(len(x))):
+        for j in range(i + 1, len(x)):
+            x[i] -= lu[i, j] * x[j]
+        x[i] /= lu[i, i]
+    return x
+
+def integration(systeme, concentrations_initiales, constantes, temps, rtol=RTOL, atol=ATOL):
+    """Intègre un réseau de réactions pour un lot de jeux de paramètres (méthode ROS2 à pas adaptatif).
+    Arguments :
+        - systeme : réseau de réactions décrit par reseau() ;
+        - concentrations_initiales : tableau (jeux, espèces) ;
+        - constantes : constantes de vitesse, tableau (jeux, réactions) ;
+        - temps : grille croissante des instants d'enregistrement, commençant à l'instant initial ;
+        - rtol, atol : tolérances relative et absolue de l'erreur locale.
+    Renvoie les concentrations aux instants de la grille, tableau (jeux, instants, espèces).
+    """
+    c = np.array(np.broadcast_to(concentrations_initiales, np.broadcast_shapes(
+        np.shape(concentrations_initiales), (1, len(systeme['especes'])))), dtype=float)
+    k = np.broadcast_to(np.asarray(constantes, dtype=float), (len(c), systeme['n_reactions']))
+    temps = np.asarray(temps, dtype=float)
+    duree = temps[-1] - temps[0]
+    resultat = np.empty((len(c), len(temps), c.shape[1]))
+    resultat[:, 0] = c
+    identite = np.eye(c.shape[1])[:, :, np.newaxis]
+
+    # État des jeux en cours : compacté seulement lorsque des jeux atteignent la fin de la grille
+    actifs = np.arange(len(c)) if len(temps) > 1 else np.arange(0)
+    y, kk = c[actifs], np.ascontiguousarray(k[actifs])
+    t = np.full(len(actifs), temps[0])
+    h = np.full(len(actifs), PAS_INITIAL * duree)
+    suivant = np.ones(len(actifs), dtype=int)   # indice du prochain instant d'enregistrement
+    while len(actifs):
+        cible = temps[suivant]
+        limite = h >= cible - t
+        pas = np.where(limite, cible - t, h)
+        lu, permutations = factorisation(identite - GAMMA * pas * jacobienne(systeme, y, kk))
+        k1 = substitution(lu, permutations, derivee(systeme, y, kk).T)     # une factorisation, deux étapes
+        f1 = derivee(systeme, y + pas[:, np.newaxis] * k1.T, kk)
+        k2 = substitution(lu, permutations, f1.T - 2 * k1)
+        nouveau = y + (pas * (1.5 * k1 + 0.5 * k2)).T
+        echelle = atol + rtol * np.maximum(np.abs(y), np.abs(nouveau))
+        erreur = np.max(np.abs(0.5 * pas * (k1 + k2)).T / echelle, axis=1)
+        erreur = np.where(np.isfinite(erreur), erreur, np.inf)
+        acceptes = erreur <= 1
+
+        y = np.where(acceptes[:, np.newaxis], np.maximum(nouveau, 0), y)
+        t = np.where(acceptes, np.where(limite, cible, t + pas), t)
+        atteints = acceptes & limite
+        resultat[actifs[atteints], suivant[atteints]] = y[atteints]
+        suivant += atteints
+
+        with np.errstate(divide='ignore'):
+            facteur = np.clip(0.9 / np.sqrt(erreur), 0.2, 5.)
+        h = np.where(atteints, np.maximum(h, pas * facteur), pas * facteur)
+        if np.any(h < PAS_MINIMAL * duree):
+            raise ValueError("Intégration impossible : le pas de temps devient trop petit")
+        en_cours = suivant < len(temps)
+        if not np.all(en_cours):
+            actifs, y, kk, t, h, suivant = (x[en_cours] for x in (actifs, y, kk, t, h, suivant))
+    return resultat
+
+def mecanisme(nom, ordre=1):
+    """Renvoie les réactions d'un mécanisme de MECANISMES, dont les réactions consommant A sont
+    d'ordre ordre par rapport à A (les autres étant d'ordre 1)
+    """
+    a = {'reactifs': {'A': 1}, 'ordres': {'A': ordre}}
+    if nom == 'A → P':
+        return [dict(a, produits={'P': 1})]
+    elif nom == 'A → B → C':
+        return [dict(a, produits={'B': 1}), {'reactifs': {'B': 1}, 'produits': {'C': 1}}]
+    elif nom == 'A ⇌ B':
+        return [dict(a, produits={'B': 1}), {'reactifs': {'B': 1}, 'produits': {'A': 1}}]
+    elif nom == 'A → B, A → C':
+        return [dict(a, produits={'B': 1}), dict(a, produits={'C': 1})]
+    raise ValueError("Mécanisme inconnu : {}".format(nom))
+
+def solution_exacte(nom, ordre, concentration_initiale, constantes, temps):
+    """Solution exacte d'un mécanisme de MECANISMES, seul A étant présent initialement.
+    Arguments :
+        - concentration_initiale : concentrations initiales de A, tableau (jeux,) ;
+        - constantes : constantes de vitesse, tableau (jeux, réactions) ;
+        - temps : grille des instants.
+    Renvoie un tableau (jeux, instants, espèces), ou None si le mécanisme n'a pas de solution
+    exacte pour cet ordre.
+    """
+    c0 = np.asarray(concentration_initiale, dtype=float)[:, np.newaxis]
+    k = np.asarray(constantes, dtype=float)
+    t = np.asarray(temps, dtype=float)
+    if nom == 'A → P':
+        a = concentration_exacte(c0, t, k[:, :1], ordre)
+        return np.stack((a, c0 - a), axis=2)
+    elif nom == 'A → B, A → C':
+        somme = k[:, :1] + k[:, 1:2]
+        a = concentration_exacte(c0, t, somme, ordre)
+        return np.stack((a, (c0 - a) * k[:, :1] / somme, (c0 - a) * k[:, 1:2] / somme), axis=2)
+    elif ordre != 1:
+        return None
+    k1, k2 = k[:, :1], k[:, 1:2]
+    a = c0 * np.exp(-k1 * t)
+    if nom == 'A → B → C':
+        ecart = k2 - k1
+        proches = np.abs(ecart) <= 1.e-8 * np.maximum(k1, k2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            b = np.where(proches, c0 * k1 * t * np.exp(-k1 * t),
+                         c0 * k1 / np.where(proches, 1, ecart) * (np.exp(-k1 * t) - np.exp(-k2 * t)))
+        return np.stack((a, b, c0 - a - b), axis=2)
+    somme = k1 + k2
+    a = c0 * (k2 + k1 * np.exp(-somme * t)) / somme
+    return np.stack((a, c0 - a), axis=2)
+
+def evolution(nom, ordre, concentration_initiale, constantes, temps):
+    """Concentrations des espèces d'un mécanisme de MECANISMES pour un lot de jeux de paramètres,
+    seul A étant présent initialement : solution exacte si elle existe, intégration sinon.
+    Les arguments et le résultat sont ceux de solution_exacte().
+    """
+    resultat = solution_exacte(nom, ordre, concentration_initiale, constantes, temps)
+    if resultat is not None:
+        return resultat
+    systeme = reseau(mecanisme(nom, ordre))
+    c0 = np.zeros((len(concentration_initiale), len(systeme['especes'])))
+    c0[:, 0] = concentration_initiale
+    return integration(systeme, c0, constantes, temps)
+
+def calcul_concentration(concentration_initiale, temps, cste_vitesse, ordre):
+    """Calcul de la concentration au cours du temps"""
+    return concentration_exacte(concentration_initiale, temps, cste_vitesse, ordre)
+
+def calcul_temps_demi_reaction(concentration_initiale, cste_vitesse, ordre):
+    """Calcul du temps de demi-réaction"""
+    return float(temps_demi_reaction(concentration_initiale, cste_vitesse, ordre))
+
+def calcul_especes(nom, concentration_initiale, temps, cste_vitesse, cste_vitesse_2, ordre):
+    """Calcul des concentrations de toutes les espèces d'un mécanisme et du temps de demi-réaction de A.
+    Pour A ⇌ B, le temps de demi-réaction est lu sur la courbe (nan si A ne descend pas à C_0 / 2).
+    """
+    if nom == 'A → P':
+        concentration = calcul_concentration(concentration_initiale, temps, cste_vitesse, ordre)
+        return concentration[np.newaxis], calcul_temps_demi_reaction(concentration_initiale, cste_vitesse, ordre)
+    especes = evolution(nom, ordre, [concentration_initiale], [[cste_vitesse, cste_vitesse_2]], temps)[0].T
+    if nom == 'A → B, A → C':
+        return especes, calcul_temps_demi_reaction(concentration_initiale, cste_vitesse + cste_vitesse_2, ordre)
+    elif nom == 'A → B → C':
+        return especes, calcul_temps_demi_reaction(concentration_initiale, cste_vitesse, ordre)
+    sous_moitie = np.flatnonzero(especes[0] <= 0.5 * concentration_initiale)
+    if len(sous_moitie) == 0:
+        return especes, np.nan
+    i = sous_moitie[0]     # i ≥ 1 : A vaut C_0 à l'instant initial
+    return especes, np.interp(0.5 * concentration_initiale, especes[0, [i, i - 1]], temps[[i, i - 1]])
+
+def verification(n_jeux=100):
+    """Compare l'intégration aux solutions exactes des mécanismes, pour n_jeux jeux de paramètres
+    tirés au hasard ; renvoie les écarts maximaux rapportés aux concentrations initiales
+    """
+    generateur = np.random.default_rng(0)
+    c0 = generateur.uniform(0.2, 1., n_jeux)
+    constantes = generateur.uniform(0.01, 0.1, (n_jeux, 2))
+    temps = np.linspace(0, 100, 101)
+    cas = [('A → P', ordre) for ordre in (0, 0.5, 1, 1.5, 2, 3)]
+    cas += [('A → B → C', 1), ('A ⇌ B', 1), ('A → B, A → C', 1), ('A → B, A → C', 2.5)]
+    ecarts = {}
+    for nom, ordre in cas:
+        systeme = reseau(mecanisme(nom, ordre))
+        initiales = np.zeros((n_jeux, len(systeme['especes'])))
+        initiales[:, 0] = c0
+        k = constantes[:, :systeme['n_reactions']]
+        calcule = integration(systeme, initiales, k, temps)
+        attendu = solution_exacte(nom, ordre, c0, k, temps)
+        ecarts['{} (ordre {})'.format(nom, ordre)] = np.max(np.abs(calcule - attendu) / c0[:, np.newaxis, np.newaxis])
+    return ecarts
+
+def verification_demi_reaction():
+    """Temps de demi-réaction de A ⇌ B d'ordre 0 lorsque A passe sous C_0 / 2 dès le premier pas
+    de temps ; renvoie la valeur lue sur la courbe et celle de la réaction A → B seule, C_0 / (2 k),
+    dont elle ne diffère que par la réaction inverse, encore négligeable
+    """
+    concentration_initiale, cste_vitesse = 0.2, 0.1
+    temps = np.linspace(0, 100, 100)
+    _, lu = calcul_especes('A ⇌ B', concentration_initiale, temps, cste_vitesse, 0.01, 0)
+    return lu, concentration_initiale / (2 * cste_vitesse)
+
+
+if __name__ == '__main__':
+    for nom, ecart in verification().items():
+        print("{:<28} écart maximal : {:.1e}".format(nom, ecart))
+    print("A ⇌ B d'ordre 0, demi-réaction au premier pas : {:.4f} (attendu {:.4f})".format(*verification_demi_reaction()))
+    n_jeux = 10**4
+    generateur = np.random.default_rng(1)
+    debut = time.perf_counter()
+    evolution('A → B → C', 1.5, generateur.uniform(0.2, 1., n_jeux),
+              generateur.uniform(0.01, 0.1, (n_jeux, 2)), np.linspace(0, 100, 101))
+    print("A → B → C d'ordre 1,5, 10⁴ jeux de paramètres : {:.2f} s".format(time.perf_counter() - debut))
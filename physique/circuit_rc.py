@@ -0,0 +1,93 @@
+# -*-coding:utf-8 -*
+
+"""Réponse fréquentielle et représentation d'état du filtre passe-bas RC.
+
+Le diagramme de Bode d'un jeu de composants est calculé en place dans un espace de travail
+(espace_travail) alloué une fois pour toutes ; celui de plusieurs jeux (bande de tolérance de
+Monte-Carlo) est calculé en une seule passe par balayage_bode, dont les résultats sont conservés
+dans un cache LRU.
+Le module n'importe pas matplotlib : le programme circuit-RC/circuit-RC.py n'en est que l'interface.
+"""
+
+from functools import lru_cache
+import numpy as np
+
+
+N_TIRAGES = 1000                # nombre de jeux de composants tirés pour la bande de tolérance
+TOLERANCE_COMPOSANTS = 0.05     # tolérance relative des composants
+TAILLE_CACHE = 32               # nombre de balayages conservés en cache
+
+
+def transfer_function(omega, tau):
+    return 1./(1 + 1j * omega * tau)
+
+def balayage_bode(omega, resistance, capacity):
+    """Calcule en une seule passe le diagramme de Bode de plusieurs jeux de composants.
+    Les résultats sont conservés dans un cache LRU indexé par les valeurs des composants et
+    la grille de pulsations : un balayage déjà calculé est renvoyé sans calcul.
+    Arguments :
+        - omega : grille de pulsations (N valeurs) ;
+        - resistance : résistances (M valeurs, ou une seule) ;
+        - capacity : capacités (M valeurs, ou une seule).
+    Renvoie un tableau en lecture seule de forme (2, M, N) : le gain, puis la phase (°).
+    """
+    return _balayage_bode(*(np.atleast_1d(np.asarray(a, dtype=float)).tobytes()
+                            for a in (omega, resistance, capacity)))
+
+@lru_cache(maxsize=TAILLE_CACHE)
+def _balayage_bode(omega, resistance, capacity):
+    """Calcul de balayage_bode à partir des octets des tableaux, qui servent de clé au cache"""
+    omega, resistance, capacity = (np.frombuffer(a) for a in (omega, resistance, capacity))
+    h = transfer_function(omega[np.newaxis, :], (resistance * capacity)[:, np.newaxis])
+    resultat = np.stack((np.abs(h), 180/np.pi * np.angle(h)))
+    resultat.flags.writeable = False
+    return resultat
+
+def tirage_composants(valeurs, tolerance=TOLERANCE_COMPOSANTS, n=N_TIRAGES, graine=0):
+    """Tire n valeurs de chaque composant, uniformément à ±tolerance de sa valeur nominale.
+    La graine fixe rend le tirage reproductible : un même jeu de valeurs nominales donne le même
+    tirage, dont le balayage est alors servi par le cache.
+    """
+    generateur = np.random.default_rng(graine)
+    return [valeur * (1 + tolerance * generateur.uniform(-1, 1, n)) for valeur in valeurs]
+
+def polygone_bande(x, bas, haut):
+    """Renvoie les sommets du polygone compris entre les courbes bas et haut"""
+    return np.column_stack((np.concatenate((x, x[::-1])), np.concatenate((bas, haut[::-1]))))
+
+def espace_travail(frequency, time, excitation_frequency):
+    """Précalcule les pulsations de la grille et la phase ωt du signal d'excitation, et alloue les
+    tableaux de résultats
+    """
+    omega_t = 2*np.pi * excitation_frequency * time
+    return {
+        'omega': 2*np.pi * frequency,
+        'omega_t': omega_t,
+        'excitation': np.sin(omega_t),
+        'gain': np.empty(len(frequency)),
+        'phase': np.empty(len(frequency)),
+        'sortie': np.empty(len(time)),
+    }
+
+def bode(travail, tau):
+    """Calcule en place le gain 1/sqrt(1 + (ωτ)²) et la phase -arctan(ωτ) (°) sur la grille de fréquences"""
+    gain, phase = travail['gain'], travail['phase']
+    np.multiply(travail['omega'], tau, out=phase)
+    np.hypot(1., phase, out=gain)
+    np.reciprocal(gain, out=gain)
+    np.arctan(phase, out=phase)
+    np.multiply(phase, -180/np.pi, out=phase)
+    return gain, phase
+
+def sinusoide(travail, amplitude, dephasage):
+    """Calcule en place amplitude * sin(ωt + dephasage) sur la grille temporelle"""
+    sortie = travail['sortie']
+    np.add(travail['omega_t'], dephasage, out=sortie)
+    np.sin(sortie, out=sortie)
+    np.multiply(sortie, amplitude, out=sortie)
+    return sortie
+
+def representation_etat(resistance, capacity):
+    """Renvoie la représentation d'état (A, B, C, D) du circuit, d'état la tension du condensateur"""
+    tau = resistance * capacity
+    return [[-1./tau]], [1./tau], [1.], 0.
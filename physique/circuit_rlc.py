@@ -0,0 +1,215 @@
+# -*-coding:utf-8 -*
+
+"""Réponse fréquentielle et représentation d'état des filtres RLC (passe-bas, passe-bande, passe-haut).
+
+La réponse ne dépend que de x = ω/ω0 et de Q. Elle est précalculée sur une table (ln x, log Q) pour
+le filtre passe-bande (table_reponse), dont le pas en ln x divise exactement celui de la grille de
+fréquences : une mise à jour se réduit à une interpolation bilinéaire entre quatre tranches
+contiguës de la table, ou à un calcul direct lorsque la précision de la table est insuffisante.
+Les résultats sont écrits en place dans un espace de travail (espace_travail) alloué une fois
+pour toutes.
+Le module n'importe pas matplotlib : le programme circuit-RLC/circuit-RLC.py n'en est que
+l'interface.
+"""
+
+from functools import lru_cache
+import numpy as np
+
+
+PAS_TABLE = 2.e-3               # pas visé de la table en ln(ω/ω0)
+TAILLE_MAX_TABLE = 2**23        # nombre maximal de valeurs de la table
+LOG_X_TABLE = (-5, 5)           # étendue de la table en log10(ω/ω0)
+LOG_Q_TABLE = (-4.5, 1.5)       # étendue de la table en log10(Q)
+PAS_LOG_Q = 0.04                # pas de la table en log10(Q)
+TOLERANCE_GAIN = 2.e-3          # erreur relative maximale tolérée sur le gain
+TOLERANCE_PHASE = 0.1           # erreur maximale tolérée sur la phase (°)
+N_TIRAGES = 1000                # nombre de jeux de composants tirés pour la bande de tolérance
+TOLERANCE_COMPOSANTS = 0.05     # tolérance relative des composants
+TAILLE_CACHE = 32               # nombre de balayages conservés en cache
+filtres = ['Passe-bas', 'Passe-bande', 'Passe-haut']
+
+
+def transfer_function(omega, omega_0, quality_factor, filtre='Passe-bande'):
+    h = 1./(1 + 1j * quality_factor * (omega/omega_0 - omega_0/omega))
+    if filtre == 'Passe-bas':
+        return h * quality_factor * omega_0 / (1j * omega)
+    elif filtre == 'Passe-haut':
+        return h * 1j * quality_factor * omega / omega_0
+    return h
+
+def parametres_filtre(resistance, capacity, inductance):
+    """Renvoie la pulsation propre ω0 et le facteur de qualité Q du circuit"""
+    return 1./np.sqrt(inductance * capacity), 1./resistance * np.sqrt(inductance / capacity)
+
+def balayage_bode(omega, resistance, capacity, inductance, filtre='Passe-bande'):
+    """Calcule en une seule passe le diagramme de Bode de plusieurs jeux de composants.
+    Les résultats sont conservés dans un cache LRU indexé par les valeurs des composants, la
+    grille de pulsations et le filtre : un balayage déjà calculé est renvoyé sans calcul.
+    Arguments :
+        - omega : grille de pulsations (N valeurs) ;
+        - resistance, capacity, inductance : valeurs des composants (M valeurs, ou une seule) ;
+        - filtre : élément de la liste filtres.
+    Renvoie un tableau en lecture seule de forme (2, M, N) : le gain, puis la phase (°).
+    """
+    return _balayage_bode(*(np.atleast_1d(np.asarray(a, dtype=float)).tobytes()
+                            for a in (omega, resistance, capacity, inductance)), filtre)
+
+@lru_cache(maxsize=TAILLE_CACHE)
+def _balayage_bode(omega, resistance, capacity, inductance, filtre):
+    """Calcul de balayage_bode à partir des octets des tableaux, qui servent de clé au cache"""
+    omega, resistance, capacity, inductance = (np.frombuffer(a) for a in (omega, resistance, capacity, inductance))
+    omega_0, quality_factor = parametres_filtre(resistance, capacity, inductance)
+    h = transfer_function(omega[np.newaxis, :], omega_0[:, np.newaxis], quality_factor[:, np.newaxis], filtre)
+    resultat = np.stack((np.abs(h), 180/np.pi * np.angle(h)))
+    resultat.flags.writeable = False
+    return resultat
+
+def tirage_composants(valeurs, tolerance=TOLERANCE_COMPOSANTS, n=N_TIRAGES, graine=0):
+    """Tire n valeurs de chaque composant, uniformément à ±tolerance de sa valeur nominale.
+    La graine fixe rend le tirage reproductible : un même jeu de valeurs nominales donne le même
+    tirage, dont le balayage est alors servi par le cache.
+    """
+    generateur = np.random.default_rng(graine)
+    return [valeur * (1 + tolerance * generateur.uniform(-1, 1, n)) for valeur in valeurs]
+
+def polygone_bande(x, bas, haut):
+    """Renvoie les sommets du polygone compris entre les courbes bas et haut"""
+    return np.column_stack((np.concatenate((x, x[::-1])), np.concatenate((bas, haut[::-1]))))
+
+def table_reponse(frequency):
+    """Précalcule le gain et la phase (°) du filtre passe-bande sur la table (ln x, log Q).
+    Le pas de la grille de fréquences vaut K pas de la table. La colonne c de la table est rangée
+    en [c % K, c // K] : les colonnes correspondant à la grille sont ainsi contiguës en mémoire.
+    Renvoie None si la table dépasse TAILLE_MAX_TABLE valeurs.
+    Arguments :
+        - frequency : grille de fréquences, régulière en échelle logarithmique.
+    """
+    pas_grille = np.log(frequency[1] / frequency[0])
+    k = max(1, int(round(pas_grille / PAS_TABLE)))
+    pas = pas_grille / k
+    n_colonnes = int(np.ceil((LOG_X_TABLE[1] - LOG_X_TABLE[0]) * np.log(10) / pas_grille))
+    log_q = np.arange(LOG_Q_TABLE[0], LOG_Q_TABLE[1] + PAS_LOG_Q/2, PAS_LOG_Q)
+    if 2 * len(log_q) * n_colonnes * k > TAILLE_MAX_TABLE:
+        return None
+    ln_x = LOG_X_TABLE[0] * np.log(10) + pas * np.arange(n_colonnes * k)
+    h = transfer_function(np.exp(ln_x)[np.newaxis, :], 1., 10**log_q[:, np.newaxis])
+    valeurs = np.stack((np.abs(h), 180/np.pi * np.angle(h)))
+    valeurs = valeurs.reshape(2, len(log_q), n_colonnes, k)
+    return {
+        'pas': pas,
+        'surechantillonnage': k,
+        'ln_x_min': ln_x[0],
+        'n_colonnes': len(ln_x),
+        'log_q': log_q,
+        'valeurs': np.ascontiguousarray(valeurs.transpose(0, 1, 3, 2)),
+    }
+
+def borne_erreur(table, quality_factor):
+    """Renvoie les bornes de l'erreur d'interpolation de la table sur le gain (relative) et la phase (°)"""
+    h2 = table['pas']**2 / 8
+    gain = h2 * max(4 * quality_factor**2, 2) + 1.1e-3
+    phase = 180/np.pi * h2 * 0.65 * max(4 * quality_factor**2, 1) + 0.04
+    return gain, phase
+
+def tranche(table, c, j, n):
+    """Renvoie le gain et la phase des n colonnes c, c + K, c + 2K, ... de la ligne j de la table"""
+    k = table['surechantillonnage']
+    return table['valeurs'][:, j, c % k, c // k:c // k + n]
+
+def espace_travail(frequency, time, excitation_frequency):
+    """Précalcule les pulsations de la grille, la table de réponse et la phase ωt du signal
+    d'excitation, et alloue les tableaux de résultats
+    """
+    omega = 2*np.pi * frequency
+    omega_t = 2*np.pi * excitation_frequency * time
+    return {
+        'omega': omega,
+        'inverse_omega': 1./omega,
+        'table': table_reponse(frequency),
+        'omega_t': omega_t,
+        'excitation': np.sin(omega_t),
+        'reponse': np.empty((2, len(frequency))),
+        'tampon': np.empty((2, len(frequency))),
+        'sortie': np.empty(len(time)),
+    }
+
+def interpolation_table(travail, omega_0, quality_factor):
+    """Calcule en place le gain et la phase (°) du filtre passe-bande par décalage et interpolation
+    de la table. Renvoie False si la table est absente, si les paramètres en sortent ou si sa
+    précision est insuffisante.
+    """
+    table, omega = travail['table'], travail['omega']
+    if table is None:
+        return False
+
+    # Position de la première fréquence dans la table (colonnes) et de Q (lignes)
+    colonne = (np.log(omega[0] / omega_0) - table['ln_x_min']) / table['pas']
+    ligne = (np.log10(quality_factor) - table['log_q'][0]) / PAS_LOG_Q
+    i, j = int(np.floor(colonne)), int(np.floor(ligne))
+    borne_gain, borne_phase = borne_erreur(table, quality_factor)
+    if (i < 0 or i + 1 + table['surechantillonnage'] * (len(omega) - 1) >= table['n_colonnes']
+            or j < 0 or j + 1 >= len(table['log_q'])
+            or borne_gain > TOLERANCE_GAIN or borne_phase > TOLERANCE_PHASE):
+        return False
+
+    # Interpolation bilinéaire : les poids sont les mêmes pour tous les points de la grille
+    a, b = colonne - i, ligne - j
+    resultat, tampon = travail['reponse'], travail['tampon']
+    np.multiply(tranche(table, i, j, len(omega)), (1 - a) * (1 - b), out=resultat)
+    for di, dj, poids in ((1, 0, a * (1 - b)), (0, 1, (1 - a) * b), (1, 1, a * b)):
+        np.multiply(tranche(table, i + di, j + dj, len(omega)), poids, out=tampon)
+        np.add(resultat, tampon, out=resultat)
+    return True
+
+def passe_bande(travail, omega_0, quality_factor):
+    """Calcule en place le gain 1/sqrt(1 + D²) et la phase -arctan(D) (°) du filtre passe-bande"""
+    gain, phase = travail['reponse']
+    np.multiply(travail['omega'], 1./omega_0, out=phase)
+    np.multiply(travail['inverse_omega'], omega_0, out=gain)
+    np.subtract(phase, gain, out=phase)
+    np.multiply(phase, quality_factor, out=phase)
+    np.hypot(1., phase, out=gain)
+    np.reciprocal(gain, out=gain)
+    np.arctan(phase, out=phase)
+    np.multiply(phase, -180/np.pi, out=phase)
+
+def reponse(travail, omega_0, quality_factor, filtre):
+    """Calcule en place le gain et la phase (°) sur la grille de fréquences, par décalage et
+    interpolation de la table, ou directement si la précision de la table est insuffisante.
+    Renvoie des vues sur les tableaux de l'espace de travail.
+    """
+    if not interpolation_table(travail, omega_0, quality_factor):
+        passe_bande(travail, omega_0, quality_factor)
+    gain, phase = travail['reponse']
+
+    # Passage aux filtres passe-bas et passe-haut : facteurs exacts Q/x et Q x
+    if filtre == 'Passe-bas':
+        gain *= travail['inverse_omega']
+        gain *= quality_factor * omega_0
+        phase -= 90
+    elif filtre == 'Passe-haut':
+        gain *= travail['omega']
+        gain *= quality_factor / omega_0
+        phase += 90
+    return gain, phase
+
+def representation_etat(resistance, capacity, inductance, filtre):
+    """Renvoie la représentation d'état (A, B, C, D) du circuit, d'état (tension du condensateur,
+    intensité), la sortie étant la tension aux bornes du condensateur (passe-bas), de la
+    résistance (passe-bande) ou de la bobine (passe-haut).
+    """
+    a = [[0., 1./capacity], [-1./inductance, -resistance/inductance]]
+    b = [0., 1./inductance]
+    if filtre == 'Passe-bas':
+        return a, b, [1., 0.], 0.
+    elif filtre == 'Passe-haut':
+        return a, b, [-1., -resistance], 1.
+    return a, b, [0., resistance], 0.
+
+def sinusoide(travail, amplitude, dephasage):
+    """Calcule en place amplitude * sin(ωt + dephasage) sur la grille temporelle"""
+    sortie = travail['sortie']
+    np.add(travail['omega_t'], dephasage, out=sortie)
+    np.sin(sortie, out=sortie)
+    np.multiply(sortie, amplitude, out=sortie)
+    return sortie
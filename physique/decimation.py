@@ -0,0 +1,133 @@
+# -*-coding:utf-8 -*
+
+"""Réduction des courbes au nombre de colonnes de pixels de leur graphe.
+
+Une courbe de plusieurs millions de points ne peut pas être représentée plus finement que la
+largeur en pixels de son graphe : seuls quelques points par colonne sont transmis à matplotlib,
+si bien que le coût du tracé ne dépend plus de la taille des données.
+Deux méthodes sont disponibles :
+    - MINMAX : dans chaque colonne de pixels, les points de valeur minimale et maximale, ainsi que
+      le premier et le dernier, qui raccordent les colonnes voisines ; le tracé obtenu est celui
+      des données complètes, pics compris ;
+    - LTTB (Largest Triangle Three Buckets) : POINTS_PAR_COLONNE points par colonne, chacun
+      choisi dans son intervalle comme formant le plus grand triangle avec le point retenu
+      précédemment et la moyenne de l'intervalle suivant.
+Les abscisses doivent être croissantes. Les bords des colonnes sont ceux des pixels de l'écran,
+ramenés dans les unités des données par la transformation du graphe (quelle que soit son échelle).
+
+Une courbe associée par associer() garde ses données complètes ; la réduction est recalculée à
+chaque changement des limites de l'axe des abscisses (zoom, déplacement) ou de la taille de la
+fenêtre. Le module n'importe pas matplotlib : il n'utilise que les objets qui lui sont transmis.
+"""
+
+import numpy as np
+
+
+MINMAX = 'minmax'
+LTTB = 'lttb'
+POINTS_PAR_COLONNE = 2
+
+traces = {}             # courbe -> données complètes et méthode de réduction
+axes_surveilles = []    # axes dont les changements de limites sont suivis
+
+
+def fenetre(x, x_min, x_max):
+    """Renvoie les indices [debut, fin[ des points visibles entre x_min et x_max, prolongés d'un
+    point de part et d'autre pour que la courbe atteigne les bords du graphe
+    """
+    debut = max(int(np.searchsorted(x, x_min, 'left')) - 1, 0)
+    fin = min(int(np.searchsorted(x, x_max, 'right')) + 1, len(x))
+    return debut, fin
+
+def premiers(masque, bornes):
+    """Renvoie, pour chaque intervalle délimité par bornes, l'indice du premier élément vrai du masque"""
+    indices = np.flatnonzero(masque)
+    intervalles = np.searchsorted(bornes, indices, 'right') - 1
+    return indices[np.unique(intervalles, return_index=True)[1]]
+
+def indices_minmax(x, y, bords):
+    """Renvoie les indices du premier et du dernier point et des points de valeur minimale et
+    maximale de chaque colonne de pixels.
+    Arguments :
+        - x, y : données complètes, x croissant ;
+        - bords : abscisses croissantes des bords des colonnes, du bord gauche au bord droit du graphe.
+    """
+    debut, fin = fenetre(x, bords[0], bords[-1])
+    if fin - debut <= 4 * (len(bords) - 1):
+        return np.arange(debut, fin)
+    bornes = np.unique(np.clip(np.searchsorted(x, bords[1:-1]), debut, fin))
+    bornes = np.concatenate(([0], bornes[(bornes > debut) & (bornes < fin)] - debut))
+    segment = y[debut:fin]
+    longueurs = np.diff(np.append(bornes, len(segment)))
+    minimums = premiers(segment == np.repeat(np.minimum.reduceat(segment, bornes), longueurs), bornes)
+    maximums = premiers(segment == np.repeat(np.maximum.reduceat(segment, bornes), longueurs), bornes)
+    extremites = np.concatenate((bornes, bornes[1:] - 1, [len(segment) - 1]))
+    return debut + np.unique(np.concatenate((extremites, minimums, maximums)))
+
+def indices_lttb(x, y, x_min, x_max, n_points):
+    """Renvoie les indices de n_points points choisis par la méthode LTTB parmi les points visibles"""
+    debut, fin = fenetre(x, x_min, x_max)
+    if fin - debut <= n_points:
+        return np.arange(debut, fin)
+    bornes = np.linspace(debut + 1, fin - 1, n_points - 1).astype(int)
+    retenus = np.empty(n_points, dtype=int)
+    retenus[0], retenus[-1] = debut, fin - 1
+    a = debut
+    for k in range(n_points - 2):
+        gauche, droite = bornes[k], bornes[k + 1]
+        if k + 2 < len(bornes):
+            x_suivant = np.mean(x[droite:bornes[k + 2]])
+            y_suivant = np.mean(y[droite:bornes[k + 2]])
+        else:
+            x_suivant, y_suivant = x[fin - 1], y[fin - 1]
+        aires = np.abs((x[a] - x_suivant) * (y[gauche:droite] - y[a])
+                       - (x[a] - x[gauche:droite]) * (y_suivant - y[a]))
+        a = gauche + int(np.argmax(aires))
+        retenus[k + 1] = a
+    return retenus
+
+def bords_pixels(axe):
+    """Renvoie les abscisses (unités des données) des bords des colonnes de pixels d'un graphe"""
+    x_min, x_max = sorted(axe.get_xlim())
+    y = axe.get_ylim()[0]
+    gauche, droite = axe.transData.transform([(x_min, y), (x_max, y)])[:, 0]
+    gauche, droite = sorted((gauche, droite))
+    pixels = np.arange(np.floor(gauche) + 1, droite)
+    interieurs = axe.transData.inverted().transform(np.column_stack((pixels, np.zeros_like(pixels))))[:, 0]
+    return np.concatenate(([x_min], np.sort(interieurs), [x_max]))
+
+def reduction(courbe):
+    """Transmet à la courbe les points retenus pour les limites et la largeur actuelles de son graphe"""
+    trace = traces[courbe]
+    bords = bords_pixels(courbe.axes)
+    if trace['methode'] == LTTB:
+        indices = indices_lttb(trace['x'], trace['y'], bords[0], bords[-1], POINTS_PAR_COLONNE * (len(bords) - 1))
+    else:
+        indices = indices_minmax(trace['x'], trace['y'], bords)
+    courbe.set_data(trace['x'][indices], trace['y'][indices])
+
+def rafraichir(axe):
+    """Recalcule la réduction de toutes les courbes associées d'un graphe"""
+    for courbe in traces:
+        if courbe.axes is axe:
+            reduction(courbe)
+
+def associer(courbe, x, y, methode=MINMAX):
+    """Associe à une courbe (Line2D) ses données complètes, dont seule la réduction est tracée.
+    Les tableaux ne sont pas copiés : ils peuvent être modifiés en place, puis mise_a_jour appelée.
+    """
+    traces[courbe] = {'x': np.asarray(x), 'y': np.asarray(y), 'methode': methode}
+    axe = courbe.axes
+    if all(axe is not surveille for surveille in axes_surveilles):
+        axes_surveilles.append(axe)
+        axe.callbacks.connect('xlim_changed', rafraichir)
+        axe.figure.canvas.mpl_connect('resize_event', lambda event: rafraichir(axe))
+    reduction(courbe)
+
+def mise_a_jour(courbe, x=None, y=None):
+    """Remplace les abscisses et/ou les ordonnées complètes d'une courbe associée et la retrace"""
+    if x is not None:
+        traces[courbe]['x'] = np.asarray(x)
+    if y is not None:
+        traces[courbe]['y'] = np.asarray(y)
+    reduction(courbe)
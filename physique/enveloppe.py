@@ -0,0 +1,127 @@
+# -*-coding:utf-8 -*
+
+"""Estimation de l'enveloppe et de la fréquence des battements d'un signal quelconque.
+
+L'enveloppe est le module du signal analytique z = x + j H(x), où H est la transformée de Hilbert,
+obtenu par transformée de Fourier : les fréquences négatives sont annulées et les positives doublées.
+Pour deux sinus d'amplitudes a et b et de fréquences f1 et f2 :
+    |z|² = a² + b² + 2 a b cos(2π (f1 - f2) t)
+si bien que l'enveloppe oscille à la fréquence des battements |f1 - f2|.
+
+Le signal est traité en une seule passe, par tranches de TAILLE_TRANCHE échantillons prolongées de
+MARGE échantillons de part et d'autre : seule la partie centrale de chaque transformée est conservée,
+ce qui écarte les effets de bord. La mémoire utilisée ne dépend donc pas de la durée du signal.
+L'enveloppe est échantillonnée à frequence_enveloppe ; la fréquence des battements est estimée sur
+des fenêtres successives de duree_analyse secondes, par le maximum (interpolé) du spectre de
+l'enveloppe. Le résultat est une série temporelle compacte.
+"""
+
+import numpy as np
+
+
+TAILLE_TRANCHE = 2**16          # nombre d'échantillons conservés par transformée
+MARGE = 2**12                   # nombre d'échantillons ajoutés de part et d'autre de chaque tranche
+FREQUENCE_ENVELOPPE = 1000.     # fréquence d'échantillonnage de l'enveloppe (Hz)
+DUREE_ANALYSE = 1.              # durée des fenêtres d'estimation de la fréquence des battements (s)
+SURECHANTILLONNAGE = 8          # facteur de complétion par des zéros du spectre de l'enveloppe
+SEUIL_MODULATION = 1.e-3        # modulation relative en dessous de laquelle il n'y a pas de battements
+
+
+def tranches(blocs, taille=TAILLE_TRANCHE, marge=MARGE):
+    """Générateur de tranches recouvrantes d'un signal fourni par blocs.
+    Chaque tranche contient taille + 2 marge échantillons, la partie utile commençant à l'indice
+    marge ; le signal est complété par des zéros avant son début et après sa fin. Renvoie des
+    couples (tranche, nombre d'échantillons utiles). La tranche est réutilisée d'un appel à l'autre.
+    """
+    if taille < 2 * marge:
+        raise ValueError("La tranche doit contenir au moins deux marges")
+    n = taille + 2 * marge
+    tranche = np.zeros(n)
+    remplissage = marge
+    reste = np.zeros(0)
+    iterateur = iter(blocs)
+    while True:
+        while remplissage < n:
+            if len(reste) == 0:
+                reste = next(iterateur, None)
+                if reste is None:
+                    break
+                reste = np.asarray(reste, dtype=float)
+            k = min(n - remplissage, len(reste))
+            tranche[remplissage:remplissage + k] = reste[:k]
+            reste = reste[k:]
+            remplissage += k
+        if remplissage < n:
+            tranche[remplissage:] = 0
+            if remplissage > marge:
+                yield tranche, remplissage - marge
+            return
+        yield tranche, taille
+        tranche[:2 * marge] = tranche[taille:]
+        remplissage = 2 * marge
+
+def filtre_analytique(n):
+    """Renvoie les coefficients qui, appliqués à la transformée de Fourier d'un signal de n
+    échantillons, donnent celle du signal analytique
+    """
+    h = np.zeros(n)
+    h[0] = 1
+    h[1:(n + 1) // 2] = 2
+    if n % 2 == 0:
+        h[n // 2] = 1
+    return h
+
+def frequence_dominante(enveloppe, frequence_echantillonnage):
+    """Renvoie la fréquence du maximum du spectre de l'enveloppe (hors composante continue),
+    interpolée par une parabole sur le logarithme du module, ou 0 si l'enveloppe n'est pas modulée.
+    """
+    moyenne = np.mean(enveloppe)
+    variation = enveloppe - moyenne
+    if np.max(np.abs(variation)) <= SEUIL_MODULATION * max(moyenne, 1.e-300):
+        return 0.
+    n = SURECHANTILLONNAGE * len(enveloppe)
+    module = np.abs(np.fft.rfft(variation * np.hanning(len(enveloppe)), n))
+    i = 1 + np.argmax(module[1:-1])
+    gauche, centre, droite = np.log(module[i - 1:i + 2] + 1.e-300)
+    decalage = 0.5 * (gauche - droite) / (gauche - 2 * centre + droite) if gauche - 2 * centre + droite < 0 else 0.
+    return (i + decalage) * frequence_echantillonnage / n
+
+def analyse_battements(blocs, frequence_echantillonnage, frequence_enveloppe=FREQUENCE_ENVELOPPE,
+                       duree_analyse=DUREE_ANALYSE):
+    """Estime l'enveloppe et la fréquence des battements d'un signal fourni par blocs.
+    Arguments :
+        - blocs : itérable de tableaux 1D, échantillons successifs du signal ;
+        - frequence_echantillonnage : fréquence d'échantillonnage du signal (Hz) ;
+        - frequence_enveloppe : fréquence d'échantillonnage de l'enveloppe (Hz), supérieure au
+          double de la fréquence des battements ;
+        - duree_analyse : durée des fenêtres d'estimation de la fréquence des battements (s).
+    Renvoie un dictionnaire contenant les dates et valeurs de l'enveloppe ('temps_enveloppe',
+    'enveloppe') et de la fréquence des battements ('temps_frequence', 'frequence').
+    """
+    decimation = max(1, int(round(frequence_echantillonnage / frequence_enveloppe)))
+    frequence_enveloppe = frequence_echantillonnage / decimation
+    n_analyse = max(4, int(round(duree_analyse * frequence_enveloppe)))
+    h = filtre_analytique(TAILLE_TRANCHE + 2 * MARGE)
+
+    enveloppes = []
+    frequences = []
+    en_attente = np.zeros(0)    # enveloppe pas encore analysée
+    debut = 0                   # indice du premier échantillon utile de la tranche
+    for tranche, utiles in tranches(blocs):
+        z = np.fft.ifft(np.fft.fft(tranche) * h)
+        decalage = (-debut) % decimation
+        enveloppe = np.abs(z[MARGE + decalage:MARGE + utiles:decimation])
+        enveloppes.append(enveloppe)
+        en_attente = np.concatenate((en_attente, enveloppe))
+        while len(en_attente) >= n_analyse:
+            frequences.append(frequence_dominante(en_attente[:n_analyse], frequence_enveloppe))
+            en_attente = en_attente[n_analyse:]
+        debut += utiles
+
+    enveloppe = np.concatenate(enveloppes) if enveloppes else np.zeros(0)
+    return {
+        'temps_enveloppe': np.arange(len(enveloppe)) / frequence_enveloppe,
+        'enveloppe': enveloppe,
+        'temps_frequence': (np.arange(len(frequences)) + 0.5) * n_analyse / frequence_enveloppe,
+        'frequence': np.array(frequences),
+    }
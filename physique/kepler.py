@@ -0,0 +1,299 @@
+# -*-coding:utf-8 -*
+
+"""Orbites kepleriennes et integration N corps.
+
+Trace adaptatif de l'orbite relative et des orbites des deux astres, resolution vectorisee de
+l'equation de Kepler, trace d'un ensemble d'orbites en une seule passe, et integrateur
+symplectique de Yoshida d'ordre 4 pour le mode N corps.
+Ce module n'importe pas matplotlib : le programme kepler/kepler.py n'en est que l'interface.
+"""
+
+import math
+import os
+import hashlib
+import tempfile
+import itertools
+import numpy as np
+
+
+# Constantes utiles
+G=6.67408e-11 # Constante de la gravitation en m3.kg-1.s-2
+Msun=1.988e30 # Masse du Soleil en kg
+Mearth=5.9722e24 # Masse de la Terre en kg
+UA=1.495978707e11 # Unite astronomique en m
+an=365.0*86400. # annee en s
+liste_unite_de_masse=('Masse solaire', 'Masse terrestre')
+N_POINTS_ENSEMBLE=256 # Nombre de points par orbite pour le trace d'un ensemble d'orbites
+TOLERANCE=1e-6 # Ecart maximal entre l'orbite et le trace, rapporte au demi-grand axe
+N_POINTS_AUXILIAIRE=4096 # Nombre de points de la grille auxiliaire de l'echantillonnage adaptatif
+COLONNES_CATALOGUE=('a','e','theta0','M1','M2') # Colonnes d'un catalogue d'orbites
+G_UA=G*math.pow(an,2.0)/math.pow(UA,3.0) # Constante de la gravitation en UA3.kg-1.an-2
+PAS_PAR_BLOC=50 # Nombre de pas d'integration N corps par bloc (une image de l'animation)
+TAILLE_BLOC_ENSEMBLE=4096 # Nombre d'orbites calculees a la fois par trace_ensemble
+LIGNES_PAR_BLOC=65536 # Nombre de lignes d'un catalogue CSV lues a la fois
+REPERTOIRE_CATALOGUES=os.path.join(tempfile.gettempdir(),'physique_catalogues') # Conversions .npy des catalogues CSV
+
+
+# Fonction retournant la masse en kg
+def mass(M_val,M_unit):
+    if (M_unit=="Masse solaire"):M=M_val*Msun
+    if (M_unit=="Masse terrestre"):M=M_val*Mearth    
+    return(M)
+
+# Echantillonnage adaptatif de l'orbite, renvoie des anomalies excentriques E de 0 a 2pi
+# En unites de demi-grand axe, la position est (cos(E)-e, b*sin(E)) avec b=sqrt(1-e^2) et ds/dE=g(E)=sqrt(sin(E)^2+b^2*cos(E)^2).
+# La fleche d'une corde de pas dE vaut b*dE^2/(8*g(E)) : le pas maximal respectant la tolerance est sqrt(8*tolerance*g/b).
+# Les points sont places en inversant la primitive de l'inverse de ce pas, calculee sur une grille auxiliaire.
+# Ils se concentrent aux extremites du grand axe, ou la courbure est maximale (periastre et apoastre).
+def echantillonnage(e,tolerance=TOLERANCE):
+    b=math.sqrt(1.0-math.pow(e,2.0))
+    E_aux=np.linspace(0.0,2.0*math.pi,N_POINTS_AUXILIAIRE+1)
+    g=np.sqrt(np.square(np.sin(E_aux))+math.pow(b,2.0)*np.square(np.cos(E_aux)))
+    densite=np.sqrt(b/(8.0*tolerance*g))
+    cumul=np.concatenate(([0.0],np.cumsum(0.5*(densite[1:]+densite[:-1])*np.diff(E_aux))))
+    n=max(int(math.ceil(cumul[-1])),16)+1
+    return(np.interp(np.linspace(0.0,cumul[-1],n),cumul,E_aux))
+
+# Ecart maximal (rapporte au demi-grand axe) entre l'orbite et la ligne brisee passant par les points d'anomalies E
+def erreur_echantillonnage(E,e):
+    b=math.sqrt(1.0-math.pow(e,2.0))
+    dE=np.diff(E)
+    E_milieu=0.5*(E[1:]+E[:-1])
+    g=np.sqrt(np.square(np.sin(E_milieu))+math.pow(b,2.0)*np.square(np.cos(E_milieu)))
+    return(np.max(b*np.square(dE)/(8.0*g)))
+
+# Creation de la fonction a tracer 
+def trace(theta0,M1_val,M1_unit,M2_val,M2_unit,a_UA,e,tolerance=TOLERANCE):
+    M1=mass(M1_val,M1_unit)
+    M2=mass(M2_val,M2_unit)
+    a=a_UA*UA
+    # Masse reduite
+    mu=M1*M2/(M1+M2)
+    # Facteur K de la force centrale F=-K/r2
+    K=G*M1*M2
+    L=math.sqrt(K*mu*a*(1.0-math.pow(e,2.0)))
+    theta0_rad=(math.pi/180.)*theta0
+    p=math.pow(L,2.0)/(K*mu)
+    # Angles polaires correspondant a l'echantillonnage adaptatif en anomalie excentrique
+    E=echantillonnage(e,tolerance)
+    theta=theta0_rad+2.0*np.arctan2(math.sqrt(1.0+e)*np.sin(0.5*E),math.sqrt(1.0-e)*np.cos(0.5*E))
+    # Mouvement de la particule fictive
+    r=p/(1+e*np.cos(theta-theta0_rad))
+    # Projection de ce mouvement, converti en UA
+    x=r*np.cos(theta)/UA
+    y=r*np.sin(theta)/UA
+    # Mouvement de l'objet M1
+    x1=-(M2/(M1+M2))*x
+    y1=-(M2/(M1+M2))*y
+    # Mouvement de l'objet M2
+    x2=(M1/(M1+M2))*x
+    y2=(M1/(M1+M2))*y
+    return(x,y,x1,y1,x2,y2)
+
+# Resolution vectorisee de l'equation de Kepler M=E-e*sin(E), pour un tableau d'anomalies moyennes M
+# Par symetrie E(2pi-M)=2pi-E(M), on se ramene a M dans [0,pi]. Sur [0,pi], f(E)=E-e*sin(E)-M est croissante
+# et convexe : la methode de Newton partant d'une valeur ou f>=0 converge alors de facon monotone vers la
+# solution, y compris pour e proche de 1. On part de min(M+e,pi), ou de la racine cubique (6M/e)^(1/3)
+# (developpement limite pres du periastre) lorsqu'elle convient et est plus proche.
+# Seules les valeurs non encore convergees sont iterees.
+def anomalie_excentrique(M,e,tol=1e-12,iter_max=100):
+    forme=np.shape(M)
+    M=np.remainder(np.atleast_1d(np.asarray(M,dtype=float)),2.0*math.pi)
+    symetrique=M>math.pi
+    M[symetrique]=2.0*math.pi-M[symetrique]
+    E=np.minimum(M+e,math.pi)
+    if e>0.0:
+        Ec=np.cbrt(6.0*M/e)
+        E=np.where((Ec<E)&(Ec-e*np.sin(Ec)>=M),Ec,E)
+    E_plat,M_plat=E.reshape(-1),M.reshape(-1)
+    actifs=None # indices des valeurs non convergees, une fois qu'elles sont peu nombreuses
+    for i in range(iter_max):
+        if actifs is None:
+            dE=(E_plat-e*np.sin(E_plat)-M_plat)/(1.0-e*np.cos(E_plat))
+            E_plat-=dE
+            non_convergees=dE>tol
+            if np.count_nonzero(non_convergees)<E_plat.size//4:
+                actifs=np.flatnonzero(non_convergees)
+        else:
+            Ea=E_plat[actifs]
+            dE=(Ea-e*np.sin(Ea)-M_plat[actifs])/(1.0-e*np.cos(Ea))
+            E_plat[actifs]=Ea-dE
+            actifs=actifs[dE>tol]
+        if actifs is not None and actifs.size==0:break
+    E[symetrique]=2.0*math.pi-E[symetrique]
+    return(E.reshape(forme))
+
+# Periode de revolution en annees
+def periode(M1_val,M1_unit,M2_val,M2_unit,a_UA):
+    M1=mass(M1_val,M1_unit)
+    M2=mass(M2_val,M2_unit)
+    a=a_UA*UA
+    return(2.0*math.pi*math.sqrt(math.pow(a,3.0)/(G*(M1+M2)))/an)
+
+# Positions a des dates donnees (tableau t, en annees), le passage au periastre ayant lieu a t_peri
+# Les sorties sont les memes que celles de trace, mais pour chaque date au lieu de chaque angle
+def propagation(t,theta0,M1_val,M1_unit,M2_val,M2_unit,a_UA,e,t_peri=0.0):
+    M1=mass(M1_val,M1_unit)
+    M2=mass(M2_val,M2_unit)
+    # Anomalie moyenne
+    M=2.0*math.pi*(np.asarray(t,dtype=float)-t_peri)/periode(M1_val,M1_unit,M2_val,M2_unit,a_UA)
+    E=anomalie_excentrique(M,e)
+    # Mouvement de la particule fictive dans le repere du periastre, en UA
+    xp=a_UA*(np.cos(E)-e)
+    yp=a_UA*math.sqrt(1.0-math.pow(e,2.0))*np.sin(E)
+    # Rotation de l'angle du periastre
+    theta0_rad=(math.pi/180.)*theta0
+    x=math.cos(theta0_rad)*xp-math.sin(theta0_rad)*yp
+    y=math.sin(theta0_rad)*xp+math.cos(theta0_rad)*yp
+    # Mouvement des objets M1 et M2
+    x1=-(M2/(M1+M2))*x
+    y1=-(M2/(M1+M2))*y
+    x2=(M1/(M1+M2))*x
+    y2=(M1/(M1+M2))*y
+    return(x,y,x1,y1,x2,y2)
+
+# Trace vectorise d'un ensemble d'orbites : theta0 (degres), M1, M2 (kg), a_UA et e sont des tableaux de
+# meme longueur N, eventuellement projetes en memoire. Les orbites sont calculees par blocs de TAILLE_BLOC_ENSEMBLE,
+# chaque bloc par diffusion (broadcasting), et ecrites directement dans un tableau de segments (N,n_points,2)
+# qui peut etre transmis tel quel a une LineCollection : la memoire utilisee en plus du resultat ne depend
+# que de la taille des blocs. Seule l'orbite relative est calculee, sauf si astres est vrai : les segments
+# des orbites de M1 et M2 sont alors renvoyes en plus.
+# L'echantillonnage est uniforme en anomalie excentrique : d'apres erreur_echantillonnage, l'ecart au
+# trace exact est au plus (2pi/n_points)^2/8 fois le demi-grand axe, quelle que soit l'excentricite.
+def trace_ensemble(theta0,M1,M2,a_UA,e,n_points=N_POINTS_ENSEMBLE,astres=False):
+    E=np.linspace(0.0,2.0*math.pi,n_points)
+    cosE,sinE=np.cos(E),np.sin(E)
+    segments=np.empty((len(a_UA),n_points,2))
+    if astres:segments1,segments2=np.empty_like(segments),np.empty_like(segments)
+    for debut in range(0,len(a_UA),TAILLE_BLOC_ENSEMBLE):
+        bloc=slice(debut,debut+TAILLE_BLOC_ENSEMBLE)
+        theta0_rad=np.radians(np.asarray(theta0[bloc],dtype=float))[:,np.newaxis]
+        a_bloc=np.asarray(a_UA[bloc],dtype=float)[:,np.newaxis]
+        e_bloc=np.asarray(e[bloc],dtype=float)[:,np.newaxis]
+        # Mouvement de la particule fictive dans le repere du periastre, puis rotation de l'angle du periastre
+        xp=a_bloc*(cosE-e_bloc)
+        yp=a_bloc*np.sqrt(1.0-np.square(e_bloc))*sinE
+        x,y=segments[bloc,:,0],segments[bloc,:,1]
+        np.multiply(np.cos(theta0_rad),xp,out=x)
+        x-=np.sin(theta0_rad)*yp
+        np.multiply(np.sin(theta0_rad),xp,out=y)
+        y+=np.cos(theta0_rad)*yp
+        if astres:
+            # Rapports de masses pour les mouvements de M1 et M2
+            M1_bloc=np.asarray(M1[bloc],dtype=float)[:,np.newaxis,np.newaxis]
+            M2_bloc=np.asarray(M2[bloc],dtype=float)[:,np.newaxis,np.newaxis]
+            np.multiply(-M2_bloc/(M1_bloc+M2_bloc),segments[bloc],out=segments1[bloc])
+            np.multiply(M1_bloc/(M1_bloc+M2_bloc),segments[bloc],out=segments2[bloc])
+    if astres:return(segments,segments1,segments2)
+    return(segments)
+
+# Lecture d'un catalogue d'orbites, un tableau (N,5) de colonnes COLONNES_CATALOGUE (masses en masses solaires)
+# Un fichier .npy est projete en memoire. Un fichier .csv (une ligne d'en-tete) est converti par blocs de
+# LIGNES_PAR_BLOC lignes en un fichier .npy du repertoire REPERTOIRE_CATALOGUES (repertoire temporaire), qui est
+# ensuite projete en memoire : ni le CSV, ni le tableau ne sont lus en entier en memoire, et rien n'est ecrit
+# a cote du catalogue. La conversion est reutilisee tant que le CSV n'est pas modifie (meme chemin, taille et date).
+def charger_catalogue(chemin):
+    if chemin.endswith('.csv'):chemin=conversion_catalogue(chemin)
+    catalogue=np.load(chemin,mmap_mode='r')
+    if catalogue.ndim!=2 or catalogue.shape[1]!=len(COLONNES_CATALOGUE):
+        raise ValueError("Le catalogue doit avoir les colonnes "+', '.join(COLONNES_CATALOGUE))
+    a_UA,e,theta0,M1_val,M2_val=catalogue.T
+    return(theta0,mass(M1_val,'Masse solaire'),mass(M2_val,'Masse solaire'),a_UA,e)
+
+# Conversion par blocs d'un catalogue CSV en fichier .npy du repertoire REPERTOIRE_CATALOGUES, renvoie son chemin
+def conversion_catalogue(chemin):
+    etat=os.stat(chemin)
+    signature=hashlib.sha1("{}|{}|{}".format(os.path.abspath(chemin),etat.st_size,etat.st_mtime_ns).encode()).hexdigest()
+    cache=os.path.join(REPERTOIRE_CATALOGUES,signature[:16]+'.npy')
+    if os.path.exists(cache):return(cache)
+    os.makedirs(REPERTOIRE_CATALOGUES,exist_ok=True)
+    with open(chemin) as fichier:
+        n_lignes=sum(1 for ligne in fichier if ligne.strip())-1 # premier passage : nombre d'orbites
+    provisoire=cache+'.{}.tmp'.format(os.getpid())
+    try:
+        tableau=np.lib.format.open_memmap(provisoire,mode='w+',dtype=float,shape=(n_lignes,len(COLONNES_CATALOGUE)))
+        with open(chemin) as fichier:
+            next(fichier) # en-tete
+            lignes=(ligne for ligne in fichier if ligne.strip())
+            debut=0
+            while debut<n_lignes:
+                bloc=np.loadtxt(itertools.islice(lignes,LIGNES_PAR_BLOC),delimiter=',',ndmin=2)
+                tableau[debut:debut+len(bloc)]=bloc
+                debut+=len(bloc)
+        tableau.flush()
+        del tableau
+        os.replace(provisoire,cache) # le fichier n'apparait qu'une fois complet
+    finally:
+        if os.path.exists(provisoire):os.remove(provisoire)
+    return(cache)
+
+# Conditions initiales du probleme a deux corps, au passage au periastre
+# Renvoie les positions (UA), les vitesses (UA/an) et les masses (kg) des deux astres, de barycentre fixe a l'origine
+def conditions_initiales(theta0,M1_val,M1_unit,M2_val,M2_unit,a_UA,e):
+    M1=mass(M1_val,M1_unit)
+    M2=mass(M2_val,M2_unit)
+    theta0_rad=(math.pi/180.)*theta0
+    # Particule fictive au periastre : distance a(1-e), vitesse orthogonale donnee par la loi de conservation de l'energie
+    r=a_UA*(1.0-e)
+    v=math.sqrt(G_UA*(M1+M2)*(1.0+e)/r)
+    position=np.array([math.cos(theta0_rad),math.sin(theta0_rad)])*r
+    vitesse=np.array([-math.sin(theta0_rad),math.cos(theta0_rad)])*v
+    q=np.array([-M2/(M1+M2),M1/(M1+M2)])[:,np.newaxis]
+    return(q*position,q*vitesse,np.array([M1,M2]))
+
+# Ajout d'un astre de masse M (kg) sur une orbite circulaire de rayon a_UA autour du barycentre du systeme
+# (par exemple une planete autour d'une etoile double), puis recentrage sur le barycentre
+def ajouter_astre(positions,vitesses,masses,M,a_UA,theta=0.0):
+    v=math.sqrt(G_UA*(np.sum(masses)+M)/a_UA)
+    positions=np.vstack((positions,[a_UA*math.cos(theta),a_UA*math.sin(theta)]))
+    vitesses=np.vstack((vitesses,[-v*math.sin(theta),v*math.cos(theta)]))
+    masses=np.append(masses,M)
+    vitesses=vitesses-np.sum(masses[:,np.newaxis]*vitesses,axis=0)/np.sum(masses)
+    positions=positions-np.sum(masses[:,np.newaxis]*positions,axis=0)/np.sum(masses)
+    return(positions,vitesses,masses)
+
+# Accelerations de N astres (positions de forme (N,2) en UA), calculees pour toutes les paires a la fois
+def accelerations(positions,masses):
+    d=positions[np.newaxis,:,:]-positions[:,np.newaxis,:] # d[i,j]=r_j-r_i
+    r2=np.sum(np.square(d),axis=-1)
+    np.fill_diagonal(r2,np.inf)
+    return(G_UA*np.einsum('ij,ijk->ik',masses[np.newaxis,:]*np.power(r2,-1.5),d))
+
+# Energie mecanique totale du systeme
+def energie(positions,vitesses,masses):
+    i,j=np.triu_indices(len(masses),1)
+    distances=np.sqrt(np.sum(np.square(positions[j]-positions[i]),axis=-1))
+    return(0.5*np.sum(masses*np.sum(np.square(vitesses),axis=-1))-G_UA*np.sum(masses[i]*masses[j]/distances))
+
+# Coefficients de l'integrateur symplectique de Yoshida d'ordre 4 : composition de trois pas saute-mouton
+YOSHIDA_W1=1.0/(2.0-math.pow(2.0,1.0/3.0))
+YOSHIDA_W0=-math.pow(2.0,1.0/3.0)*YOSHIDA_W1
+YOSHIDA_C=(0.5*YOSHIDA_W1,0.5*(YOSHIDA_W0+YOSHIDA_W1),0.5*(YOSHIDA_W0+YOSHIDA_W1),0.5*YOSHIDA_W1)
+YOSHIDA_D=(YOSHIDA_W1,YOSHIDA_W0,YOSHIDA_W1)
+
+# Integration N corps a pas fixe dt (en annees), par blocs de n_pas pas
+# Generateur renvoyant a chaque bloc les positions (n_pas,N,2) et l'ecart relatif maximal d'energie depuis le debut :
+# la memoire utilisee ne depend que de la taille d'un bloc, quelle que soit la duree de l'integration
+def integration(positions,vitesses,masses,dt,n_pas=PAS_PAR_BLOC):
+    positions=np.array(positions,dtype=float)
+    vitesses=np.array(vitesses,dtype=float)
+    energie_initiale=energie(positions,vitesses,masses)
+    derive=0.0
+    while True:
+        bloc=np.empty((n_pas,)+positions.shape)
+        for k in range(n_pas):
+            for c,d in zip(YOSHIDA_C,YOSHIDA_D+(None,)):
+                positions+=c*dt*vitesses
+                if d is not None:
+                    vitesses+=d*dt*accelerations(positions,masses)
+            bloc[k]=positions
+        derive=max(derive,abs(energie(positions,vitesses,masses)/energie_initiale-1.0))
+        yield(bloc,derive)
+
+# Ecart maximal (rapporte au demi-grand axe) entre le mouvement relatif de deux astres integre et l'ellipse de trace
+# Permet de verifier l'integrateur N corps sur le probleme a deux corps
+def ecart_trace(bloc,theta0,a_UA,e):
+    relatif=bloc[:,1,:]-bloc[:,0,:]
+    r=np.sqrt(np.sum(np.square(relatif),axis=-1))
+    theta=np.arctan2(relatif[:,1],relatif[:,0])
+    return(np.max(np.abs(r-a_UA*(1.0-math.pow(e,2.0))/(1.0+e*np.cos(theta-(math.pi/180.)*theta0))))/a_UA)
@@ -0,0 +1,242 @@
+# -*-coding:utf-8 -*
+
+"""Cache des résultats des démonstrations, indexé par la position des sliders, et calcul anticipé
+des positions voisines.
+
+Un slider ne peut prendre que des positions séparées d'un pixel : sa valeur est ramenée à l'indice
+de la colonne de pixels la plus proche (positions), et le résultat est calculé pour la valeur de
+cette colonne. Deux passages sur une même position donnent ainsi la même clé : le résultat est
+conservé dans un cache LRU commun à toutes les fonctions mémoïsées (memoiser), borné à MEMOIRE_MAX
+octets ; les résultats les moins récemment utilisés sont abandonnés au-delà.
+
+Lorsque l'interface est inactive depuis DELAI_INACTIVITE secondes, un thread calcule à l'avance
+les positions voisines de la dernière demande de chaque fonction : d'abord à un pixel de chaque
+slider, puis à deux, ... jusqu'à VOISINAGE pixels, un seul slider étant déplacé à la fois. Toute
+nouvelle demande interrompt ce calcul, qui reprend autour de la nouvelle position.
+
+Les calculs sont exécutés un par un (verrou calcul) : les fonctions mémoïsées peuvent utiliser les
+tableaux intermédiaires de l'espace de travail de leur démonstration. Les tableaux qu'elles renvoient
+sont en revanche conservés tels quels, sans copie, et passés en lecture seule : ils doivent être
+nouvellement alloués (ou constants), les noyaux écrivant leurs résultats directement dans ces
+tableaux. Un calcul alloue donc exactement le résultat conservé, et une lecture dans le cache
+n'alloue rien ; le chemin sans allocation des espaces de travail est remplacé par une allocation par
+position nouvelle, qui est la mémoire même du cache.
+Une fonction dont le résultat n'est plus affiché (bande de tolérance masquée) est retirée des
+demandes par oublier() : ses voisins ne sont plus calculés à l'avance.
+Les statistiques (taux de succès, mémoire occupée) sont renvoyées par statistiques() et resume().
+Le module n'importe pas matplotlib : il n'utilise que les objets qui lui sont transmis.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+MEMOIRE_MAX = 2**28         # mémoire maximale (octets) occupée par les résultats conservés
+DELAI_INACTIVITE = 0.15     # durée (s) sans demande au-delà de laquelle le calcul anticipé commence
+VOISINAGE = 3               # distance maximale (pixels) des positions calculées à l'avance
+
+fonctions = {}              # nom -> fonction et positions de ses paramètres
+cache = {
+    'entrees': OrderedDict(),   # (nom, clé) -> résultat, taille et origine, du moins récent au plus récent
+    'octets': 0,
+    'succes': 0,
+    'echecs': 0,
+    'anticipes': 0,             # résultats calculés à l'avance
+    'succes_anticipes': 0,      # succès sur des résultats calculés à l'avance
+    'demandes': OrderedDict(),  # nom -> clé de la dernière demande
+    'generation': 0,            # nombre de demandes, qui interrompent le calcul anticipé
+    'date': 0.,                 # date de la dernière demande
+    'a_explorer': False,        # voisinage de la dernière demande pas encore exploré
+    'anticipation': None,       # thread de calcul anticipé
+}
+verrou = threading.Condition()  # accès à cache
+calcul = threading.RLock()      # exécution des fonctions mémoïsées
+
+
+def positions(curseur):
+    """Renvoie les positions d'un slider : valeurs extrêmes et nombre de pixels qui les séparent"""
+    return curseur.valmin, curseur.valmax, max(1, int(round(curseur.ax.bbox.width)))
+
+def quantification(grilles, parametres):
+    """Renvoie la clé des paramètres : indice de la position la plus proche pour les paramètres
+    continus (grille (minimum, maximum, n)), valeur elle-même pour les autres (grille None)
+    """
+    cle = []
+    for grille, valeur in zip(grilles, parametres):
+        if grille is None:
+            cle.append(valeur)
+        else:
+            minimum, maximum, n = grille
+            cle.append(min(n, max(0, int(round((valeur - minimum) / (maximum - minimum) * n)))))
+    return tuple(cle)
+
+def valeurs(grilles, cle):
+    """Renvoie les valeurs des paramètres associées à une clé"""
+    return [c if grille is None else grille[0] + c * (grille[1] - grille[0]) / grille[2]
+            for grille, c in zip(grilles, cle)]
+
+def voisins(grilles, cle):
+    """Renvoie les clés voisines d'une clé, par distance croissante, un paramètre continu variant à
+    la fois et sans sortir de sa grille
+    """
+    for distance in range(1, VOISINAGE + 1):
+        for i, grille in enumerate(grilles):
+            if grille is None:
+                continue
+            for position in (cle[i] + distance, cle[i] - distance):
+                if 0 <= position <= grille[2]:
+                    yield cle[:i] + (position,) + cle[i + 1:]
+
+def figer(resultat):
+    """Passe en lecture seule les tableaux d'un résultat (éventuellement tuple, liste ou dictionnaire),
+    sans les copier
+    """
+    if isinstance(resultat, np.ndarray):
+        resultat.flags.writeable = False
+    elif isinstance(resultat, (tuple, list)):
+        for element in resultat:
+            figer(element)
+    elif isinstance(resultat, dict):
+        for element in resultat.values():
+            figer(element)
+    return resultat
+
+def taille(resultat):
+    """Renvoie la mémoire (octets) occupée par les tableaux d'un résultat"""
+    if isinstance(resultat, np.ndarray):
+        return resultat.nbytes
+    if isinstance(resultat, (tuple, list)):
+        return sum(taille(element) for element in resultat)
+    if isinstance(resultat, dict):
+        return sum(taille(element) for element in resultat.values())
+    return 0
+
+def execution(nom, cle):
+    """Calcule le résultat associé à une clé et le renvoie en lecture seule"""
+    fonction, grilles = fonctions[nom]
+    with calcul:
+        return figer(fonction(*valeurs(grilles, cle)))
+
+def stockage(nom, cle, resultat, anticipe):
+    """Conserve un résultat, puis abandonne les plus anciens au-delà de MEMOIRE_MAX (à appeler sous
+    le verrou)
+    """
+    entrees = cache['entrees']
+    if (nom, cle) in entrees:
+        return
+    entrees[nom, cle] = {'resultat': resultat, 'octets': taille(resultat), 'anticipe': anticipe}
+    cache['octets'] += entrees[nom, cle]['octets']
+    while cache['octets'] > MEMOIRE_MAX and len(entrees) > 1:
+        cache['octets'] -= entrees.popitem(last=False)[1]['octets']
+
+def memoiser(nom, fonction, grilles):
+    """Renvoie la version mémoïsée de fonction, qui prend les mêmes paramètres.
+    Arguments :
+        - nom : nom de la fonction dans le cache, propre à chaque démonstration ;
+        - fonction : fonction de calcul, sans effet sur l'affichage, dont les tableaux renvoyés sont
+          nouvellement alloués (ils sont conservés sans copie) ;
+        - grilles : pour chaque paramètre, positions (minimum, maximum, n) s'il est continu (voir
+          positions), None s'il prend des valeurs discrètes (choix d'un bouton radio).
+    Le résultat est calculé pour la position la plus proche de chaque paramètre continu ; ses
+    tableaux sont en lecture seule.
+    """
+    fonctions[nom] = (fonction, grilles)
+    demarrage()
+
+    def appel(*parametres):
+        """Renvoie le résultat conservé, ou le calcule"""
+        cle = quantification(grilles, parametres)
+        with verrou:
+            cache['generation'] += 1
+            cache['date'] = time.perf_counter()
+            cache['demandes'][nom] = cle
+            cache['demandes'].move_to_end(nom)
+            cache['a_explorer'] = True
+            entree = cache['entrees'].get((nom, cle))
+            if entree is not None:
+                cache['entrees'].move_to_end((nom, cle))
+                cache['succes'] += 1
+                cache['succes_anticipes'] += entree['anticipe']
+                verrou.notify()
+                return entree['resultat']
+            cache['echecs'] += 1
+        resultat = execution(nom, cle)
+        with verrou:
+            stockage(nom, cle, resultat, False)
+            verrou.notify()
+        return resultat
+
+    return appel
+
+def oublier(nom):
+    """Retire une fonction des demandes, dont les voisins ne sont plus calculés à l'avance ; le
+    calcul anticipé en cours est interrompu
+    """
+    with verrou:
+        if cache['demandes'].pop(nom, None) is not None:
+            cache['generation'] += 1
+            cache['a_explorer'] = True  # reprise autour des demandes restantes
+            verrou.notify()
+
+def vider():
+    """Abandonne tous les résultats conservés (mesure du temps de calcul, voir performances)"""
+    with verrou:
+        cache['entrees'].clear()
+        cache['octets'] = 0
+        cache['generation'] += 1
+
+def demarrage():
+    """Démarre le thread de calcul anticipé, s'il ne l'est pas déjà"""
+    if cache['anticipation'] is None:
+        cache['anticipation'] = threading.Thread(target=anticipation, name='anticipation', daemon=True)
+        cache['anticipation'].start()
+
+def anticipation():
+    """Boucle du thread de calcul anticipé : après DELAI_INACTIVITE secondes sans demande, calcule
+    les voisins des dernières demandes, la plus récente d'abord, jusqu'à la demande suivante
+    """
+    while True:
+        with verrou:
+            verrou.wait_for(lambda: cache['a_explorer'])
+            attente = DELAI_INACTIVITE
+            while attente > 0:
+                verrou.wait(attente)
+                attente = DELAI_INACTIVITE - (time.perf_counter() - cache['date'])
+            cache['a_explorer'] = False
+            generation = cache['generation']
+            candidats = [(nom, voisin) for nom, cle in reversed(cache['demandes'].items())
+                         for voisin in voisins(fonctions[nom][1], cle)]
+        for nom, cle in candidats:
+            with verrou:
+                if cache['generation'] != generation:
+                    break
+                if (nom, cle) in cache['entrees']:
+                    continue
+            resultat = execution(nom, cle)
+            with verrou:
+                stockage(nom, cle, resultat, True)
+                cache['anticipes'] += 1
+
+def statistiques():
+    """Renvoie le nombre de résultats conservés, la mémoire occupée (octets), les nombres de succès
+    et d'échecs, le taux de succès et le nombre de résultats calculés à l'avance
+    """
+    with verrou:
+        demandes = cache['succes'] + cache['echecs']
+        return {
+            'entrees': len(cache['entrees']),
+            'octets': cache['octets'],
+            'succes': cache['succes'],
+            'echecs': cache['echecs'],
+            'taux_succes': cache['succes'] / demandes if demandes else 0.,
+            'anticipes': cache['anticipes'],
+            'succes_anticipes': cache['succes_anticipes'],
+        }
+
+def resume():
+    """Renvoie les statistiques du cache sur une ligne, pour l'affichage"""
+    s = statistiques()
+    return "Cache : {:.0%} de succès ({} anticipés), {} résultats, {:.1f} Mo".format(
+        s['taux_succes'], s['succes_anticipes'], s['entrees'], s['octets'] / 2**20)
@@ -0,0 +1,247 @@
+# -*-coding:utf-8 -*
+
+"""Figure d'interférence d'un Michelson réglé en lame d'air ou en coin d'air.
+
+L'intensité produite par une source polychromatique est la somme incohérente des intensités de
+chaque longueur d'onde (intensity_spectrale), calculée par blocs de longueurs d'onde. La géométrie
+de l'écran est précalculée une fois par résolution et conservée dans grilles ; rendu_tuiles calcule
+une image de grande taille par bandes réparties sur plusieurs threads.
+Le module n'importe pas matplotlib : le programme michelson/franges_egale_inclinaison.py n'en est
+que l'interface.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+N_PIXELS = 50           # nombre de pixels par côté de l'écran
+N_PIXELS_HR = 1024      # nombre de pixels par côté en haute résolution
+DISTANCE_FOCALE = 10    # distance focale de la lentille de projection
+LARGEUR_MIROIR = 1.e-2  # largeur des miroirs représentée sur l'écran en coin d'air
+MEMOIRE_BLOC = 2**25    # taille maximale (octets) du bloc de phases du calcul spectral
+HAUTEUR_TUILE = 256     # nombre de lignes des bandes du rendu parallèle
+
+DOUBLET_SODIUM = (588.995e-9, 589.592e-9)   # longueurs d'onde du doublet du sodium
+LARGEUR_RAIE = 5.e-9                        # largeur à mi-hauteur de la raie gaussienne
+N_ECHANTILLONS_RAIE = 101                   # nombre de longueurs d'onde de la raie gaussienne
+SPECTRE_BLANC = (400.e-9, 750.e-9)          # bornes du spectre de la lumière blanche
+N_ECHANTILLONS_BLANC = 351                  # nombre de longueurs d'onde de la lumière blanche
+sources = ['Monochromatique', 'Doublet du sodium', 'Raie gaussienne', 'Lumière blanche']
+montages = ["Lame d'air", "Coin d'air"]
+
+grilles = {}            # géométrie de l'écran, par résolution
+
+
+def intensity(x, y, wavelength, epaisseur):
+    """Calcule l'intensité lumineuse.
+    Arguments :
+        - x : abscisse sur l'écran ;
+        - y : ordonnée sur l'écran ;
+        - wavelength : longueur d'onde de la source lumineuse ;
+        - epaisseur : épaisseur de la lame d'air.
+    """
+    return 1 + np.cos(2 * np.pi / wavelength * 2 * epaisseur * (1 - (x**2 + y**2)/(2 * DISTANCE_FOCALE**2)))
+
+def terme_radial(x, y, out=None):
+    """Calcule le terme 1 - (x² + y²)/(2f²), qui ne dépend que de la géométrie de l'écran.
+    La grille est construite par diffusion (broadcasting) de deux vecteurs, sans meshgrid.
+    Arguments :
+        - x : abscisses, de forme (1, n) ;
+        - y : ordonnées, de forme (m, 1) ;
+        - out : tableau de forme (m, n) recevant le résultat.
+    """
+    out = np.add(x**2, y**2, out=out)
+    out /= 2 * DISTANCE_FOCALE**2
+    np.subtract(1, out, out=out)
+    return out
+
+def intensity_radiale(radial, wavelength, epaisseur, out=None):
+    """Calcule l'intensité lumineuse à partir du terme radial précalculé.
+    Le résultat est identique à celui de intensity. Si out est fourni, le calcul est
+    fait en place, sans allocation de tableau temporaire.
+    Arguments :
+        - radial : terme radial renvoyé par terme_radial ;
+        - wavelength : longueur d'onde de la source lumineuse ;
+        - epaisseur : épaisseur de la lame d'air ;
+        - out : tableau de même forme que radial recevant le résultat.
+    """
+    out = np.multiply(2 * np.pi / wavelength * 2 * epaisseur, radial, out=out)
+    np.cos(out, out=out)
+    out += 1
+    return out
+
+def spectre(source, wavelength):
+    """Renvoie les longueurs d'onde émises par la source et leurs poids, de somme 1.
+    Arguments :
+        - source : type de source, élément de la liste sources ;
+        - wavelength : longueur d'onde centrale (sources monochromatique et gaussienne).
+    """
+    if source == 'Doublet du sodium':
+        longueurs_onde = np.array(DOUBLET_SODIUM)
+        poids = np.ones(2)
+    elif source == 'Raie gaussienne':
+        sigma = LARGEUR_RAIE / (2 * np.sqrt(2 * np.log(2)))
+        longueurs_onde = np.linspace(wavelength - 3*sigma, wavelength + 3*sigma, N_ECHANTILLONS_RAIE)
+        poids = np.exp(-(longueurs_onde - wavelength)**2 / (2 * sigma**2))
+    elif source == 'Lumière blanche':
+        longueurs_onde = np.linspace(*SPECTRE_BLANC, N_ECHANTILLONS_BLANC)
+        poids = np.ones(N_ECHANTILLONS_BLANC)
+    else:
+        longueurs_onde = np.array([wavelength])
+        poids = np.ones(1)
+    return longueurs_onde, poids / poids.sum()
+
+def difference_marche(montage, variable, epaisseur, angle, out=None):
+    """Calcule la différence de marche à partir de la géométrie précalculée de l'écran.
+    Arguments :
+        - montage : élément de la liste montages ;
+        - variable : terme radial (lame d'air) ou abscisse sur l'écran (coin d'air) ;
+        - epaisseur : épaisseur de la lame d'air, au centre du champ pour le coin d'air ;
+        - angle : angle du coin d'air (en radians) ;
+        - out : tableau de même forme que variable recevant le résultat.
+    """
+    if montage == montages[0]:
+        return np.multiply(2 * epaisseur, variable, out=out)
+    out = np.multiply(np.tan(angle) * LARGEUR_MIROIR, variable, out=out)
+    out += epaisseur
+    out *= 2
+    return out
+
+def intensity_spectrale(difference, longueurs_onde, poids, out=None, memoire=MEMOIRE_BLOC):
+    """Calcule l'intensité produite par une source polychromatique, somme incohérente
+    des intensités de chaque longueur d'onde pondérées par poids (de somme 1).
+    Ce noyau est commun aux deux montages, qui ne diffèrent que par la différence de marche.
+    Les longueurs d'onde sont traitées par blocs vectorisés dont la taille est fixée par
+    memoire : la mémoire utilisée ne dépend pas du nombre de longueurs d'onde.
+    Arguments :
+        - difference : différence de marche (tableau de forme quelconque) ;
+        - longueurs_onde : longueurs d'onde émises par la source ;
+        - poids : poids des longueurs d'onde ;
+        - out : tableau de même forme que difference recevant le résultat ;
+        - memoire : taille maximale (octets) du bloc de phases.
+    """
+    if out is None:
+        out = np.empty_like(difference)
+    plan = difference.reshape(-1)
+    resultat = out.reshape(-1)
+    taille_bloc = int(max(1, min(len(longueurs_onde), memoire // max(plan.nbytes, 1))))
+    phases = np.empty((taille_bloc, plan.size))
+    somme = np.empty(plan.size)
+    nombres_onde = 2 * np.pi / np.asarray(longueurs_onde)
+    poids = np.asarray(poids, dtype=float)
+
+    resultat.fill(1)
+    for debut in range(0, len(nombres_onde), taille_bloc):
+        k = nombres_onde[debut:debut + taille_bloc]
+        bloc = phases[:len(k)]
+        np.multiply(k[:, np.newaxis], plan, out=bloc)
+        np.cos(bloc, out=bloc)
+        np.dot(poids[debut:debut + taille_bloc], bloc, out=somme)
+        resultat += somme
+    return out
+
+def geometrie(haute_resolution):
+    """Renvoie la géométrie de l'écran associée à une résolution, sous la forme d'un tampon
+    image et, pour chaque montage, d'un quadruplet :
+        - les valeurs distinctes de la variable géométrique (terme radial ou abscisse) ;
+        - pour chaque pixel, l'indice de sa valeur dans ce tableau ;
+        - un tampon pour la différence de marche ;
+        - un tampon pour le profil d'intensité.
+    Par symétrie de la grille, un même terme radial est partagé par environ huit pixels ;
+    en coin d'air, tous les pixels d'une colonne ont la même abscisse. L'intensité n'est
+    calculée qu'une fois par valeur distincte, puis recopiée sur l'image.
+    Ces tableaux ne sont calculés qu'une fois par résolution, puis conservés : changer de
+    montage ne reconstruit ni la grille, ni l'image.
+    """
+    if haute_resolution not in grilles:
+        n_pixels = N_PIXELS_HR if haute_resolution else N_PIXELS
+        x = np.linspace(-0.5, 0.5, n_pixels)
+        radial = terme_radial(x[np.newaxis, :], x[:, np.newaxis])
+        valeurs, indices = np.unique(radial, return_inverse=True)
+        colonnes = np.broadcast_to(np.arange(n_pixels), radial.shape)
+        grilles[haute_resolution] = (np.empty_like(radial), {
+            montages[0]: (valeurs, indices.reshape(radial.shape), np.empty_like(valeurs), np.empty_like(valeurs)),
+            montages[1]: (x, colonnes, np.empty_like(x), np.empty_like(x)),
+        })
+    return grilles[haute_resolution]
+
+def calcul_image(haute_resolution, montage, source, wavelength, epaisseur, angle, ouverture, out=None):
+    """Calcule en place l'image de la figure d'interférence et la renvoie : dans le tampon image
+    de la géométrie, ou dans out s'il est fourni (tableau de même forme).
+    Arguments :
+        - haute_resolution : booléen, choix de la résolution ;
+        - montage : élément de la liste montages ;
+        - source : type de source, élément de la liste sources ;
+        - wavelength : longueur d'onde centrale ;
+        - epaisseur : épaisseur de la lame d'air ;
+        - angle : angle du coin d'air (en radians) ;
+        - ouverture : rayon angulaire de la source (en degrés) : en lame d'air, l'intensité est nulle
+          hors du champ éclairé ; None pour ne pas limiter le champ (le coin d'air ne l'est jamais) ;
+        - out : tableau recevant l'image.
+    """
+    image, montages_geometrie = geometrie(haute_resolution)
+    if out is not None:
+        image = out
+    variable, indices, difference, profil = montages_geometrie[montage]
+    longueurs_onde, poids = spectre(source, wavelength)
+    difference_marche(montage, variable, epaisseur, angle, out=difference)
+    intensity_spectrale(difference, longueurs_onde, poids, out=profil)
+    if montage == montages[0] and ouverture is not None:
+        # Champ éclairé par la source étendue : x² + y² = 2f²(1 - radial) <= (f tan(ouverture))²
+        profil[2 * (1 - variable) > np.tan(np.radians(ouverture))**2] = 0
+    np.take(profil, indices, out=image)
+    return image
+
+def rendu_tuiles(n_pixels, montage, source, wavelength, epaisseur, angle, ouverture, n_threads=None, fichier=None):
+    """Calcule la figure d'interférence sur une grille de n_pixels² pixels, découpée en
+    bandes de HAUTEUR_TUILE lignes réparties sur plusieurs threads (NumPy libère le GIL
+    pendant les calculs). Chaque bande est écrite directement dans l'image de sortie.
+    En lame d'air, l'intensité est mise à 0 hors du champ éclairé par la source étendue
+    (x² + y² > (f tan(ouverture))²), comme dans calcul_image ; avec une source
+    monochromatique, le résultat est identique à celui de intensity dans ce champ, et sur
+    tout l'écran si ouverture vaut None. Le coin d'air n'est pas limité.
+    Arguments :
+        - n_pixels : nombre de pixels par côté ;
+        - montage : élément de la liste montages ;
+        - source : type de source, élément de la liste sources ;
+        - wavelength : longueur d'onde centrale ;
+        - epaisseur : épaisseur de la lame d'air ;
+        - angle : angle du coin d'air (en radians) ;
+        - ouverture : rayon angulaire de la source (en degrés), ou None pour ne pas limiter le
+          champ ;
+        - n_threads : nombre de threads, par défaut le nombre de cœurs ;
+        - fichier : si fourni, l'image est un fichier .npy projeté en mémoire.
+    """
+    n_threads = n_threads or os.cpu_count()
+    if fichier is None:
+        image = np.empty((n_pixels, n_pixels))
+    else:
+        image = np.lib.format.open_memmap(fichier, mode='w+', dtype=float, shape=(n_pixels, n_pixels))
+    x = np.linspace(-0.5, 0.5, n_pixels)
+    longueurs_onde, poids = spectre(source, wavelength)
+    seuil = None if ouverture is None else np.tan(np.radians(ouverture))**2
+    if montage == montages[1]:
+        # En coin d'air, chaque bande est une copie du profil calculé sur les abscisses
+        profil = intensity_spectrale(difference_marche(montage, x, epaisseur, angle), longueurs_onde, poids)
+
+    def calcul_tuile(debut):
+        """Calcule les lignes debut à debut + HAUTEUR_TUILE de l'image"""
+        tuile = image[debut:debut + HAUTEUR_TUILE]
+        if montage == montages[1]:
+            tuile[...] = profil
+            return
+        radial = terme_radial(x[np.newaxis, :], x[debut:debut + HAUTEUR_TUILE, np.newaxis])
+        if len(longueurs_onde) == 1:
+            intensity_radiale(radial, longueurs_onde[0], epaisseur, out=tuile)
+        else:
+            intensity_spectrale(difference_marche(montage, radial, epaisseur, angle), longueurs_onde,
+                                poids, out=tuile, memoire=MEMOIRE_BLOC // n_threads)
+        if seuil is not None:
+            # Champ éclairé par la source étendue, comme dans calcul_image
+            tuile[2 * (1 - radial) > seuil] = 0
+
+    with ThreadPoolExecutor(n_threads) as pool:
+        list(pool.map(calcul_tuile, range(0, n_pixels, HAUTEUR_TUILE)))
+    if fichier is not None:
+        image.flush()
+    return image
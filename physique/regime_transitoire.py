@@ -0,0 +1,132 @@
+# -*-coding:utf-8 -*
+
+"""Simulation temporelle, bloc par bloc, d'un circuit linéaire décrit par sa représentation d'état :
+    dx/dt = A x + B u
+    y = C x + D u
+Le circuit est remplacé par un filtre récursif discret, exact lorsque l'entrée u est affine
+entre deux échantillons :
+    x_{k+1} = phi x_k + gamma_0 u_k + gamma_1 u_{k+1}
+La récurrence est évaluée sur chaque bloc par un balayage vectorisé (log2(n) opérations NumPy
+pour un bloc de n échantillons) ; l'état est conservé d'un bloc à l'autre, si bien que la mémoire
+utilisée ne dépend que de la taille des blocs, quelle que soit la durée du signal.
+"""
+
+import numpy as np
+
+
+TAILLE_BLOC = 2**16     # nombre d'échantillons par bloc
+formes = ['Sinus', 'Carré', 'Impulsion', 'Chirp']
+
+
+def exponentielle_matrice(m):
+    """Calcule l'exponentielle d'une matrice carrée (de petite taille) par un développement de
+    Taylor, après division de la matrice par une puissance de 2 ramenant sa norme sous 1/2,
+    suivi d'autant d'élévations au carré.
+    """
+    norme = np.max(np.sum(np.abs(m), axis=1))
+    n_carres = int(np.ceil(np.log2(norme / 0.5))) if norme > 0.5 else 0
+    m = m / 2**n_carres
+    resultat = np.eye(len(m))
+    terme = np.eye(len(m))
+    for k in range(1, 20):
+        terme = terme @ m / k
+        resultat = resultat + terme
+    for _ in range(n_carres):
+        resultat = resultat @ resultat
+    return resultat
+
+def discretisation(a, b, pas):
+    """Renvoie les matrices phi, gamma_0 et gamma_1 du filtre récursif exact, pour une entrée
+    affine entre deux échantillons. Elles s'obtiennent à partir de l'exponentielle de la matrice
+    augmentée [[A pas, B pas, 0], [0, 0, 1], [0, 0, 0]].
+    Arguments :
+        - a : matrice d'état (n, n) ;
+        - b : matrice d'entrée (n valeurs) ;
+        - pas : période d'échantillonnage.
+    """
+    n = len(a)
+    m = np.zeros((n + 2, n + 2))
+    m[:n, :n] = a * pas
+    m[:n, n] = b * pas
+    m[n, n + 1] = 1
+    e = exponentielle_matrice(m)
+    return e[:n, :n], e[:n, n] - e[:n, n + 1], e[:n, n + 1]
+
+def recurrence(phi, g, etat):
+    """Calcule les états x_1, ..., x_n vérifiant x_{k+1} = phi x_k + g_k, à partir de x_0 = etat.
+    Balayage de Hillis et Steele : après le passage de décalage s, la ligne k contient la
+    contribution des 2s derniers termes ; les puissances de phi sont obtenues par élévations
+    au carré successives.
+    Arguments :
+        - phi : matrice de transition (d, d) ;
+        - g : termes sources (tableau (n, d)) ;
+        - etat : état initial (d valeurs).
+    """
+    x = np.array(g, dtype=float)
+    if len(x) == 0:
+        return x
+    x[0] += phi @ etat
+    puissance = phi
+    decalage = 1
+    while decalage < len(x):
+        x[decalage:] = x[decalage:] + x[:-decalage] @ puissance.T
+        puissance = puissance @ puissance
+        decalage *= 2
+    return x
+
+def simulation(blocs, a, b, c, d, pas, etat=None):
+    """Générateur renvoyant la sortie du circuit bloc par bloc, pour une entrée fournie par blocs.
+    Arguments :
+        - blocs : itérable de tableaux, échantillons successifs de l'entrée u ;
+        - a, b, c, d : représentation d'état du circuit ;
+        - pas : période d'échantillonnage ;
+        - etat : état à la date du premier échantillon (par défaut, circuit au repos).
+    """
+    a = np.atleast_2d(np.asarray(a, dtype=float))
+    b = np.asarray(b, dtype=float).reshape(-1)
+    c = np.asarray(c, dtype=float).reshape(-1)
+    phi, gamma_0, gamma_1 = discretisation(a, b, pas)
+    etat = np.zeros(len(a)) if etat is None else np.asarray(etat, dtype=float)
+    precedent = None    # dernier échantillon du bloc précédent
+    for u in blocs:
+        u = np.asarray(u, dtype=float)
+        if len(u) == 0:
+            continue
+        if precedent is None:
+            etats = np.vstack((etat, recurrence(phi, np.outer(u[:-1], gamma_0) + np.outer(u[1:], gamma_1), etat)))
+        else:
+            u_ext = np.concatenate(([precedent], u))
+            etats = recurrence(phi, np.outer(u_ext[:-1], gamma_0) + np.outer(u_ext[1:], gamma_1), etat)
+        etat = etats[-1]
+        precedent = u[-1]
+        yield etats @ c + d * u
+
+def forme_onde(forme, frequence, pas, n_echantillons, taille_bloc=TAILLE_BLOC):
+    """Générateur des blocs d'un signal d'amplitude 1 débutant à t = 0.
+    Arguments :
+        - forme : élément de la liste formes ; l'impulsion est un créneau d'une demi-période,
+          le chirp un sinus dont la fréquence croît linéairement de frequence/10 à 10 frequence ;
+        - frequence : fréquence du signal ;
+        - pas : période d'échantillonnage ;
+        - n_echantillons : nombre total d'échantillons ;
+        - taille_bloc : nombre d'échantillons par bloc.
+    """
+    duree = n_echantillons * pas
+    for debut in range(0, n_echantillons, taille_bloc):
+        t = pas * np.arange(debut, min(debut + taille_bloc, n_echantillons))
+        if forme == 'Carré':
+            yield np.where(np.mod(frequence * t, 1) < 0.5, 1., -1.)
+        elif forme == 'Impulsion':
+            yield np.where(t < 0.5 / frequence, 1., 0.)
+        elif forme == 'Chirp':
+            f_0, f_1 = frequence / 10, frequence * 10
+            yield np.sin(2*np.pi * (f_0 * t + (f_1 - f_0) * t**2 / (2 * duree)))
+        else:
+            yield np.sin(2*np.pi * frequence * t)
+
+def blocs(signal, taille_bloc=TAILLE_BLOC):
+    """Générateur découpant un signal enregistré (tableau, ou fichier .npy ouvert avec
+    np.load(..., mmap_mode='r')) en blocs de taille_bloc échantillons.
+    """
+    for debut in range(0, len(signal), taille_bloc):
+        yield np.asarray(signal[debut:debut + taille_bloc], dtype=float)
@@ -0,0 +1,121 @@
+# -*-coding:utf-8 -*
+
+"""Spectre et spectrogramme glissant d'un signal fourni par blocs.
+
+Chaque colonne du spectrogramme est la transformée de Fourier (réelle) des taille_fenetre derniers
+échantillons, pondérés par une fenêtre de Hann ; une colonne est calculée tous les pas échantillons.
+Seules les colonnes nouvelles sont calculées à l'arrivée d'un bloc : l'historique n'est jamais
+recalculé. La résolution en fréquence vaut frequence_echantillonnage / taille_fenetre.
+
+Les échantillons et les colonnes sont rangés dans des tampons circulaires doublés : chaque valeur
+est écrite deux fois, à la position p et à la position p + n, si bien que les n dernières valeurs
+forment toujours une vue contiguë du tampon, sans copie ni décalage. La fenêtre, le produit, la
+transformée et le module sont eux aussi alloués une fois pour toutes.
+"""
+
+import numpy as np
+
+
+PLANCHER = -100.        # niveau minimal représenté (dB)
+
+
+def transformee(signal, out):
+    """Transformée de Fourier réelle de signal, écrite dans out (NumPy 2.0 ou plus récent ;
+    avec les versions antérieures, le résultat est calculé puis recopié)
+    """
+    try:
+        return np.fft.rfft(signal, out=out)
+    except TypeError:
+        out[:] = np.fft.rfft(signal)
+        return out
+
+def spectrogramme(taille_fenetre, pas, frequence_echantillonnage, bande, n_colonnes):
+    """Crée l'état d'un spectrogramme glissant (dictionnaire).
+    Arguments :
+        - taille_fenetre : nombre d'échantillons de chaque transformée ;
+        - pas : nombre d'échantillons entre deux colonnes ;
+        - frequence_echantillonnage : fréquence d'échantillonnage (Hz) ;
+        - bande : fréquences minimale et maximale conservées (Hz) ;
+        - n_colonnes : nombre de colonnes conservées.
+    Le pas ne peut dépasser taille_fenetre : les échantillons sont écrits par paquets d'au plus un
+    pas dans le tampon doublé (ecriture_circulaire), qui ne conserve que taille_fenetre échantillons.
+    """
+    if not 0 < pas <= taille_fenetre:
+        raise ValueError("Le pas ({}) doit être compris entre 1 et la taille de la fenêtre ({})".format(
+            pas, taille_fenetre))
+    frequences = np.fft.rfftfreq(taille_fenetre, 1. / frequence_echantillonnage)
+    debut, fin = np.searchsorted(frequences, bande)
+    fenetre = np.hanning(taille_fenetre)
+    return {
+        'taille_fenetre': taille_fenetre,
+        'pas': pas,
+        'frequences': frequences[debut:fin],
+        'indices': slice(debut, fin),
+        'fenetre': fenetre * 2 / np.sum(fenetre),      # un sinus d'amplitude 1 donne 0 dB
+        'echantillons': np.zeros(2 * taille_fenetre),
+        'ecriture': 0,          # position d'écriture dans le tampon des échantillons
+        'en_attente': 0,        # nombre d'échantillons reçus depuis la dernière colonne
+        'produit': np.empty(taille_fenetre),
+        'transformee': np.empty(taille_fenetre // 2 + 1, dtype=complex),
+        'module': np.empty(fin - debut),
+        'colonnes': np.full((fin - debut, 2 * n_colonnes), PLANCHER),
+        'n_colonnes': n_colonnes,
+        'colonne': 0,           # position d'écriture dans le tampon des colonnes
+    }
+
+def ecriture_circulaire(tampon, position, valeurs, longueur):
+    """Écrit valeurs aux positions position et position + longueur d'un tampon doublé, en
+    repliant l'écriture en fin de tampon (au plus longueur valeurs). Renvoie la nouvelle position
+    d'écriture.
+    """
+    n = min(len(valeurs), longueur - position)
+    tampon[position:position + n] = valeurs[:n]
+    tampon[position + longueur:position + longueur + n] = valeurs[:n]
+    if n < len(valeurs):
+        tampon[:len(valeurs) - n] = valeurs[n:]
+        tampon[longueur:longueur + len(valeurs) - n] = valeurs[n:]
+    return (position + len(valeurs)) % longueur
+
+def calcul_colonne(etat):
+    """Calcule le spectre (dB) des taille_fenetre derniers échantillons et l'ajoute au spectrogramme"""
+    n = etat['taille_fenetre']
+    derniers = etat['echantillons'][etat['ecriture']:etat['ecriture'] + n]
+    np.multiply(derniers, etat['fenetre'], out=etat['produit'])
+    transformee(etat['produit'], etat['transformee'])
+    module = etat['module']
+    np.abs(etat['transformee'][etat['indices']], out=module)
+    np.maximum(module, 10**(PLANCHER / 20), out=module)
+    np.log10(module, out=module)
+    np.multiply(module, 20, out=module)
+    c, n_colonnes = etat['colonne'], etat['n_colonnes']
+    etat['colonnes'][:, c] = module
+    etat['colonnes'][:, c + n_colonnes] = module
+    etat['colonne'] = (c + 1) % n_colonnes
+
+def ajout_bloc(etat, bloc):
+    """Ajoute un bloc d'échantillons et calcule les colonnes dont le pas est atteint.
+    Renvoie le nombre de colonnes calculées.
+    """
+    nouvelles = 0
+    position = 0
+    while position < len(bloc):
+        n = min(etat['pas'] - etat['en_attente'], len(bloc) - position)
+        etat['ecriture'] = ecriture_circulaire(etat['echantillons'], etat['ecriture'],
+                                               bloc[position:position + n], etat['taille_fenetre'])
+        etat['en_attente'] += n
+        position += n
+        if etat['en_attente'] == etat['pas']:
+            calcul_colonne(etat)
+            etat['en_attente'] = 0
+            nouvelles += 1
+    return nouvelles
+
+def image(etat):
+    """Renvoie le spectrogramme (dB), de la colonne la plus ancienne à la plus récente (vue)"""
+    c = etat['colonne']
+    return etat['colonnes'][:, c:c + etat['n_colonnes']]
+
+def dernier_spectre(etat):
+    """Renvoie le dernier spectre calculé (dB) (vue)"""
+    c = (etat['colonne'] - 1) % etat['n_colonnes']
+    return etat['colonnes'][:, c]
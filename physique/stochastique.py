@@ -0,0 +1,80 @@
+# -*-coding:utf-8 -*
+
+"""Cinétique stochastique : simulation de Gillespie d'un ensemble de trajectoires.
+
+Lorsque le nombre de molécules est faible, la concentration fluctue autour de la solution
+déterministe. Chaque réaction j d'un réseau (décrit par physique.cinetique.reseau) se produit avec
+la propension :
+    a_j = Ω k_j Π (N_s / Ω)^(ordre_js)
+où N_s est le nombre de molécules de l'espèce s et Ω le nombre de molécules correspondant à une
+concentration de 1 mol/L : en moyenne, les concentrations N / Ω suivent la loi de vitesse
+déterministe. La date de l'événement suivant est tirée selon une loi exponentielle de paramètre
+a_0 = Σ a_j, la réaction qui se produit avec la probabilité a_j / a_0.
+
+Toutes les trajectoires avancent ensemble : chaque itération traite un événement de chacune des
+trajectoires en cours par des opérations sur des tableaux, sans boucle sur les trajectoires. Les
+nombres de molécules ne sont enregistrés qu'aux instants d'une grille imposée (l'état est
+constant entre deux événements), si bien que la mémoire utilisée ne dépend pas du nombre
+d'événements. La date à laquelle le nombre de molécules du premier réactif atteint la moitié de sa
+valeur initiale (temps de demi-réaction empirique) est relevée exactement.
+"""
+
+import numpy as np
+
+from physique.cinetique import facteurs
+
+
+def propensions(systeme, nombres, constantes, omega):
+    """Renvoie les propensions des réactions, de forme (trajectoires, réactions)"""
+    vitesses = np.multiply.reduceat(facteurs(systeme, nombres / omega), systeme['debuts'], axis=1)
+    return omega * constantes * vitesses
+
+def trajectoires(systeme, nombres_initiaux, constantes, temps, omega, n_trajectoires, graine=None):
+    """Simule n_trajectoires trajectoires indépendantes d'un réseau de réactions.
+    Arguments :
+        - systeme : réseau de réactions décrit par physique.cinetique.reseau ;
+        - nombres_initiaux : nombres initiaux de molécules des espèces ;
+        - constantes : constantes de vitesse des réactions (unités de la loi de vitesse en mol/L) ;
+        - temps : grille croissante des instants d'enregistrement, commençant à l'instant initial ;
+        - omega : nombre de molécules correspondant à une concentration de 1 mol/L ;
+        - n_trajectoires : nombre de trajectoires ;
+        - graine : graine du générateur aléatoire.
+    Renvoie les nombres de molécules aux instants de la grille, tableau (trajectoires, instants,
+    espèces), et les temps de demi-réaction du premier réactif (nan s'il n'est pas atteint).
+    """
+    generateur = np.random.default_rng(graine)
+    temps = np.asarray(temps, dtype=float)
+    stoechiometrie = np.rint(systeme['stoechiometrie'].T).astype(np.int64)
+    nombres = np.tile(np.asarray(nombres_initiaux, dtype=np.int64), (n_trajectoires, 1))
+    constantes = np.asarray(constantes, dtype=float)
+    moitie = nombres[0, 0] / 2
+    resultat = np.empty((n_trajectoires, len(temps), nombres.shape[1]), dtype=np.int32)
+    demi_reaction = np.full(n_trajectoires, np.nan)
+    t = np.full(n_trajectoires, temps[0])
+    suivant = np.zeros(n_trajectoires, dtype=np.int64)     # indice du prochain instant d'enregistrement
+    actifs = np.arange(n_trajectoires)
+    while len(actifs):
+        a = propensions(systeme, nombres[actifs], constantes, omega)
+        cumul = np.cumsum(a, axis=1)
+        total = cumul[:, -1]
+        with np.errstate(divide='ignore'):
+            t_nouveau = t[actifs] + np.where(total > 0, generateur.exponential(size=len(actifs)) / total, np.inf)
+
+        # Enregistrement de l'état courant aux instants de la grille antérieurs à l'événement
+        fin = np.searchsorted(temps, t_nouveau, 'left')
+        longueurs = fin - suivant[actifs]
+        lignes = np.repeat(actifs, longueurs)
+        debuts = np.repeat(suivant[actifs] - (np.cumsum(longueurs) - longueurs), longueurs)
+        resultat[lignes, debuts + np.arange(len(lignes))] = nombres[lignes]
+        suivant[actifs] = fin
+
+        # Réalisation de l'événement
+        en_cours = fin < len(temps)
+        actifs, t_nouveau = actifs[en_cours], t_nouveau[en_cours]
+        tirages = generateur.random(len(actifs)) * total[en_cours]
+        reactions = np.minimum(np.sum(cumul[en_cours] <= tirages[:, np.newaxis], axis=1), len(constantes) - 1)
+        nombres[actifs] += stoechiometrie[reactions]
+        t[actifs] = t_nouveau
+        atteints = np.isnan(demi_reaction[actifs]) & (nombres[actifs, 0] <= moitie)
+        demi_reaction[actifs[atteints]] = t_nouveau[atteints]
+    return resultat, demi_reaction
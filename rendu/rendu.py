@@ -0,0 +1,362 @@
+# -*-coding:utf-8 -*
+
+"""Rendu en lot, sans fenêtre, des programmes de démonstration.
+
+Les sliders d'une démonstration sont remplacés par une grille de paramètres : chaque point de la
+grille donne une image, calculée par les noyaux du paquet physique et tracée par le moteur Agg de
+matplotlib. Les images sont réparties entre plusieurs processus ; chacun construit une seule
+figure, dont il met à jour les courbes d'une image à l'autre au lieu de la reconstruire.
+
+Utilisation :
+    python rendu/rendu.py circuit-RC R=10:1e5:50:log C=1e-9,1e-8,1e-7
+    python rendu/rendu.py michelson e=1e-5:5e-4:200 --video franges.mp4
+
+Chaque paramètre est donné sous la forme nom=valeur, nom=v1,v2,... (liste), nom=debut:fin:n
+(n valeurs régulièrement espacées) ou nom=debut:fin:n:log (espacement logarithmique) ; un paramètre
+à choix (filtre, source, montage, mécanisme, unité) est donné par son nom ou par son numéro. Les
+images parcourent le produit cartésien des valeurs, le dernier paramètre variant le plus vite. Les
+paramètres absents prennent les valeurs initiales de la démonstration (PARAMETRES).
+
+Les images sont écrites en PNG dans un dossier, avec un fichier parametres.csv donnant les
+paramètres de chacune, ou transmises dans l'ordre à ffmpeg pour produire une vidéo. Elles sont
+distribuées par blocs de TAILLE_BLOC ; au plus EN_VOL blocs par processus sont en cours, si bien que
+la mémoire utilisée ne dépend pas du nombre d'images. Les processus sont indépendants : le débit
+croît proportionnellement au nombre de cœurs.
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import textwrap
+import itertools
+import subprocess
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from physique import circuit_rc, circuit_rlc, battements, michelson, kepler, cinetique
+
+
+N_SAMPLES = 1000
+FREQUENCE_EXCITATION = 1.e4     # fréquence du signal d'excitation des circuits (Hz)
+TAILLE_BLOC = 8                 # nombre d'images confiées à la fois à un processus
+EN_VOL = 2                      # nombre maximal de blocs en cours par processus
+TAILLE = (1280, 720)            # taille des images (pixels)
+DPI = 100
+IMAGES_PAR_SECONDE = 25         # cadence de la vidéo
+NOM_IMAGE = "image_{:05d}.png"
+LARGEUR_TITRE = 90              # nombre maximal de caractères par ligne du titre
+
+PARAMETRES = {
+    'circuit-RC': {'R': 100., 'C': 1.e-7},
+    'circuit-RLC': {'R': 100., 'C': 1.e-7, 'L': 1.e-3, 'filtre': 'Passe-bande'},
+    'battements': {'f1': 440., 'f2': 440.},
+    'michelson': {'lambda': 500.e-9, 'e': 1.e-5, 'angle': 2.5e-4, 'ouverture': 5.,
+                  'source': michelson.sources[0], 'montage': michelson.montages[0], 'hr': 0},
+    'kepler': {'a': 1., 'e': 0., 'theta0': 0., 'M1': 1., 'M2': 1.,
+               'unite1': 'Masse solaire', 'unite2': 'Masse terrestre'},
+    'cinetique': {'C0': 1., 'k': 0.05, 'k2': 0.03, 'ordre': 1., 'mecanisme': cinetique.MECANISMES[0]},
+}
+CHOIX = {
+    'filtre': circuit_rlc.filtres,
+    'source': michelson.sources,
+    'montage': michelson.montages,
+    'unite1': kepler.liste_unite_de_masse,
+    'unite2': kepler.liste_unite_de_masse,
+    'mecanisme': cinetique.MECANISMES,
+}
+LIMITES_PHASE = {'Passe-bas': [-182, 2], 'Passe-bande': [-92, 92], 'Passe-haut': [-2, 182]}
+
+scene = {}      # figure et artistes du processus
+
+
+def valeurs(nom, texte):
+    """Renvoie la liste des valeurs d'un paramètre décrites par texte"""
+    if nom in CHOIX:
+        if texte in CHOIX[nom]:
+            return [texte]
+        resultat = []
+        for element in texte.split(','):
+            element = element.strip()
+            if element.isdigit() and int(element) < len(CHOIX[nom]):
+                element = CHOIX[nom][int(element)]
+            if element not in CHOIX[nom]:
+                raise ValueError("{} : valeur inconnue {!r}, choisir parmi {}".format(nom, element, CHOIX[nom]))
+            resultat.append(element)
+        return resultat
+    morceaux = texte.split(':')
+    if len(morceaux) in (3, 4):
+        debut, fin, n = float(morceaux[0]), float(morceaux[1]), int(morceaux[2])
+        if len(morceaux) == 4 and morceaux[3] == 'log':
+            return [float(v) for v in np.geomspace(debut, fin, n)]
+        return [float(v) for v in np.linspace(debut, fin, n)]
+    return [float(v) for v in texte.split(',')]
+
+def grille(demo, descriptions):
+    """Renvoie la liste des jeux de paramètres (dictionnaires) du produit cartésien décrit par
+    descriptions, liste de textes nom=valeurs
+    """
+    noms, listes = [], []
+    for description in descriptions:
+        nom, _, texte = description.partition('=')
+        if nom not in PARAMETRES[demo]:
+            raise ValueError("{} : paramètre inconnu {!r}, choisir parmi {}".format(demo, nom, list(PARAMETRES[demo])))
+        noms.append(nom)
+        listes.append(valeurs(nom, texte))
+    return [dict(PARAMETRES[demo], **dict(zip(noms, point))) for point in itertools.product(*listes)]
+
+def texte_parametres(parametres, largeur=LARGEUR_TITRE):
+    """Renvoie le titre d'une image, coupé en lignes d'au plus largeur caractères"""
+    return textwrap.fill(", ".join("{} = {:.4g}".format(nom, valeur) if isinstance(valeur, float)
+                                   else "{} = {}".format(nom, valeur) for nom, valeur in parametres.items()), largeur)
+
+
+def scene_rc(figure):
+    """Construit le diagramme de Bode et les signaux du circuit RC"""
+    ax = figure.subplot_mosaic([['amplitude', '.'], ['amplitude', 'signal'], ['phase', 'signal'], ['phase', '.']])
+    frequency = np.logspace(1, 8, N_SAMPLES)
+    time = np.linspace(0, 5.e-4, N_SAMPLES)
+    travail = circuit_rc.espace_travail(frequency, time, FREQUENCE_EXCITATION)
+    amplitude, = ax['amplitude'].loglog(frequency, np.ones(N_SAMPLES), 'r-')
+    ax['amplitude'].set_xlim(1.e1, 1.e8)
+    ax['amplitude'].get_xaxis().set_visible(False)
+    ax['amplitude'].set_ylim([1.e-4, 1.3])
+    ax['amplitude'].set_ylabel('Amplitude')
+    phase, = ax['phase'].semilogx(frequency, np.zeros(N_SAMPLES), 'r-')
+    ax['phase'].sharex(ax['amplitude'])
+    ax['phase'].set_ylim([-92, 2])
+    ax['phase'].set_xlabel('Fréquence (Hz)')
+    ax['phase'].set_ylabel('Phase (°)')
+    ax['signal'].plot(time, travail['excitation'], 'r-')
+    sortie, = ax['signal'].plot(time, travail['excitation'], 'b--')
+    ax['signal'].set_ylim(-1.1, 1.1)
+    ax['signal'].set_xlabel('Temps (s)')
+    return {'travail': travail, 'amplitude': amplitude, 'phase': phase, 'sortie': sortie}
+
+def dessin_rc(objets, parametres):
+    """Met à jour la scène du circuit RC"""
+    tau = parametres['R'] * parametres['C']
+    gain, phase = circuit_rc.bode(objets['travail'], tau)
+    objets['amplitude'].set_ydata(gain)
+    objets['phase'].set_ydata(phase)
+    h = circuit_rc.transfer_function(2*np.pi * FREQUENCE_EXCITATION, tau)
+    objets['sortie'].set_ydata(circuit_rc.sinusoide(objets['travail'], np.abs(h), np.angle(h)))
+
+def scene_rlc(figure):
+    """Construit le diagramme de Bode et les signaux du circuit RLC"""
+    objets = scene_rc(figure)
+    frequency = objets['amplitude'].get_xdata()
+    objets['travail'] = circuit_rlc.espace_travail(frequency, objets['sortie'].get_xdata(), FREQUENCE_EXCITATION)
+    return objets
+
+def dessin_rlc(objets, parametres):
+    """Met à jour la scène du circuit RLC"""
+    travail, filtre = objets['travail'], parametres['filtre']
+    omega_0, quality_factor = circuit_rlc.parametres_filtre(parametres['R'], parametres['C'], parametres['L'])
+    gain, phase = circuit_rlc.reponse(travail, omega_0, quality_factor, filtre)
+    objets['amplitude'].set_ydata(gain)
+    objets['phase'].set_ydata(phase)
+    objets['phase'].axes.set_ylim(LIMITES_PHASE[filtre])
+    h = circuit_rlc.transfer_function(2*np.pi * FREQUENCE_EXCITATION, omega_0, quality_factor, filtre)
+    objets['sortie'].set_ydata(circuit_rlc.sinusoide(travail, np.abs(h), np.angle(h)))
+
+def scene_battements(figure):
+    """Construit les deux signaux, leur somme et son enveloppe"""
+    ax = figure.subplots(3, sharex=True)
+    temps = np.linspace(0, 50e-3, N_SAMPLES)
+    courbes = [a.plot(temps, np.zeros(N_SAMPLES), lw=2, color='red')[0] for a in ax]
+    courbes += [ax[2].plot(temps, np.zeros(N_SAMPLES), lw=2, color='b', linestyle='--')[0] for _ in range(2)]
+    for a, limite in zip(ax, (1.1, 1.1, 2.2)):
+        a.axis([temps[0], temps[-1], -limite, limite])
+        a.set_ylabel('Amplitude')
+    ax[2].set_xlabel('Temps (s)')
+    return {'temps': temps, 'courbes': courbes}
+
+def dessin_battements(objets, parametres):
+    """Met à jour la scène des battements"""
+    sig1, sig2, somme, enveloppe = battements.signaux(objets['temps'], parametres['f1'], parametres['f2'])
+    for courbe, y in zip(objets['courbes'], (sig1, sig2, somme, enveloppe, -enveloppe)):
+        courbe.set_ydata(y)
+
+def scene_michelson(figure):
+    """Construit la figure d'interférence du Michelson"""
+    ax = figure.subplots()
+    graphe = ax.imshow(np.zeros((2, 2)), interpolation="bicubic", origin="lower", extent=[-1, 1, -1, 1], vmin=0, vmax=2)
+    figure.colorbar(graphe)
+    return {'graphe': graphe}
+
+def dessin_michelson(objets, parametres):
+    """Met à jour la scène du Michelson"""
+    haute_resolution = bool(parametres['hr'])
+    objets['graphe'].set_data(michelson.calcul_image(haute_resolution, parametres['montage'], parametres['source'],
+                                                     parametres['lambda'], parametres['e'], parametres['angle'],
+                                                     parametres['ouverture']))
+    objets['graphe'].set_interpolation("antialiased" if haute_resolution else "bicubic")
+
+def scene_kepler(figure):
+    """Construit les orbites du problème à deux corps"""
+    ax = figure.add_subplot(111, aspect='equal')
+    courbes = [ax.plot([], [], style, lw=2)[0] for style in ('k-', 'r-', 'b-')]
+    ax.axis([-10.0, 10.0, -10.0, 10.0])
+    return {'courbes': courbes}
+
+def dessin_kepler(objets, parametres):
+    """Met à jour la scène de Kepler"""
+    x, y, x1, y1, x2, y2 = kepler.trace(parametres['theta0'], parametres['M1'], parametres['unite1'],
+                                        parametres['M2'], parametres['unite2'], parametres['a'], parametres['e'])
+    for courbe, xs, ys in zip(objets['courbes'], (x, x1, x2), (y, y1, y2)):
+        courbe.set_data(xs, ys)
+
+def scene_cinetique(figure):
+    """Construit les concentrations des espèces et la lecture du temps de demi-réaction"""
+    ax = figure.subplots()
+    temps = np.linspace(0, 100, num=100)
+    courbes = [ax.plot(temps, np.zeros_like(temps), style, lw=2, label=nom)[0]
+               for style, nom in (('r-', 'A'), ('b-', 'B'), ('m-', 'C'))]
+    demi_reaction = [ax.plot([0., 0.], [0., 0.], c='g', ls='--')[0] for _ in range(2)]
+    ax.axis([0., 100, 0, 1.1])
+    ax.set_xlabel("Temps (s)")
+    ax.set_ylabel("Concentration (mol/L)")
+    legende = ax.legend(handles=courbes, loc='upper right')
+    return {'temps': temps, 'courbes': courbes, 'demi_reaction': demi_reaction,
+            'legende': list(zip(legende.get_lines(), legende.get_texts()))}
+
+def dessin_cinetique(objets, parametres):
+    """Met à jour la scène de cinétique"""
+    concentration_initiale = parametres['C0']
+    especes, temps_demi_reaction = cinetique.calcul_especes(parametres['mecanisme'], concentration_initiale,
+                                                            objets['temps'], parametres['k'], parametres['k2'],
+                                                            parametres['ordre'])
+    for i, (courbe, entree) in enumerate(zip(objets['courbes'], objets['legende'])):
+        courbe.set_visible(i < len(especes))
+        for artiste in entree:
+            artiste.set_visible(i < len(especes))
+        if i < len(especes):
+            courbe.set_ydata(especes[i])
+    objets['demi_reaction'][0].set_data([temps_demi_reaction, temps_demi_reaction], [0., 0.5*concentration_initiale])
+    objets['demi_reaction'][1].set_data([0., temps_demi_reaction], [0.5*concentration_initiale] * 2)
+
+SCENES = {
+    'circuit-RC': (scene_rc, dessin_rc),
+    'circuit-RLC': (scene_rlc, dessin_rlc),
+    'battements': (scene_battements, dessin_battements),
+    'michelson': (scene_michelson, dessin_michelson),
+    'kepler': (scene_kepler, dessin_kepler),
+    'cinetique': (scene_cinetique, dessin_cinetique),
+}
+
+
+def initialisation(demo, taille=TAILLE, dpi=DPI):
+    """Construit la figure unique du processus et les artistes de la démonstration"""
+    figure = Figure(figsize=(taille[0] / dpi, taille[1] / dpi), dpi=dpi, layout='constrained')
+    FigureCanvasAgg(figure)
+    creation, dessin = SCENES[demo]
+    scene['figure'] = figure
+    scene['objets'] = creation(figure)
+    scene['titre'] = figure.suptitle('', fontsize='small')
+    scene['dessin'] = dessin
+
+def rendu_bloc(bloc, dossier=None):
+    """Trace un bloc d'images (couples indice, paramètres) en mettant à jour la figure du processus.
+    Les images sont écrites en PNG dans dossier ; sans dossier, leurs pixels (hauteur, largeur, RGBA)
+    sont renvoyés.
+    """
+    figure = scene['figure']
+    resultat = []
+    for indice, parametres in bloc:
+        scene['dessin'](scene['objets'], parametres)
+        scene['titre'].set_text(texte_parametres(parametres))
+        if dossier is not None:
+            figure.savefig(os.path.join(dossier, NOM_IMAGE.format(indice)))
+        else:
+            figure.canvas.draw()
+            resultat.append(np.asarray(figure.canvas.buffer_rgba()).copy())
+    return resultat
+
+def video(chemin, image, images_par_seconde=IMAGES_PAR_SECONDE):
+    """Lance ffmpeg, qui lit sur son entrée standard des images de même taille que image"""
+    if shutil.which('ffmpeg') is None:
+        raise RuntimeError("ffmpeg est nécessaire pour produire une vidéo ; à défaut, utiliser une suite d'images")
+    hauteur, largeur = image.shape[:2]
+    return subprocess.Popen(['ffmpeg', '-loglevel', 'error', '-y', '-f', 'rawvideo', '-pix_fmt', 'rgba',
+                             '-s', '{}x{}'.format(largeur, hauteur), '-r', str(images_par_seconde), '-i', '-',
+                             '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p', chemin],
+                            stdin=subprocess.PIPE)
+
+def rendu(demo, jeux, processus=None, dossier=None, chemin_video=None, taille=TAILLE, dpi=DPI,
+          images_par_seconde=IMAGES_PAR_SECONDE):
+    """Trace une image par jeu de paramètres, en PNG dans dossier ou dans la vidéo chemin_video.
+    Avec un seul processus, les images sont tracées sans créer de processus. Renvoie le nombre
+    d'images par seconde obtenu.
+    """
+    processus = processus or os.cpu_count()
+    debut = time.perf_counter()
+    images = list(enumerate(jeux))
+    blocs = [images[i:i + TAILLE_BLOC] for i in range(0, len(images), TAILLE_BLOC)]
+    flux = None
+
+    def ecriture(images):
+        """Transmet à ffmpeg les images d'un bloc, dans l'ordre"""
+        nonlocal flux
+        for image in images:
+            if flux is None:
+                flux = video(chemin_video, image, images_par_seconde)
+            flux.stdin.write(image.tobytes())
+
+    try:
+        if processus == 1:
+            initialisation(demo, taille, dpi)
+            for bloc in blocs:
+                ecriture(rendu_bloc(bloc, dossier))
+        else:
+            with ProcessPoolExecutor(processus, initializer=initialisation, initargs=(demo, taille, dpi)) as pool:
+                en_cours = deque()
+                for bloc in blocs:
+                    en_cours.append(pool.submit(rendu_bloc, bloc, dossier))
+                    if len(en_cours) >= EN_VOL * processus:
+                        ecriture(en_cours.popleft().result())
+                while en_cours:
+                    ecriture(en_cours.popleft().result())
+    finally:
+        if flux is not None:
+            flux.stdin.close()
+            flux.wait()
+    return len(jeux) / (time.perf_counter() - debut)
+
+def ecriture_parametres(chemin, jeux):
+    """Écrit les paramètres de chaque image dans un fichier CSV"""
+    noms = list(jeux[0])
+    with open(chemin, 'w', encoding='utf-8') as fichier:
+        fichier.write(','.join(['image'] + noms) + '\n')
+        for indice, parametres in enumerate(jeux):
+            fichier.write(','.join([NOM_IMAGE.format(indice)] + ['"{}"'.format(parametres[nom]) for nom in noms]) + '\n')
+
+
+if __name__ == '__main__':
+    analyse = argparse.ArgumentParser(description="Rendu en lot des démonstrations sur une grille de paramètres")
+    analyse.add_argument('demo', choices=list(SCENES))
+    analyse.add_argument('parametres', nargs='*', help="nom=valeur, nom=v1,v2,..., nom=debut:fin:n[:log]")
+    analyse.add_argument('--sortie', help="dossier des images (par défaut rendu_<demo>)")
+    analyse.add_argument('--video', help="fichier vidéo produit par ffmpeg, au lieu d'une suite d'images")
+    analyse.add_argument('--processus', type=int, default=os.cpu_count(), help="nombre de processus")
+    analyse.add_argument('--taille', default='{}x{}'.format(*TAILLE), help="largeur x hauteur des images (pixels)")
+    analyse.add_argument('--ips', type=float, default=IMAGES_PAR_SECONDE, help="images par seconde de la vidéo")
+    arguments = analyse.parse_args()
+
+    jeux = grille(arguments.demo, arguments.parametres)
+    taille = tuple(int(x) for x in arguments.taille.lower().split('x'))
+    dossier = None
+    if arguments.video is None:
+        dossier = arguments.sortie or 'rendu_{}'.format(arguments.demo)
+        os.makedirs(dossier, exist_ok=True)
+        ecriture_parametres(os.path.join(dossier, 'parametres.csv'), jeux)
+    debit = rendu(arguments.demo, jeux, arguments.processus, dossier, arguments.video, taille,
+                  images_par_seconde=arguments.ips)
+    print("{} images tracées par {} processus : {:.1f} images/s".format(len(jeux), arguments.processus, debit))